@@ -131,16 +131,159 @@ app.on('activate', () => {
     }
 });
 
+// Long-running Python sidecar speaking line-delimited JSON-RPC (see src/python/sidecar.py).
+// Keeps imports, DB connections and the Git repo handle warm instead of spawning per call.
+const SIDECAR_METHODS = {
+    'db.py': 'db',
+    'analyzer.py': 'analyzer',
+    'git_integration.py': 'git',
+};
+const sidecarDisabled = process.env.FW_DISABLE_SIDECAR === '1';
+
+class PythonSidecar {
+    constructor(name, preload) {
+        this.name = name;
+        this.preload = preload;
+        this.process = null;
+        this.ready = null;
+        this.pending = new Map();
+        this.nextId = 1;
+        this.buffer = '';
+    }
+
+    start() {
+        if (this.ready) {
+            return this.ready;
+        }
+        this.ready = new Promise((resolve, reject) => {
+            const proc = spawn(pythonExec, [path.join(__dirname, '../python/sidecar.py'), ...this.preload], {
+                cwd: path.resolve(__dirname, '../..'),
+                env: process.env
+            });
+            this.process = proc;
+            // Drop this process's state (unless a newer sidecar already replaced it) so the next call starts afresh
+            const fail = (error) => {
+                clearTimeout(startupTimer);
+                if (this.process === proc) {
+                    for (const entry of this.pending.values()) {
+                        entry.reject(error);
+                    }
+                    this.pending.clear();
+                    this.process = null;
+                    this.ready = null;
+                    this.buffer = '';
+                }
+                reject(error);
+            };
+            const startupTimer = setTimeout(() => {
+                fail(new Error(`Sidecar ${this.name} did not start`));
+                proc.kill();
+            }, 30000);
+
+            proc.stdout.on('data', (data) => {
+                this.buffer += data.toString();
+                let newline;
+                while ((newline = this.buffer.indexOf('\n')) >= 0) {
+                    const line = this.buffer.slice(0, newline).trim();
+                    this.buffer = this.buffer.slice(newline + 1);
+                    if (!line) continue;
+                    let message;
+                    try {
+                        message = JSON.parse(line);
+                    } catch (e) {
+                        console.error(`[sidecar:${this.name}] Invalid message:`, line.slice(0, 200));
+                        continue;
+                    }
+                    if (message.method === 'ready') {
+                        clearTimeout(startupTimer);
+                        resolve();
+                        continue;
+                    }
+                    const entry = this.pending.get(message.id);
+                    if (!entry) continue;
+                    this.pending.delete(message.id);
+                    if (message.error) {
+                        entry.reject(new Error(message.error.message));
+                    } else {
+                        entry.resolve(message.result);
+                    }
+                }
+            });
+
+            proc.stderr.on('data', (data) => {
+                console.log(`[sidecar:${this.name}] ${data.toString().trimEnd()}`);
+            });
+
+            proc.on('error', (err) => fail(err));
+            proc.on('close', () => fail(new Error(`Sidecar ${this.name} exited`)));
+        });
+        return this.ready;
+    }
+
+    async call(method, params) {
+        await this.start();
+        if (!this.process) {
+            throw new Error(`Sidecar ${this.name} is not running`);
+        }
+        return new Promise((resolve, reject) => {
+            const id = this.nextId++;
+            this.pending.set(id, { resolve, reject });
+            this.process.stdin.write(JSON.stringify({ jsonrpc: '2.0', id, method, params }) + '\n');
+        });
+    }
+
+    stop() {
+        if (this.process) {
+            this.process.stdin.end(JSON.stringify({ jsonrpc: '2.0', id: 0, method: 'shutdown' }) + '\n');
+        }
+    }
+}
+
+// Analyzer calls can run for tens of seconds, so they get their own sidecar and never
+// queue in front of quick db/git calls.
+const sidecars = {
+    analyzer: new PythonSidecar('analyzer', ['analyzer']),
+    default: new PythonSidecar('default', ['db', 'git']),
+};
+
+app.on('will-quit', () => {
+    Object.values(sidecars).forEach(sidecar => sidecar.stop());
+});
+
+function sanitizePythonArgs(args) {
+    // Sanitize arguments to prevent null bytes and other issues
+    return args.map(arg => {
+        if (arg == null || arg === undefined) {
+            return '';
+        }
+        return String(arg).replace(/\0/g, ''); // Remove null bytes
+    });
+}
+
 // Helper function to create Python process handlers
-function createPythonHandler(scriptPath, args = []) {
-    return new Promise((resolve, reject) => {
-        // Sanitize arguments to prevent null bytes and other issues
-        const sanitizedArgs = args.map(arg => {
-            if (arg == null || arg === undefined) {
-                return '';
+async function createPythonHandler(scriptPath, args = []) {
+    const method = SIDECAR_METHODS[path.basename(scriptPath)];
+    if (method && !sidecarDisabled) {
+        const sidecar = method === 'analyzer' ? sidecars.analyzer : sidecars.default;
+        let started = false;
+        try {
+            await sidecar.start();
+            started = true;
+            return await sidecar.call(method, sanitizePythonArgs(args));
+        } catch (error) {
+            if (started) {
+                throw error;
             }
-            return String(arg).replace(/\0/g, ''); // Remove null bytes
-        });
+            console.error(`Sidecar unavailable, falling back to spawn: ${error.message}`);
+        }
+    }
+    return spawnPythonHandler(scriptPath, args);
+}
+
+// Spawn-per-call fallback used for scripts the sidecar does not serve
+function spawnPythonHandler(scriptPath, args = []) {
+    return new Promise((resolve, reject) => {
+        const sanitizedArgs = sanitizePythonArgs(args);
 
         const pythonProcess = spawn(pythonExec, [scriptPath, ...sanitizedArgs], {
             cwd: path.resolve(__dirname, '../..'),
@@ -183,6 +326,19 @@ ipcMain.handle('list-analyses', async () => {
     return createPythonHandler(path.join(__dirname, '../python/db.py'), ['--list-analyses']);
 });
 
+// Keyset-paginated listings; mode is 'summary' (no report body) or 'full'
+ipcMain.handle('list-analyses-page', async (event, limit = 50, cursor = null, mode = 'summary') => {
+    return createPythonHandler(path.join(__dirname, '../python/db.py'), ['--list-analyses-page', String(limit), cursor || '', mode]);
+});
+
+ipcMain.handle('list-baselines-page', async (event, limit = 50, cursor = null, mode = 'summary') => {
+    return createPythonHandler(path.join(__dirname, '../python/db.py'), ['--list-baselines-page', String(limit), cursor || '', mode]);
+});
+
+ipcMain.handle('get-analysis-stats', async () => {
+    return createPythonHandler(path.join(__dirname, '../python/db.py'), ['--analysis-stats']);
+});
+
 ipcMain.handle('get-analyses', async () => {
     return createPythonHandler(path.join(__dirname, '../python/db.py'), ['--list-analyses']);
 });
@@ -342,11 +498,93 @@ ipcMain.handle('git-get-remote-branches', async (event, url) => {
     return createPythonHandler(path.join(__dirname, '../python/git_integration.py'), ['--remote-branches', url]);
 });
 
-ipcMain.handle('git-clone-repository', async (event, url, localPath, branch, username, password) => {
+ipcMain.handle('git-clone-repository', async (event, url, localPath, branch, username, password, options) => {
     const args = ['--clone', url, localPath];
     if (branch) args.push(branch);
     if (username) args.push(username);
     if (password) args.push(password);
+    // Partial (blob-filtered), shallow and sparse clone modes
+    if (options && options.partial) args.push('--partial');
+    if (options && options.depth) args.push('--depth', String(options.depth));
+    if (options && options.sparse) args.push('--sparse');
+    return createPythonHandler(path.join(__dirname, '../python/git_integration.py'), args);
+});
+
+// Runs a git_integration.py batch command, forwarding its [PROGRESS] lines to the renderer
+function runGitBatchCommand(event, args, progressChannel = 'git-analyze-branch-progress') {
+    return new Promise((resolve, reject) => {
+        const pythonProcess = spawn(pythonExec, [path.join(__dirname, '../python/git_integration.py'), ...sanitizePythonArgs(args)], {
+            cwd: path.resolve(__dirname, '../..'),
+            env: process.env
+        });
+        let data = '';
+        let pending = '';
+        pythonProcess.stdout.on('data', (chunk) => data += chunk);
+        pythonProcess.stderr.on('data', (chunk) => {
+            pending += chunk.toString();
+            const lines = pending.split('\n');
+            pending = lines.pop() || '';
+            for (const line of lines) {
+                if (line.startsWith('[PROGRESS] ')) {
+                    try {
+                        event.sender.send(progressChannel, JSON.parse(line.slice('[PROGRESS] '.length)));
+                    } catch (e) {
+                        console.warn('[git-batch] Bad progress line:', line);
+                    }
+                } else if (line.trim()) {
+                    console.error('[git-batch] stderr:', line);
+                }
+            }
+        });
+        pythonProcess.on('close', (code) => {
+            if (code === 0) {
+                try {
+                    resolve(JSON.parse(data));
+                } catch (e) {
+                    reject(new Error('Invalid response from git batch analysis'));
+                }
+            } else {
+                reject(new Error('Git batch analysis failed'));
+            }
+        });
+    });
+}
+
+function gitBatchOptions(provider, workers) {
+    const args = [];
+    if (provider) args.push('--provider', provider);
+    if (workers) args.push('--workers', String(workers));
+    return args;
+}
+
+// Analyses every PLC file of a branch in one Python process
+ipcMain.handle('git-analyze-branch', async (event, branch, provider, workers) => {
+    return runGitBatchCommand(event, ['--analyze-branch', ...(branch ? [branch] : []), ...gitBatchOptions(provider, workers)]);
+});
+
+// Analyses only the files changed since the last scanned (or given) commit
+ipcMain.handle('git-scan-changes', async (event, branch, since, provider, workers) => {
+    const args = ['--scan-changes', ...(branch ? [branch] : []), ...gitBatchOptions(provider, workers)];
+    if (since) args.push('--since', since);
+    return runGitBatchCommand(event, args);
+});
+
+// Indexes the instructions added/removed by each new commit of a branch
+ipcMain.handle('git-scan-history', async (event, branch, since) => {
+    const args = ['--scan-history', ...(branch ? [branch] : [])];
+    if (since) args.push('--since', since);
+    return runGitBatchCommand(event, args, 'git-scan-history-progress');
+});
+
+// Commits that introduced (or removed) matching instructions, oldest first
+ipcMain.handle('git-history-search', async (event, query = {}) => {
+    const args = ['--history-search'];
+    for (const key of ['op', 'operand', 'instruction', 'file']) {
+        if (query[key]) args.push(`--${key}`, String(query[key]));
+    }
+    if (query.removed) args.push('--removed');
+    if (query.first) args.push('--first');
+    if (query.limit) args.push('--limit', String(query.limit));
     return createPythonHandler(path.join(__dirname, '../python/git_integration.py'), args);
 });
 
@@ -644,42 +882,35 @@ ipcMain.handle('delete-comparison-result', async (event, comparisonId) => {
     }
 });
 
-// Get LLM logs
-ipcMain.handle('get-llm-logs', async () => {
+// Get LLM logs: the most recent page of the rotating log store, newest first
+ipcMain.handle('get-llm-logs', async (event, limit) => {
     try {
-        const logsPath = path.join(__dirname, '../../llm-interactions.log.json');
-        if (fsSync.existsSync(logsPath)) {
-            const logsContent = fsSync.readFileSync(logsPath, 'utf8');
-            const logs = logsContent.split('\n')
-                .filter(line => line.trim())
-                .map(line => {
-                    try {
-                        return JSON.parse(line);
-                    } catch {
-                        return null;
-                    }
-                })
-                .filter(log => log !== null);
-            return logs; // Return the array directly
-        } else {
-            return []; // Return empty array if no log file
-        }
+        const page = await createPythonHandler(path.join(__dirname, '../python/analyzer.py'), ['--llm-log-page', '--limit', String(limit || 200)]);
+        return (page && page.entries) || []; // Return the array directly
     } catch (error) {
         console.error('Get LLM logs error:', error);
         return []; // Return empty array on error
     }
 });
 
+// Page through LLM logs with filters; pass next_cursor back to get older entries
+ipcMain.handle('get-llm-log-page', async (event, options = {}) => {
+    const args = ['--llm-log-page'];
+    for (const key of ['limit', 'cursor', 'provider', 'model', 'since', 'until']) {
+        if (options[key]) args.push(`--${key}`, String(options[key]));
+    }
+    if (typeof options.success === 'boolean') args.push('--success', String(options.success));
+    return createPythonHandler(path.join(__dirname, '../python/analyzer.py'), args);
+});
+
 // Handler for clearing LLM logs
 ipcMain.handle('clear-llm-log', async () => {
     try {
-        const logsPath = path.join(__dirname, '../../llm-interactions.log.json');
-        if (fsSync.existsSync(logsPath)) {
-            fsSync.writeFileSync(logsPath, '', 'utf8');
-            return { success: true, message: 'LLM logs cleared successfully' };
-        } else {
-            return { success: true, message: 'No log file to clear' };
+        const result = await createPythonHandler(path.join(__dirname, '../python/analyzer.py'), ['--clear-llm-log']);
+        if (!result || !result.ok) {
+            throw new Error((result && result.error) || 'Unknown error');
         }
+        return { success: true, message: 'LLM logs cleared successfully' };
     } catch (error) {
         console.error('Clear LLM logs error:', error);
         throw new Error(`Failed to clear LLM logs: ${error.message}`);
@@ -16,7 +16,7 @@ contextBridge.exposeInMainWorld('electronAPI', {
   resetUserPassword: (userId, newPassword) => ipcRenderer.invoke('reset-user-password', userId, newPassword),
   
   // === Git Integration Methods ===
-  gitCloneRepository: (url, localPath, branch, username, password) => ipcRenderer.invoke('git-clone-repository', url, localPath, branch, username, password),
+  gitCloneRepository: (url, localPath, branch, username, password, options) => ipcRenderer.invoke('git-clone-repository', url, localPath, branch, username, password, options),
   gitConnectRepository: (repoPath) => ipcRenderer.invoke('git-connect-repository', repoPath),
   gitGetBranches: () => ipcRenderer.invoke('git-get-branches'),
   gitGetRemoteBranches: (url) => ipcRenderer.invoke('git-get-remote-branches', url),
@@ -24,6 +24,20 @@ contextBridge.exposeInMainWorld('electronAPI', {
   gitGetFiles: (branch) => ipcRenderer.invoke('git-get-files', branch),
   gitGetStatus: () => ipcRenderer.invoke('git-get-status'),
   gitAnalyzeFile: (filePath, branch, provider, model) => ipcRenderer.invoke('git-analyze-file', filePath, branch, provider, model),
+  gitAnalyzeBranch: (branch, provider, workers) => ipcRenderer.invoke('git-analyze-branch', branch, provider, workers),
+  gitScanChanges: (branch, since, provider, workers) => ipcRenderer.invoke('git-scan-changes', branch, since, provider, workers),
+  onGitAnalyzeBranchProgress: (callback) => {
+    const listener = (_event, progress) => callback(progress);
+    ipcRenderer.on('git-analyze-branch-progress', listener);
+    return () => ipcRenderer.removeListener('git-analyze-branch-progress', listener);
+  },
+  gitScanHistory: (branch, since) => ipcRenderer.invoke('git-scan-history', branch, since),
+  onGitScanHistoryProgress: (callback) => {
+    const listener = (_event, progress) => callback(progress);
+    ipcRenderer.on('git-scan-history-progress', listener);
+    return () => ipcRenderer.removeListener('git-scan-history-progress', listener);
+  },
+  gitHistorySearch: (query) => ipcRenderer.invoke('git-history-search', query),
   gitCommitFile: (filePath, commitMessage, branch) => ipcRenderer.invoke('git-commit-file', filePath, commitMessage, branch),
   gitPushToRemote: (branch, remote) => ipcRenderer.invoke('git-push-to-remote', branch, remote),
   gitCopyFileFromBranch: (filePath, sourceBranch, targetPath) => ipcRenderer.invoke('git-copy-file-from-branch', filePath, sourceBranch, targetPath),
@@ -46,6 +60,9 @@ contextBridge.exposeInMainWorld('electronAPI', {
   bulkOTThreatIntel: () => ipcRenderer.invoke('bulk-ot-threat-intel'),
   listAnalyses: () => ipcRenderer.invoke('list-analyses'),
   listBaselines: () => ipcRenderer.invoke('list-baselines'),
+  listAnalysesPage: (limit, cursor, mode) => ipcRenderer.invoke('list-analyses-page', limit, cursor, mode),
+  listBaselinesPage: (limit, cursor, mode) => ipcRenderer.invoke('list-baselines-page', limit, cursor, mode),
+  getAnalysisStats: () => ipcRenderer.invoke('get-analysis-stats'),
   debugLogHook: (log) => ipcRenderer.invoke('debug-log-hook', log),
   getSavedComparisons: () => ipcRenderer.invoke('get-saved-comparisons'),
   getAnalysis: (analysisId) => ipcRenderer.invoke('get-analysis', analysisId),
@@ -54,7 +71,8 @@ contextBridge.exposeInMainWorld('electronAPI', {
   llmCompareAnalysisBaseline: (analysisPathOrContent, baselinePathOrContent, provider) => ipcRenderer.invoke('llm-compare-analysis-baseline', analysisPathOrContent, baselinePathOrContent, provider),
   saveComparisonResult: (payload) => ipcRenderer.invoke('save-comparison-result', payload),
   deleteComparisonResult: (comparisonId) => ipcRenderer.invoke('delete-comparison-result', comparisonId),
-  getLLMLogs: () => ipcRenderer.invoke('get-llm-logs'),
+  getLLMLogs: (limit) => ipcRenderer.invoke('get-llm-logs', limit),
+  getLLMLogPage: (options) => ipcRenderer.invoke('get-llm-log-page', options),
   clearLLMLog: () => ipcRenderer.invoke('clear-llm-log'),
   deleteBaseline: (baselineId) => ipcRenderer.invoke('delete-baseline', baselineId),
   
@@ -2,6 +2,7 @@
 
 import os
 import sys
+import re
 import json
 import requests
 sys.path.append(os.path.dirname(__file__))
@@ -32,12 +33,172 @@ try:
 except ImportError:
     openai = None
 
-from db import init_db, save_analysis
+from db import init_db, save_analysis, get_block_analyses, save_block_analyses
 from logger import log_info, log_error
+from llm_cache import llm_cache, content_hash, prompt_version
+from llm_log_store import llm_log
+from chunker import chunk_content, chunk_units, split_units, detect_format
+from l5x_parser import routine_units, is_l5x_path
+from plc_model import parse_program, parse_units
+from plc_diff import diff_contents, diff_hunk_units, has_changes, public_diff
+from plc_xref import build_xref, xref_content
+from rules import rule_based_analysis, triage_blocks, run_rules
+from pattern_index import scan_content
+from concurrent.futures import ThreadPoolExecutor
 import datetime
+import queue
 import requests
 
-LLM_LOG_PATH = os.path.join(os.path.dirname(__file__), '../../llm-interactions.log.json')
+LLM_MAX_WORKERS = int(os.environ.get('LLM_MAX_WORKERS', 4))
+# What goes to the LLM after the local rules: 'all' blocks, only 'suspicious' ones, or 'none'
+LLM_ESCALATION = os.environ.get('LLM_ESCALATION', 'all').lower()
+# Analyse per block and reuse stored results for blocks whose normalized hash is unchanged
+LLM_BLOCK_REUSE = os.environ.get('LLM_BLOCK_REUSE', '1') != '0'
+OLLAMA_URL = 'http://localhost:11434'
+
+LLM_SYSTEM_PROMPT = "You are a senior control systems cybersecurity analyst specialising in industrial automation and PLC threat detection. You have deep expertise in Siemens PCS7/S7 environments, STL/SCL/LAD programming, and cyber-physical attack techniques targeting operational technology (OT) environments."
+
+# Prompt templates; the analysed PLC content is appended to the end
+API_ANALYSIS_PROMPT = '''\
+You are a senior control systems cybersecurity analyst specialising in industrial automation and PLC threat detection. You have deep expertise in Siemens PCS7/S7 environments, STL/SCL/LAD programming, and cyber-physical attack techniques targeting operational technology (OT) environments.
+
+The following function block (FC540) from a Siemens PCS7 system is under investigation for any signs of **malicious logic, embedded threats, unsafe control logic, or suspicious code structures**.
+
+You must perform a **complete forensic and quality analysis** of this logic to detect known and novel PLC-based threats. These may include logic bombs, sabotage, unauthorised overrides, covert control logic, payload hiding, and bad engineering practices that weaken system integrity or safety.
+
+---
+
+'''
+
+# Improved Python-friendly prompt
+FILE_ANALYSIS_PROMPT = '''\
+You are a senior control systems cybersecurity analyst specialising in industrial automation and PLC threat detection. You have deep expertise in Siemens PCS7/S7 environments, STL/SCL/LAD programming, and cyber-physical attack techniques targeting operational technology (OT) environments.
+
+The following function block (FC540) from a Siemens PCS7 system is under investigation for any signs of **malicious logic, embedded threats, unsafe control logic, or suspicious code structures**.
+
+You must perform a **complete forensic and quality analysis** of this logic to detect known and novel PLC-based threats. These may include logic bombs, sabotage, unauthorised overrides, covert control logic, payload hiding, and bad engineering practices that weaken system integrity or safety.
+
+---
+
+Respond ONLY in the following structured format. Be precise, professional, and concise. Your audience includes ICS engineers, cybersecurity analysts, and operations managers.
+
+---
+
+1. EXECUTIVE SUMMARY  
+- Summarise the code's functional intent (if discernible)  
+- Note any high-level safety or security concerns at a glance  
+
+---
+
+2. CYBER SECURITY KEY FINDINGS  
+For each issue identified, provide:
+- **Title**: Short description (e.g., "Runtime-triggered Logic Bomb")  
+- **Location**: FC/FB number, network or STL line number  
+- **Threat Behaviour**: Explain step-by-step what the code does  
+- **Risk Level**: [Low, Medium, High, Critical]  
+- **Impact**: Operational and/or safety consequences  
+- **Mitigation**: How to neutralise or remove the threat  
+
+You MUST check for:
+- Hardcoded overrides (e.g., MOV or L/T instructions overwriting DBs or setpoints)
+- Time-delayed triggers using counters, runtime, or process values
+- Covert logic hidden in redundant branches or unused blocks
+- Suppressed alarms (e.g., writing 0 to alarm bits or masking DB alarms)
+- Memory marker misuse (e.g., hidden M-bit toggles or reserved bits)
+- Persistence mechanisms or backdoors (e.g., uncalled FCs, reserved DB usage)
+- Payload hiding (e.g., logic embedded in FBs called conditionally only once)
+- Any logic that could damage equipment, affect product quality, or trigger false signals
+- External command injection risk (e.g., inputs that override operator logic)
+- Signature mismatches, version mismatches, or timestamp oddities
+- Triggers that appear inactive but are activated via indirect markers
+
+---
+
+3. GENERAL STRUCTURE OBSERVATIONS  
+- Outline code structure (FCs, DBs, reuse of FBs)  
+- Comment on naming patterns, modularity, and clarity  
+- Identify any undocumented or poorly explained elements  
+
+---
+
+4. CODE STRUCTURE & QUALITY REVIEW  
+- Highlight issues like:
+  - Unstructured memory access
+  - Lack of symbolic addressing
+  - Copy-paste logic or repetition
+  - Poor naming conventions
+  - Missing comments for key logic paths
+  - Engineering anti-patterns that increase error risk  
+- Suggest improvements for maintainability, auditability, and clarity
+
+---
+
+5. IMPLICATIONS AND RECOMMENDATIONS  
+Provide a table:
+
+| Risk | Description | Recommendation |
+
+Ensure each row is unique, meaningful, and offers a specific mitigation or follow-up.
+
+---
+
+6. NEXT STEPS  
+- Recommend immediate and mid-term actions, such as:
+  - Isolate suspect logic
+  - Perform logic diff against trusted baseline
+  - Audit engineering workstation access and project files
+  - Revalidate logic signatures and timestamps
+  - Review linked FCs, OBs, and conditional FB calls
+  - Conduct site-wide scan for similar patterns in other blocks
+
+---
+
+7. INSTRUCTION-LEVEL ANALYSIS (REQUIRED)  
+Return a JSON array named `instruction_analysis` with this format:
+
+[
+  {
+    "instruction": "<raw STL or SCL line>",
+    "insight": "<plain-language description>",
+    "risk_level": "<Low|Medium|High|Critical>"
+  }
+]
+
+If a section has no relevant content, write "None".
+
+Now analyse the following PCS7 Function Block logic (partial STL/SCL export):\n'''
+
+# Comparison prompt; the structural diff (baseline -> analysis hunks) is appended to the end
+COMPARE_PROMPT = '''
+You are a senior control systems cybersecurity analyst. Review the following structural diff between a trusted BASELINE PLC program and the ANALYSIS version under investigation.
+
+Blocks were aligned by name and networks by content; only changed hunks are shown. Lines starting with "-" exist only in the baseline, lines starting with "+" exist only in the analysis file, and lines starting with two spaces are unchanged context. Comments and whitespace were stripped.
+
+Respond ONLY in the following structured markdown format, using the exact section headers below, in this order. Each section must start with either '## Header' or '**Header**' (both are accepted). If a section has no relevant content, write "None" under the header. Use bullet points, subheaders, code blocks, and tables as appropriate for clarity and professional presentation.
+
+## Overview
+- Briefly summarize what the changed blocks do and the context of the comparison.
+
+## Structural Differences
+- List and explain the added, removed and modified blocks and networks.
+
+## Logic Differences
+- Detail the added, removed and modified instructions. Highlight any logic bombs, suspicious changes, or functional changes.
+
+## Security and Risk Analysis
+- Analyze all security-relevant differences, including potential vulnerabilities, unsafe logic, sabotage, or covert threats. Use bullet points and subheaders for each key finding.
+
+## Key Risks and Recommendations
+- Summarize the most important risks and provide actionable recommendations. Use a table if appropriate. List each risk and its recommended mitigation.
+
+## Conclusion
+- Provide a concise summary of the overall comparison, including any critical findings or next steps.
+
+If a section has no content, write "None" under the header. Use markdown formatting throughout, and ensure all sections are present and clearly labeled.
+
+---
+STRUCTURAL DIFF:
+'''
 
 def log_llm_interaction(prompt, result, success, provider=None, model=None):
     log_entry = {
@@ -49,10 +210,8 @@ def log_llm_interaction(prompt, result, success, provider=None, model=None):
         'model': model
     }
     try:
-        # Use newline-delimited JSON format for easier reading
-        with open(LLM_LOG_PATH, 'a', encoding='utf-8') as f:
-            json.dump(log_entry, f)
-            f.write('\n')
+        # Rotating NDJSON store with an offset index (see llm_log_store)
+        llm_log.append(log_entry)
     except Exception as e:
         pass  # Don't crash on logging error
 
@@ -110,19 +269,49 @@ def check_llm_status():
 
 def ollama_llm_query(prompt, model='llama3'):
     response = requests.post(
-        'http://localhost:11434/api/generate',
+        f'{OLLAMA_URL}/api/generate',
         json={'model': model, 'prompt': prompt, 'stream': False}
     )
     return response.json()['response']
 
-def llm_analysis(prompt, model="gpt-4o", provider=None):
+def ollama_llm_stream(prompt, model='llama3'):
+    """Yield response text from Ollama as it is generated (one JSON object per line)"""
+    with requests.post(
+        f'{OLLAMA_URL}/api/generate',
+        json={'model': model, 'prompt': prompt, 'stream': True},
+        stream=True
+    ) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if not line:
+                continue
+            data = json.loads(line)
+            if data.get('error'):
+                raise RuntimeError(f"Ollama error: {data['error']}")
+            if data.get('response'):
+                yield data['response']
+            if data.get('done'):
+                break
+
+def resolve_provider(provider=None):
+    """Resolve the effective LLM provider: explicit value, env LLM_PROVIDER, or openai"""
+    return (provider or os.environ.get('LLM_PROVIDER', 'openai')).lower()
+
+def resolve_model(provider, model="gpt-4o"):
+    """Model actually used for a provider (Ollama is currently pinned to llama3)"""
+    return 'llama3' if resolve_provider(provider) == 'ollama' else model
+
+def llm_analysis(prompt, model="gpt-4o", provider=None, stream=False):
     """
     provider: 'openai' (default), 'ollama', or None (uses env LLM_PROVIDER or defaults to openai)
+    stream: return a generator of text pieces instead of the full response (see llm_analysis_stream)
     """
-    provider = provider or os.environ.get('LLM_PROVIDER', 'openai').lower()
+    if stream:
+        return llm_analysis_stream(prompt, model=model, provider=provider)
+    provider = resolve_provider(provider)
     if provider == 'ollama':
         try:
-            return ollama_llm_query(prompt, model='llama3')
+            return ollama_llm_query(prompt, model=resolve_model(provider, model))
         except Exception as e:
             return {'error': f'Ollama error: {e}'}
     # Default: OpenAI
@@ -135,7 +324,7 @@ def llm_analysis(prompt, model="gpt-4o", provider=None):
     try:
         response = client.chat.completions.create(
             model=model,
-            messages=[{"role": "system", "content": "You are a senior control systems cybersecurity analyst specialising in industrial automation and PLC threat detection. You have deep expertise in Siemens PCS7/S7 environments, STL/SCL/LAD programming, and cyber-physical attack techniques targeting operational technology (OT) environments."},
+            messages=[{"role": "system", "content": LLM_SYSTEM_PROMPT},
                       {"role": "user", "content": prompt}],
             max_tokens=2048,
             temperature=0.2
@@ -144,6 +333,302 @@ def llm_analysis(prompt, model="gpt-4o", provider=None):
     except Exception as e:
         return {'error': str(e)}
 
+def llm_analysis_stream(prompt, model="gpt-4o", provider=None):
+    """
+    Generator yielding response text as the provider produces it.
+    Unlike llm_analysis, failures are raised rather than returned as {'error': ...}.
+    """
+    provider = resolve_provider(provider)
+    if provider == 'ollama':
+        yield from ollama_llm_stream(prompt, model=resolve_model(provider, model))
+        return
+    if not os.environ.get('OPENAI_API_KEY'):
+        load_openai_key()
+    api_key = os.environ.get('OPENAI_API_KEY')
+    if not api_key or not openai:
+        raise RuntimeError('OpenAI API key not set or openai package not installed.')
+    client = openai.OpenAI(api_key=api_key)
+    response = client.chat.completions.create(
+        model=model,
+        messages=[{"role": "system", "content": LLM_SYSTEM_PROMPT},
+                  {"role": "user", "content": prompt}],
+        max_tokens=2048,
+        temperature=0.2,
+        stream=True
+    )
+    for event in response:
+        if event.choices and event.choices[0].delta.content:
+            yield event.choices[0].delta.content
+
+def cached_llm_analysis(prompt_template, content, model="gpt-4o", provider=None, llm_prompt=None):
+    """
+    Run llm_analysis on prompt_template + content, reusing a cached result when the same
+    normalized content was already analysed with the same prompt, provider and model.
+    llm_prompt overrides the prompt sent for templates that embed the content elsewhere.
+    """
+    effective_provider = resolve_provider(provider)
+    effective_model = resolve_model(effective_provider, model)
+    prompt_ver = prompt_version(prompt_template)
+    key = llm_cache.make_key(content, prompt_ver, effective_provider, effective_model)
+    cached = llm_cache.get(key)
+    if cached is not None:
+        return cached
+    llm_prompt = llm_prompt or (prompt_template + content)
+    llm_result = llm_analysis(llm_prompt, model=model, provider=provider)
+    success = not (isinstance(llm_result, dict) and 'error' in llm_result)
+    try:
+        log_llm_interaction(llm_prompt, llm_result, success, provider, model)
+    except Exception:
+        pass
+    if success and isinstance(llm_result, str):
+        llm_cache.set(key, llm_result, content_hash(content), prompt_ver, effective_provider, effective_model)
+    return llm_result
+
+def cached_llm_analysis_stream(prompt_template, content, model="gpt-4o", provider=None):
+    """
+    Streaming counterpart of cached_llm_analysis: yields text pieces as they arrive.
+    A cache hit is yielded in one piece; a completed stream is logged and cached.
+    """
+    effective_provider = resolve_provider(provider)
+    effective_model = resolve_model(effective_provider, model)
+    prompt_ver = prompt_version(prompt_template)
+    key = llm_cache.make_key(content, prompt_ver, effective_provider, effective_model)
+    cached = llm_cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+    llm_prompt = prompt_template + content
+    pieces = []
+    try:
+        for piece in llm_analysis_stream(llm_prompt, model=model, provider=provider):
+            pieces.append(piece)
+            yield piece
+    except Exception as e:
+        log_llm_interaction(llm_prompt, {'error': str(e)}, False, provider, model)
+        raise
+    llm_result = ''.join(pieces)
+    log_llm_interaction(llm_prompt, llm_result, True, provider, model)
+    if llm_result:
+        llm_cache.set(key, llm_result, content_hash(content), prompt_ver, effective_provider, effective_model)
+
+class InstructionRowParser:
+    """
+    Incrementally pull instruction_analysis rows out of a streamed LLM response.
+    Feed text as it arrives; each complete {...} object inside the array is returned once.
+    """
+
+    START_RE = re.compile(r'```json\s*\[|instruction_analysis\s*[:=]\s*\[')
+
+    def __init__(self):
+        self.buffer = ''
+        self.pos = 0
+        self.in_array = False
+        self.done = False
+        self.depth = 0
+        self.quote = None
+        self.escape = False
+        self.obj_start = None
+
+    def feed(self, text):
+        self.buffer += text
+        rows = []
+        while not self.done:
+            if not self.in_array:
+                match = self.START_RE.search(self.buffer, self.pos)
+                if not match:
+                    # Keep enough tail to match a marker split across pieces
+                    self.pos = max(self.pos, len(self.buffer) - 32)
+                    break
+                self.in_array = True
+                self.pos = match.end()
+            if not self._scan(rows):
+                break
+        return rows
+
+    def _scan(self, rows):
+        """Scan the array from self.pos; returns True if the array closed"""
+        buffer = self.buffer
+        for i in range(self.pos, len(buffer)):
+            ch = buffer[i]
+            if self.quote:
+                if self.escape:
+                    self.escape = False
+                elif ch == '\\':
+                    self.escape = True
+                elif ch == self.quote:
+                    self.quote = None
+            elif ch in '"\'':
+                self.quote = ch
+            elif ch == '{':
+                if self.depth == 0:
+                    self.obj_start = i
+                self.depth += 1
+            elif ch == '}' and self.depth:
+                self.depth -= 1
+                if self.depth == 0:
+                    row = self._parse(buffer[self.obj_start:i + 1])
+                    if row is not None:
+                        rows.append(row)
+            elif ch == ']' and self.depth == 0:
+                # Only the first array is used, matching extract_instruction_analysis
+                self.pos = i + 1
+                self.done = True
+                return True
+        self.pos = len(buffer)
+        return False
+
+    @staticmethod
+    def _parse(text):
+        import ast
+        for parse in (json.loads, ast.literal_eval):
+            try:
+                row = parse(text)
+                if isinstance(row, dict):
+                    return row
+            except Exception:
+                pass
+        return None
+
+def extract_instruction_analysis(llm_result):
+    """Extract the instruction_analysis JSON array from an LLM response, if present"""
+    import re
+    import ast
+    instruction_analysis = []
+    if isinstance(llm_result, str):
+        # Try to extract JSON code block for instruction_analysis
+        json_block = None
+        json_match = re.search(r'```json\s*(\[.*?\])\s*```', llm_result, re.DOTALL)
+        if json_match:
+            json_block = json_match.group(1)
+        else:
+            # Fallback: look for instruction_analysis: [ ... ]
+            match = re.search(r'instruction_analysis\s*[:=]\s*(\[.*?\])', llm_result, re.DOTALL)
+            if match:
+                json_block = match.group(1)
+        if json_block:
+            try:
+                arr = ast.literal_eval(json_block)
+                if isinstance(arr, list):
+                    instruction_analysis = arr
+            except Exception:
+                try:
+                    arr = json.loads(json_block)
+                    if isinstance(arr, list):
+                        instruction_analysis = arr
+                except Exception:
+                    pass
+    return instruction_analysis
+
+def analyze_chunks(prompt_template, chunks, model="gpt-4o", provider=None, max_workers=None):
+    """Send each chunk to the LLM concurrently (bounded pool); results are returned in chunk order"""
+    max_workers = max(1, min(max_workers or LLM_MAX_WORKERS, len(chunks)))
+    if max_workers == 1:
+        return [cached_llm_analysis(prompt_template, chunk['text'], model, provider) for chunk in chunks]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(lambda chunk: cached_llm_analysis(prompt_template, chunk['text'], model, provider), chunks))
+
+def merge_chunk_results(chunks, llm_results):
+    """
+    Merge per-chunk LLM responses into a single llm_results string and instruction_analysis array.
+    If every chunk failed the first error dict is returned in place of the text.
+    """
+    instruction_analysis = []
+    seen = set()
+    for llm_result in llm_results:
+        for row in extract_instruction_analysis(llm_result):
+            marker = json.dumps(row, sort_keys=True, default=str)
+            if marker not in seen:
+                seen.add(marker)
+                instruction_analysis.append(row)
+    errors = [r for r in llm_results if not isinstance(r, str)]
+    if len(errors) == len(llm_results):
+        return errors[0], instruction_analysis
+    if len(llm_results) == 1:
+        return llm_results[0], instruction_analysis
+    sections = []
+    for chunk, llm_result in zip(chunks, llm_results):
+        body = llm_result if isinstance(llm_result, str) else f"Analysis failed for this part: {llm_result.get('error', llm_result)}"
+        sections.append(f"## Part {chunk['index'] + 1}/{len(chunks)}: {chunk['name']}\n\n{body}")
+    return '\n\n---\n\n'.join(sections), instruction_analysis
+
+def chunked_llm_analysis(prompt_template, file_content, model="gpt-4o", provider=None, chunks=None):
+    """Chunk file_content on block/network boundaries (unless chunks are given), analyse in parallel and merge the results"""
+    chunks = chunks or chunk_content(file_content)
+    llm_results = analyze_chunks(prompt_template, chunks, model, provider)
+    return merge_chunk_results(chunks, llm_results)
+
+def incremental_llm_analysis(prompt_template, program, model="gpt-4o", provider=None):
+    """
+    Analyse a program model block by block. Blocks whose normalized hash already has a stored
+    result for this prompt/provider/model are reused; only new or changed blocks go to the LLM.
+    Returns (llm_results, instruction_analysis, reuse stats).
+    """
+    effective_provider = resolve_provider(provider)
+    effective_model = resolve_model(effective_provider, model)
+    prompt_ver = prompt_version(prompt_template)
+    stored = {}
+    try:
+        stored = get_block_analyses([b.hash for b in program.blocks], prompt_ver, effective_provider, effective_model)
+    except Exception as e:
+        print(f"[DEBUG] block analysis lookup failed, analysing all blocks: {e}", file=sys.stderr)
+    # Identical blocks (same hash) are only analysed once
+    pending = {}
+    for block in program.blocks:
+        if block.hash not in stored and block.hash not in pending:
+            pending[block.hash] = block
+    flat_chunks, owners = [], []
+    for block_hash, block in pending.items():
+        for chunk in chunk_units([(block.name, block.text, block.parts)]):
+            flat_chunks.append(chunk)
+            owners.append(block_hash)
+    flat_results = analyze_chunks(prompt_template, flat_chunks, model, provider) if flat_chunks else []
+    fresh = {}
+    for block_hash, block in pending.items():
+        block_chunks = [c for c, owner in zip(flat_chunks, owners) if owner == block_hash]
+        block_results = [r for r, owner in zip(flat_results, owners) if owner == block_hash]
+        fresh[block_hash], _ = merge_chunk_results(block_chunks, block_results)
+    new_entries = [
+        {'block_hash': block_hash, 'block_name': block.name, 'block_kind': block.kind,
+         'llm_result': fresh[block_hash], 'instruction_analysis': extract_instruction_analysis(fresh[block_hash])}
+        for block_hash, block in pending.items() if isinstance(fresh[block_hash], str)
+    ]
+    try:
+        save_block_analyses(new_entries, prompt_ver, effective_provider, effective_model)
+    except Exception as e:
+        print(f"[DEBUG] saving block analyses failed: {e}", file=sys.stderr)
+    chunks = [{'name': block.name, 'index': i} for i, block in enumerate(program.blocks)]
+    llm_results = [stored[b.hash]['llm_result'] if b.hash in stored else fresh[b.hash] for b in program.blocks]
+    llm_result, instruction_analysis = merge_chunk_results(chunks, llm_results)
+    reuse = {
+        'blocks': len(program.blocks),
+        'reused': sum(1 for b in program.blocks if b.hash in stored),
+        'analyzed': len(pending),
+        'llm_calls': len(flat_chunks),
+    }
+    return llm_result, instruction_analysis, reuse
+
+NO_DIFFERENCES_MESSAGE = "## Overview\nBoth files contain identical logic after normalization (whitespace, comments and timestamps ignored).\n\n## Conclusion\nNo differences found."
+
+def compare_contents(analysis_content, baseline_content, model="gpt-4o", provider=None, max_workers=None):
+    """
+    Diff two PLC programs locally (blocks by name, networks by hash) and send only the changed
+    hunks to the LLM for security interpretation.
+    Returns (llm_comparison, structural diff); llm_comparison is an error dict if every LLM call failed.
+    """
+    diff = diff_contents(baseline_content, analysis_content)
+    if not has_changes(diff):
+        return NO_DIFFERENCES_MESSAGE, public_diff(diff)
+    summary = diff['summary']
+    summary_line = (f"Summary: {summary['blocks_added']} block(s) added, {summary['blocks_removed']} removed, "
+                    f"{summary['blocks_modified']} modified, {summary['blocks_unchanged']} unchanged; "
+                    f"{summary['instructions_added']} instruction(s) added, {summary['instructions_removed']} removed.\n\n")
+    chunks = chunk_units(diff_hunk_units(diff))
+    for chunk in chunks:
+        chunk['text'] = summary_line + chunk['text']
+    llm_results = analyze_chunks(COMPARE_PROMPT, chunks, model, provider, max_workers)
+    llm_comparison, _ = merge_chunk_results(chunks, llm_results)
+    return llm_comparison, public_diff(diff)
+
 def ensure_analysis_fields(analysis):
     # Ensure the input is a dictionary
     if not isinstance(analysis, dict):
@@ -183,72 +668,171 @@ def ensure_analysis_fields(analysis):
         analysis['llm_results'] = ''
     return analysis
 
-def analyze_file_content(file_content, provider=None):
+def merge_instruction_rows(*row_lists):
+    """Concatenate instruction_analysis arrays, dropping exact duplicates"""
+    merged, seen = [], set()
+    for rows in row_lists:
+        for row in rows or []:
+            marker = json.dumps(row, sort_keys=True, default=str)
+            if marker not in seen:
+                seen.add(marker)
+                merged.append(row)
+    return merged
+
+def scan_program(program):
+    """Pattern hits of each block (L5X routine) of a program, numbered from the block's first line"""
+    rows = []
+    for block in program.blocks:
+        for row in scan_content(block.text):
+            row['line'] += block.first_line - 1
+            rows.append(row)
+    return rows
+
+def rule_triage(file_content, file_name='uploaded_file', escalation=None, program=None):
+    """
+    Run the local rule engine and decide what to send to the LLM.
+    Returns (rule_based result, content to escalate or None when the LLM is skipped).
+    program: the plc_model.ProgramModel of L5X routines; rules and pattern scans then run routine by
+    routine and, unless only suspicious routines are escalated, file_content is escalated as is
+    """
+    escalation = (escalation or LLM_ESCALATION).lower()
+    # Call graph and address readers/writers, shared with the uncalled-block rule and kept in the result
+    xref = build_xref(program) if program is not None else xref_content(file_content)
+    if escalation == 'suspicious':
+        triage = triage_blocks(file_content, xref=xref, program=program)
+        rule_based = rule_based_analysis(file_content, file_name, triage['findings'])
+        rule_based['escalation'] = {
+            'mode': escalation,
+            'suspicious_blocks': [b['name'] for b in triage['suspicious']],
+            'skipped_blocks': len(triage['clean']),
+        }
+        escalate = ''.join(b['text'] for b in triage['suspicious']) or None
+    else:
+        rule_based = rule_based_analysis(file_content, file_name, run_rules(file_content, xref, program))
+        rule_based['escalation'] = {'mode': escalation}
+        escalate = None if escalation == 'none' else file_content
+    rule_based['xref'] = xref.to_dict()
+    # Instruction/address and threat intel pattern hits from the multi-pattern index
+    pattern_rows = scan_program(program) if program is not None else scan_content(file_content)
+    rule_based['pattern_hits'] = len(pattern_rows)
+    rule_based['instruction_analysis'] = merge_instruction_rows(rule_based['instruction_analysis'], pattern_rows)
+    return rule_based, escalate
+
+def build_analysis_result(llm_result, instruction_analysis, rule_based=None):
+    """Combine the rule-based result with merged LLM output into the structure returned by the API"""
+    result = dict(rule_based or rule_based_analysis(''))
+    result['llm_results'] = llm_result
+    result['instruction_analysis'] = merge_instruction_rows(result.get('instruction_analysis'), instruction_analysis)
+    analysis_result = ensure_analysis_fields(result)
+    result_obj = dict(analysis_result)
+    result_obj['ok'] = True
+    return result_obj
+
+LLM_SKIPPED_MESSAGE = 'LLM analysis skipped: no blocks were escalated by the local rule checks.'
+
+def analyze_file_content(file_content, provider=None, escalation=None, file_name='uploaded_file',
+                         prompt_template=API_ANALYSIS_PROMPT, units=None, model="gpt-4o"):
     """
     API-friendly entry point for analyzing PLC file content as a string.
     Returns a dict with analysis results.
+    units: pre-split (name, text, parts) routines, e.g. from l5x_parser.routine_units (may be a generator)
     """
-    rule_based = {
-        "fileName": "uploaded_file",
-        "report": {
-            "category": {
-                "description": "Sample description.",
-                "findings": ["No issues found."],
-                "potential_issues": [],
-                "example_malicious_change": None,
-                "vulnerabilities": []
-            }
-        },
-        "vulnerabilities": [],
-        "recommendations": ["Keep firmware updated."]
-    }
-    llm_prompt = '''\
-You are a senior control systems cybersecurity analyst specialising in industrial automation and PLC threat detection. You have deep expertise in Siemens PCS7/S7 environments, STL/SCL/LAD programming, and cyber-physical attack techniques targeting operational technology (OT) environments.
+    model = model or "gpt-4o"
+    if units is None and detect_format(file_content) == 'l5x':
+        units = split_units(file_content)
+    program = None
+    if units is not None:
+        # L5X is analysed routine by routine as compact rung/ST text rather than raw XML
+        program, file_content = parse_units(units), ''
+    rule_based, llm_content = rule_triage(file_content, file_name, escalation, program)
+    if llm_content is None:
+        return build_analysis_result(LLM_SKIPPED_MESSAGE, [], rule_based)
+    whole_units = program is not None and rule_based['escalation']['mode'] != 'suspicious'
+    if LLM_BLOCK_REUSE:
+        program = program if whole_units else parse_program(llm_content)
+        llm_result, instruction_analysis, reuse = incremental_llm_analysis(prompt_template, program, model=model,
+                                                                           provider=provider)
+        result = build_analysis_result(llm_result, instruction_analysis, rule_based)
+        result['block_reuse'] = reuse
+        result['blocks'] = program.to_dict()['blocks']
+        return result
+    chunks = chunk_units((b.name, b.text, b.parts) for b in program.blocks) if whole_units else None
+    llm_result, instruction_analysis = chunked_llm_analysis(prompt_template, llm_content, model=model,
+                                                            provider=provider, chunks=chunks)
+    return build_analysis_result(llm_result, instruction_analysis, rule_based)
 
-The following function block (FC540) from a Siemens PCS7 system is under investigation for any signs of **malicious logic, embedded threats, unsafe control logic, or suspicious code structures**.
+def analyze_l5x_file(file_path, provider=None, escalation=None, prompt_template=FILE_ANALYSIS_PROMPT):
+    """Analyse an L5X export routine by routine without loading the XML into memory"""
+    return analyze_file_content('', provider=provider, escalation=escalation, file_name=file_path,
+                                prompt_template=prompt_template, units=routine_units(file_path))
 
-You must perform a **complete forensic and quality analysis** of this logic to detect known and novel PLC-based threats. These may include logic bombs, sabotage, unauthorised overrides, covert control logic, payload hiding, and bad engineering practices that weaken system integrity or safety.
+def analyze_file_content_stream(file_content, provider=None, model="gpt-4o", max_workers=None, escalation=None):
+    """
+    Streaming variant of analyze_file_content. Yields (event, data) pairs:
+      start        {'chunks': [{'index', 'name', 'title'}]}
+      delta        {'index', 'text'}            response text as it is generated
+      instruction  {'index', 'row'}             each instruction_analysis row once it is complete
+      chunk_error  {'index', 'error'}
+      chunk_done   {'index'}
+      result       the same dict analyze_file_content returns
+    Chunks are analysed in parallel and their events interleave.
+    """
+    program = parse_units(split_units(file_content)) if detect_format(file_content) == 'l5x' else None
+    if program is not None:
+        file_content = ''
+    rule_based, llm_content = rule_triage(file_content, escalation=escalation, program=program)
+    for row in rule_based['instruction_analysis']:
+        yield 'instruction', {'index': None, 'row': row}
+    if llm_content is None:
+        yield 'start', {'chunks': []}
+        yield 'result', build_analysis_result(LLM_SKIPPED_MESSAGE, [], rule_based)
+        return
+    if program is not None and rule_based['escalation']['mode'] != 'suspicious':
+        chunks = chunk_units((b.name, b.text, b.parts) for b in program.blocks)
+    else:
+        chunks = chunk_content(llm_content)
+    total = len(chunks)
+    yield 'start', {'chunks': [
+        {'index': c['index'], 'name': c['name'], 'title': f"Part {c['index'] + 1}/{total}: {c['name']}"}
+        for c in chunks
+    ]}
+    events = queue.Queue()
 
----
+    def run_chunk(chunk):
+        index = chunk['index']
+        parser = InstructionRowParser()
+        pieces = []
+        try:
+            for piece in cached_llm_analysis_stream(API_ANALYSIS_PROMPT, chunk['text'], model, provider):
+                pieces.append(piece)
+                events.put(('delta', {'index': index, 'text': piece}))
+                for row in parser.feed(piece):
+                    events.put(('instruction', {'index': index, 'row': row}))
+            llm_result = ''.join(pieces)
+        except Exception as e:
+            llm_result = {'error': str(e)}
+            events.put(('chunk_error', {'index': index, 'error': str(e)}))
+        events.put(('chunk_done', {'index': index}))
+        return llm_result
 
-'''
-    llm_prompt += file_content[:4000]
-    llm_result = llm_analysis(llm_prompt, model="gpt-4o", provider=provider)
-    try:
-        log_llm_interaction(llm_prompt, llm_result, not (isinstance(llm_result, dict) and 'error' in llm_result), provider, "gpt-4o")
-    except Exception:
-        pass
-    import re
-    import ast
-    instruction_analysis = []
-    if isinstance(llm_result, str):
-        json_block = None
-        json_match = re.search(r'```json\s*(\[.*?\])\s*```', llm_result, re.DOTALL)
-        if json_match:
-            json_block = json_match.group(1)
-        else:
-            match = re.search(r'instruction_analysis\s*[:=]\s*(\[.*?\])', llm_result, re.DOTALL)
-            if match:
-                json_block = match.group(1)
-        if json_block:
-            try:
-                arr = ast.literal_eval(json_block)
-                if isinstance(arr, list):
-                    instruction_analysis = arr
-            except Exception:
-                try:
-                    import json as _json
-                    arr = _json.loads(json_block)
-                    if isinstance(arr, list):
-                        instruction_analysis = arr
-                except Exception:
-                    pass
-    rule_based['llm_results'] = llm_result
-    rule_based['instruction_analysis'] = instruction_analysis
-    analysis_result = ensure_analysis_fields(rule_based)
-    result_obj = dict(analysis_result)
-    result_obj['ok'] = True
-    return result_obj
+    seen_rows = {json.dumps(row, sort_keys=True, default=str) for row in rule_based['instruction_analysis']}
+    max_workers = max(1, min(max_workers or LLM_MAX_WORKERS, total))
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(run_chunk, chunk) for chunk in chunks]
+        remaining = total
+        while remaining:
+            event, data = events.get()
+            if event == 'chunk_done':
+                remaining -= 1
+            elif event == 'instruction':
+                marker = json.dumps(data['row'], sort_keys=True, default=str)
+                if marker in seen_rows:
+                    continue
+                seen_rows.add(marker)
+            yield event, data
+        llm_results = [future.result() for future in futures]
+    llm_result, instruction_analysis = merge_chunk_results(chunks, llm_results)
+    yield 'result', build_analysis_result(llm_result, instruction_analysis, rule_based)
 
 def main():
     if len(sys.argv) > 1 and sys.argv[1] == '--check-openai':
@@ -265,6 +849,65 @@ def main():
         except Exception as e:
             print(json.dumps({'ok': False, 'error': str(e)}))
         return
+    if len(sys.argv) > 1 and sys.argv[1] == '--llm-cache-stats':
+        print(json.dumps({'ok': True, 'stats': llm_cache.stats()}))
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == '--clear-llm-cache':
+        try:
+            print(json.dumps(llm_cache.clear()))
+        except Exception as e:
+            print(json.dumps({'ok': False, 'error': str(e)}))
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == '--llm-log-page':
+        # Args: [--limit N] [--cursor C] [--provider P] [--model M] [--success true|false] [--since ISO] [--until ISO]
+        def option(name):
+            return sys.argv[sys.argv.index(name) + 1] if name in sys.argv and sys.argv.index(name) + 1 < len(sys.argv) else None
+        try:
+            success = option('--success')
+            print(json.dumps(llm_log.page(
+                limit=int(option('--limit') or 50), cursor=option('--cursor') or None,
+                provider=option('--provider') or None, model=option('--model') or None,
+                success=None if not success else success.lower() == 'true',
+                since=option('--since') or None, until=option('--until') or None)))
+        except Exception as e:
+            print(json.dumps({'ok': False, 'error': str(e)}))
+        return
+    if len(sys.argv) > 2 and sys.argv[1] == '--llm-log-entry':
+        print(json.dumps(llm_log.get(sys.argv[2])))
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == '--llm-log-stats':
+        print(json.dumps({'ok': True, 'stats': llm_log.stats()}))
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == '--clear-llm-log':
+        try:
+            print(json.dumps(llm_log.clear()))
+        except Exception as e:
+            print(json.dumps({'ok': False, 'error': str(e)}))
+        return
+    if len(sys.argv) > 2 and sys.argv[1] == '--rules':
+        try:
+            with open(sys.argv[2], 'r', encoding='utf-8') as f:
+                findings = run_rules(f.read())
+            print(json.dumps({'ok': True, 'findings': findings}))
+        except Exception as e:
+            print(json.dumps({'ok': False, 'error': str(e)}))
+        return
+    if len(sys.argv) > 2 and sys.argv[1] == '--xref':
+        try:
+            with open(sys.argv[2], 'r', encoding='utf-8') as f:
+                xref = xref_content(f.read())
+            print(json.dumps({'ok': True, 'xref': xref.to_dict()}))
+        except Exception as e:
+            print(json.dumps({'ok': False, 'error': str(e)}))
+        return
+    if len(sys.argv) > 2 and sys.argv[1] == '--scan-patterns':
+        try:
+            with open(sys.argv[2], 'r', encoding='utf-8') as f:
+                rows = scan_content(f.read(), include_threat_intel='--no-threat-intel' not in sys.argv)
+            print(json.dumps({'ok': True, 'instruction_analysis': rows}))
+        except Exception as e:
+            print(json.dumps({'ok': False, 'error': str(e)}))
+        return
     if len(sys.argv) > 1 and sys.argv[1] == '--init-db':
         try:
             init_db()
@@ -387,48 +1030,12 @@ def main():
         except Exception as e:
             print(json.dumps({'error': f'Failed to process inputs: {str(e)}'}))
             return
-        llm_prompt = f'''
-You are a senior control systems cybersecurity analyst. Compare the following two PLC code files in detail.
-
-Respond ONLY in the following structured markdown format, using the exact section headers below, in this order. Each section must start with either '## Header' or '**Header**' (both are accepted). If a section has no relevant content, write "None" under the header. Use bullet points, subheaders, code blocks, and tables as appropriate for clarity and professional presentation.
-
----
-ANALYSIS FILE:
-{analysis_content[:4000]}
----
-BASELINE FILE:
-{baseline_content[:4000]}
----
-
-Return your response in this canonical markdown structure:
-
-## Overview
-- Briefly summarize the main purpose and function of each file, and the context of the comparison.
-
-## Structural Differences
-- List and explain all differences in structure, organization, or layout between the two files (e.g., blocks, networks, routines, organization, naming, modularity).
-
-## Logic Differences
-- Detail all differences in logic, control flow, or instruction usage. Highlight any new, missing, or modified instructions, logic bombs, suspicious changes, or functional changes.
-
-## Security and Risk Analysis
-- Analyze all security-relevant differences, including potential vulnerabilities, unsafe logic, sabotage, or covert threats. Use bullet points and subheaders for each key finding.
-
-## Key Risks and Recommendations
-- Summarize the most important risks and provide actionable recommendations. Use a table if appropriate. List each risk and its recommended mitigation.
-
-## Conclusion
-- Provide a concise summary of the overall comparison, including any critical findings or next steps.
-
-If a section has no content, write "None" under the header. Use markdown formatting throughout, and ensure all sections are present and clearly labeled.
-'''
-        llm_result = llm_analysis(llm_prompt, model="gpt-4o", provider=provider)
-        # Log LLM interaction (comparison mode)
-        try:
-            log_llm_interaction(llm_prompt, llm_result, not (isinstance(llm_result, dict) and 'error' in llm_result), provider, "gpt-4o")
-        except Exception:
-            pass
+        llm_comparison, structural_diff = compare_contents(analysis_content, baseline_content, model="gpt-4o", provider=provider)
         # Comparison results are now saved explicitly by user action via save-comparison-result IPC
+        if isinstance(llm_comparison, dict):
+            print(json.dumps({'ok': False, 'error': llm_comparison.get('error', 'Comparison failed'), 'structural_diff': structural_diff}))
+            return
+        print(json.dumps({'ok': True, 'llm_comparison': llm_comparison, 'structural_diff': structural_diff}))
         return
     # If a file path is provided, read and analyze it
     if len(sys.argv) > 1:
@@ -437,6 +1044,21 @@ If a section has no content, write "None" under the header. Use markdown formatt
         # Check for --provider argument
         if len(sys.argv) > 3 and sys.argv[2] == '--provider':
             provider = sys.argv[3]
+        # Local rules decide what reaches the LLM: --rules-only skips it, --escalate-suspicious sends flagged blocks only
+        escalation = None
+        if '--rules-only' in sys.argv:
+            escalation = 'none'
+        elif '--escalate-suspicious' in sys.argv:
+            escalation = 'suspicious'
+        if is_l5x_path(file_path):
+            try:
+                result_obj = analyze_l5x_file(file_path, provider=provider, escalation=escalation)
+            except Exception as e:
+                log_error(f'Failed to parse L5X file {file_path}: {e}')
+                print(json.dumps({'error': f'Failed to parse L5X file: {str(e)}'}))
+                return
+            print(json.dumps(result_obj))
+            return
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
                 file_content = f.read()
@@ -444,158 +1066,9 @@ If a section has no content, write "None" under the header. Use markdown formatt
             log_error(f'Failed to read file {file_path}: {e}')
             print(json.dumps({'error': f'Failed to read file: {str(e)}'}))
             return
-        # Rule-based analysis placeholder (reuse existing result)
-        rule_based = {
-            "fileName": file_path,
-            "report": {
-                "category": {
-                    "description": "Sample description.",
-                    "findings": ["No issues found."],
-                    "potential_issues": [],
-                    "example_malicious_change": None,
-                    "vulnerabilities": []
-                }
-            },
-            "vulnerabilities": [],
-            "recommendations": ["Keep firmware updated."]
-        }
-        # Improved Python-friendly prompt
-        llm_prompt = '''\
-You are a senior control systems cybersecurity analyst specialising in industrial automation and PLC threat detection. You have deep expertise in Siemens PCS7/S7 environments, STL/SCL/LAD programming, and cyber-physical attack techniques targeting operational technology (OT) environments.
-
-The following function block (FC540) from a Siemens PCS7 system is under investigation for any signs of **malicious logic, embedded threats, unsafe control logic, or suspicious code structures**.
-
-You must perform a **complete forensic and quality analysis** of this logic to detect known and novel PLC-based threats. These may include logic bombs, sabotage, unauthorised overrides, covert control logic, payload hiding, and bad engineering practices that weaken system integrity or safety.
-
----
-
-Respond ONLY in the following structured format. Be precise, professional, and concise. Your audience includes ICS engineers, cybersecurity analysts, and operations managers.
-
----
-
-1. EXECUTIVE SUMMARY  
-- Summarise the code's functional intent (if discernible)  
-- Note any high-level safety or security concerns at a glance  
-
----
-
-2. CYBER SECURITY KEY FINDINGS  
-For each issue identified, provide:
-- **Title**: Short description (e.g., "Runtime-triggered Logic Bomb")  
-- **Location**: FC/FB number, network or STL line number  
-- **Threat Behaviour**: Explain step-by-step what the code does  
-- **Risk Level**: [Low, Medium, High, Critical]  
-- **Impact**: Operational and/or safety consequences  
-- **Mitigation**: How to neutralise or remove the threat  
-
-You MUST check for:
-- Hardcoded overrides (e.g., MOV or L/T instructions overwriting DBs or setpoints)
-- Time-delayed triggers using counters, runtime, or process values
-- Covert logic hidden in redundant branches or unused blocks
-- Suppressed alarms (e.g., writing 0 to alarm bits or masking DB alarms)
-- Memory marker misuse (e.g., hidden M-bit toggles or reserved bits)
-- Persistence mechanisms or backdoors (e.g., uncalled FCs, reserved DB usage)
-- Payload hiding (e.g., logic embedded in FBs called conditionally only once)
-- Any logic that could damage equipment, affect product quality, or trigger false signals
-- External command injection risk (e.g., inputs that override operator logic)
-- Signature mismatches, version mismatches, or timestamp oddities
-- Triggers that appear inactive but are activated via indirect markers
-
----
-
-3. GENERAL STRUCTURE OBSERVATIONS  
-- Outline code structure (FCs, DBs, reuse of FBs)  
-- Comment on naming patterns, modularity, and clarity  
-- Identify any undocumented or poorly explained elements  
-
----
-
-4. CODE STRUCTURE & QUALITY REVIEW  
-- Highlight issues like:
-  - Unstructured memory access
-  - Lack of symbolic addressing
-  - Copy-paste logic or repetition
-  - Poor naming conventions
-  - Missing comments for key logic paths
-  - Engineering anti-patterns that increase error risk  
-- Suggest improvements for maintainability, auditability, and clarity
-
----
-
-5. IMPLICATIONS AND RECOMMENDATIONS  
-Provide a table:
-
-| Risk | Description | Recommendation |
-
-Ensure each row is unique, meaningful, and offers a specific mitigation or follow-up.
-
----
-
-6. NEXT STEPS  
-- Recommend immediate and mid-term actions, such as:
-  - Isolate suspect logic
-  - Perform logic diff against trusted baseline
-  - Audit engineering workstation access and project files
-  - Revalidate logic signatures and timestamps
-  - Review linked FCs, OBs, and conditional FB calls
-  - Conduct site-wide scan for similar patterns in other blocks
-
----
-
-7. INSTRUCTION-LEVEL ANALYSIS (REQUIRED)  
-Return a JSON array named `instruction_analysis` with this format:
-
-[
-  {
-    "instruction": "<raw STL or SCL line>",
-    "insight": "<plain-language description>",
-    "risk_level": "<Low|Medium|High|Critical>"
-  }
-]
-
-If a section has no relevant content, write "None".
-
-Now analyse the following PCS7 Function Block logic (partial STL/SCL export):\n'''
-        llm_prompt += file_content[:4000]
-        llm_result = llm_analysis(llm_prompt, model="gpt-4o", provider=provider)
-        # Log LLM interaction (main analysis mode)
-        try:
-            log_llm_interaction(llm_prompt, llm_result, not (isinstance(llm_result, dict) and 'error' in llm_result), provider, "gpt-4o")
-        except Exception:
-            pass
-        # Try to extract instruction_analysis JSON array if present in LLM result
-        import re
-        import ast
-        instruction_analysis = []
-        if isinstance(llm_result, str):
-            # Try to extract JSON code block for instruction_analysis
-            json_block = None
-            json_match = re.search(r'```json\s*(\[.*?\])\s*```', llm_result, re.DOTALL)
-            if json_match:
-                json_block = json_match.group(1)
-            else:
-                # Fallback: look for instruction_analysis: [ ... ]
-                match = re.search(r'instruction_analysis\s*[:=]\s*(\[.*?\])', llm_result, re.DOTALL)
-                if match:
-                    json_block = match.group(1)
-            if json_block:
-                try:
-                    arr = ast.literal_eval(json_block)
-                    if isinstance(arr, list):
-                        instruction_analysis = arr
-                except Exception:
-                    try:
-                        import json as _json
-                        arr = _json.loads(json_block)
-                        if isinstance(arr, list):
-                            instruction_analysis = arr
-                    except Exception:
-                        pass
-        rule_based['llm_results'] = llm_result
-        rule_based['instruction_analysis'] = instruction_analysis
-        analysis_result = ensure_analysis_fields(rule_based)
-        result_obj = dict(analysis_result)
-        result_obj['ok'] = True
+        # Analyse block/network chunks in parallel and merge instruction_analysis arrays
+        result_obj = analyze_file_content(file_content, provider=provider, escalation=escalation,
+                                          file_name=file_path, prompt_template=FILE_ANALYSIS_PROMPT)
         # Do NOT save automatically here; only return the result to the frontend
         print(json.dumps(result_obj))
         return
@@ -1,12 +1,13 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
 import sys
 import os
 import json
 import logging
 import traceback
-from .analyzer import analyze_file_content
+from .analyzer import analyze_file_content, analyze_file_content_stream
 from .db import authenticate_user, create_user, create_session, validate_session, logout_session
+from .jobs import enqueue_job, get_job, get_job_counts, get_runner
 
 print("[DEBUG] Flask app.py loaded", file=sys.stderr)
 
@@ -23,9 +24,23 @@ def handle_exception(e):
     log_exception(e)
     return jsonify({"error": str(e)}), 500
 
-def run_analysis(file_content):
+def run_analysis(file_content, provider=None, model=None):
     # Call the refactored analysis function
-    return analyze_file_content(file_content)
+    return analyze_file_content(file_content, provider=provider, model=model)
+
+def run_analysis_job(job):
+    result = run_analysis(job['content'], provider=job.get('provider'), model=job.get('model'))
+    result['fileName'] = job.get('fileName') or result.get('fileName')
+    return result
+
+JOB_HANDLERS = {'analyze': run_analysis_job}
+
+# Drain the queue as soon as the worker process starts, so jobs queued before a restart run
+# without waiting for a request; if the database is not reachable yet, the next request retries
+try:
+    get_runner(JOB_HANDLERS)
+except Exception as e:
+    log_exception(e)
 
 @app.route("/api/analyze", methods=["POST"])
 def analyze():
@@ -34,8 +49,55 @@ def analyze():
         return jsonify({"ok": False, "error": "No file uploaded"}), 400
     file = request.files['file']
     content = file.read().decode('utf-8')
-    result = run_analysis(content)
-    return jsonify(result)
+    # LLM analysis can take tens of seconds; queue it instead of holding the request worker
+    job_id = enqueue_job(
+        content,
+        file_name=file.filename,
+        provider=request.form.get('provider'),
+        model=request.form.get('model')
+    )
+    get_runner(JOB_HANDLERS).notify()
+    return jsonify({"ok": True, "job_id": job_id, "status": "queued", "status_url": f"/api/jobs/{job_id}"}), 202
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@app.route("/api/analyze/stream", methods=["POST"])
+def analyze_stream():
+    print("[DEBUG] /api/analyze/stream called", file=sys.stderr)
+    if 'file' not in request.files:
+        return jsonify({"ok": False, "error": "No file uploaded"}), 400
+    file = request.files['file']
+    content = file.read().decode('utf-8')
+    provider = request.form.get('provider')
+
+    def generate():
+        try:
+            for event, data in analyze_file_content_stream(content, provider=provider):
+                if event == 'result':
+                    data['fileName'] = file.filename or data.get('fileName')
+                yield sse_event(event, data)
+        except Exception as e:
+            log_exception(e)
+            yield sse_event('error', {'ok': False, 'error': str(e)})
+        yield sse_event('done', {})
+
+    # Disable proxy buffering so events reach the client as they are produced
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    # Make sure this worker also drains the queue (e.g. jobs left over from a restart)
+    get_runner(JOB_HANDLERS)
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({"ok": False, "error": "Job not found"}), 404
+    return jsonify({"ok": True, "job": job})
+
+@app.route("/api/jobs", methods=["GET"])
+def job_counts():
+    return jsonify({"ok": True, "counts": get_job_counts()})
 
 @app.route("/api/health", methods=["GET"])
 def health():
@@ -46,18 +108,23 @@ def health():
 def db_health():
     print("[DEBUG] /api/db-health called", file=sys.stderr)
     try:
-        from .db import get_connection
+        from .db import get_connection, get_pool_stats
         conn = get_connection()
         cur = conn.cursor()
         cur.execute("SELECT 1;")
         cur.fetchone()
         cur.close()
         conn.close()
-        return jsonify({"ok": True, "message": "Database connection successful."})
+        return jsonify({"ok": True, "message": "Database connection successful.", "pool": get_pool_stats()["pool"]})
     except Exception as e:
         log_exception(e)
         return jsonify({"ok": False, "error": str(e)}), 500
 
+@app.route("/api/db-pool-stats", methods=["GET"])
+def db_pool_stats():
+    from .db import get_pool_stats
+    return jsonify(get_pool_stats())
+
 @app.route("/api/auth/login", methods=["POST"])
 def api_login():
     data = request.get_json()
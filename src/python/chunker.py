@@ -0,0 +1,175 @@
+"""
+Chunking engine for PLC exports
+Splits STL/SCL source and L5X exports on block and network boundaries so large
+files can be analysed in parallel instead of being truncated
+"""
+
+import os
+import re
+import sys
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterable, List, Tuple
+
+sys.path.append(os.path.dirname(__file__))
+from l5x_parser import routine_units
+
+MAX_CHUNK_CHARS = int(os.environ.get('LLM_CHUNK_CHARS', 4000))
+
+# Siemens STL/SCL source blocks
+BLOCK_START_RE = re.compile(
+    r'^[ \t]*(ORGANIZATION_BLOCK|FUNCTION_BLOCK|FUNCTION|DATA_BLOCK|TYPE)[ \t]+("[^"\r\n]+"|[A-Za-z_][\w.]*(?:[ \t]+\d+)?)',
+    re.IGNORECASE | re.MULTILINE
+)
+BLOCK_END_RE = re.compile(
+    r'^[ \t]*END_(ORGANIZATION_BLOCK|FUNCTION_BLOCK|FUNCTION|DATA_BLOCK|TYPE)\b.*$',
+    re.IGNORECASE | re.MULTILINE
+)
+NETWORK_RE = re.compile(r'^[ \t]*(NETWORK\b|Network[ \t]+\d+)', re.IGNORECASE | re.MULTILINE)
+
+# Rockwell L5X exports
+L5X_MARKER_RE = re.compile(r'<RSLogix5000Content|<Routine\b', re.IGNORECASE)
+L5X_ROUTINE_RE = re.compile(r'<Routine\b[^>]*?\bName="([^"]*)"[^>]*?(?:/>|>.*?</Routine>)', re.DOTALL)
+L5X_RUNG_RE = re.compile(r'<Rung\b.*?</Rung>', re.DOTALL)
+
+def detect_format(content: str) -> str:
+    """Return 'l5x' for Rockwell XML exports, otherwise 'text' (STL/SCL source)"""
+    return 'l5x' if L5X_MARKER_RE.search(content[:20000]) else 'text'
+
+def block_kind_and_name(header: str) -> Tuple[str, str]:
+    """Parse a block header line such as 'FUNCTION FC 540 : VOID' into ('FUNCTION', 'FC 540')"""
+    match = BLOCK_START_RE.match(header)
+    if not match:
+        return '', header.strip()
+    return match.group(1).upper(), match.group(2).strip().strip('"')
+
+def split_blocks(content: str) -> List[Tuple[str, str]]:
+    """Split STL/SCL source into (name, text) blocks; text outside any block is kept as its own entry"""
+    blocks = []
+    pos = 0
+    while True:
+        start = BLOCK_START_RE.search(content, pos)
+        if not start:
+            break
+        if content[pos:start.start()].strip():
+            blocks.append(('header' if not blocks else 'interblock', content[pos:start.start()]))
+        end = BLOCK_END_RE.search(content, start.end())
+        stop = end.end() if end else len(content)
+        _, name = block_kind_and_name(start.group(0))
+        blocks.append((name, content[start.start():stop]))
+        pos = stop
+    if content[pos:].strip():
+        blocks.append(('header' if not blocks else 'trailer', content[pos:]))
+    return blocks
+
+def split_networks(block_text: str) -> List[str]:
+    """Split a block into its declaration/preamble followed by one entry per network"""
+    starts = [m.start() for m in NETWORK_RE.finditer(block_text)]
+    if not starts:
+        return [block_text]
+    parts = [block_text[:starts[0]]] if block_text[:starts[0]].strip() else []
+    for i, start in enumerate(starts):
+        end = starts[i + 1] if i + 1 < len(starts) else len(block_text)
+        parts.append(block_text[start:end])
+    return parts
+
+def split_l5x_routines(content: str) -> List[Tuple[str, str]]:
+    """Split an L5X export into (routine name, routine XML) entries"""
+    routines = [(m.group(1), m.group(0)) for m in L5X_ROUTINE_RE.finditer(content)]
+    return routines or [('export', content)]
+
+def split_l5x_rungs(routine_xml: str) -> List[str]:
+    """Split a routine into its rungs (falls back to the whole routine for ST/FBD)"""
+    rungs = L5X_RUNG_RE.findall(routine_xml)
+    return rungs or [routine_xml]
+
+def _split_lines(text: str, max_chars: int) -> List[str]:
+    """Last resort for a single network/rung bigger than the budget: cut on line boundaries"""
+    pieces, current = [], ''
+    for line in text.splitlines(keepends=True):
+        while len(line) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ''
+            pieces.append(line[:max_chars])
+            line = line[max_chars:]
+        if len(current) + len(line) > max_chars and current:
+            pieces.append(current)
+            current = ''
+        current += line
+    if current:
+        pieces.append(current)
+    return pieces
+
+def _pack(parts: List[str], max_chars: int, prefix: str = '') -> List[str]:
+    """Greedily pack consecutive parts into pieces no longer than max_chars"""
+    budget = max(max_chars - len(prefix), 1)
+    pieces, current = [], ''
+    for part in parts:
+        if len(part) > budget:
+            if current:
+                pieces.append(current)
+                current = ''
+            pieces.extend(_split_lines(part, budget))
+            continue
+        if len(current) + len(part) > budget and current:
+            pieces.append(current)
+            current = ''
+        current += part
+    if current:
+        pieces.append(current)
+    return [prefix + piece if i and prefix else piece for i, piece in enumerate(pieces)]
+
+def split_units(content: str) -> List[Tuple[str, str, List[str]]]:
+    """Return (name, text, sub-parts) for each block or routine in the content"""
+    if detect_format(content) == 'l5x':
+        try:
+            # Routines as compact rung/ST text from the streaming parser
+            units = list(routine_units(content))
+            if units:
+                return units
+        except ET.ParseError:
+            pass
+        # Fragments that are not well-formed XML fall back to the regex split
+        return [(name, text, split_l5x_rungs(text)) for name, text in split_l5x_routines(content)]
+    return [(name, text, split_networks(text)) for name, text in split_blocks(content)]
+
+def chunk_content(content: str, max_chars: int = MAX_CHUNK_CHARS) -> List[Dict]:
+    """
+    Split content into analysis chunks of at most max_chars.
+    Small blocks are packed together; large blocks are split on network/rung boundaries,
+    with the block header repeated on continuation chunks for context.
+    """
+    chunks = chunk_units(split_units(content), max_chars)
+    if not chunks:
+        chunks.append({'name': 'content', 'text': content, 'index': 0})
+    return chunks
+
+def chunk_units(units: Iterable[Tuple[str, str, List[str]]], max_chars: int = MAX_CHUNK_CHARS) -> List[Dict]:
+    """Pack (name, text, parts) units into chunks; units may be a generator (e.g. l5x_parser.routine_units)"""
+    chunks = []
+    pending_names, pending_text = [], ''
+
+    def flush():
+        nonlocal pending_names, pending_text
+        if pending_text.strip():
+            chunks.append({'name': ', '.join(pending_names), 'text': pending_text})
+        pending_names, pending_text = [], ''
+
+    for name, text, parts in units:
+        if len(text) <= max_chars:
+            if len(pending_text) + len(text) > max_chars:
+                flush()
+            pending_names.append(name)
+            pending_text += text
+            continue
+        flush()
+        header_line = text.lstrip().splitlines()[0] if text.strip() else ''
+        prefix = f"{header_line}\n// ... continued ...\n" if header_line else ''
+        pieces = _pack(parts, max_chars, prefix)
+        for i, piece in enumerate(pieces):
+            label = f"{name} (part {i + 1}/{len(pieces)})" if len(pieces) > 1 else name
+            chunks.append({'name': label, 'text': piece})
+    flush()
+    for i, chunk in enumerate(chunks):
+        chunk['index'] = i
+    return chunks
@@ -3,178 +3,88 @@ print("[DEBUG] db.py loaded", file=sys.stderr)
 
 import os
 import psycopg2
+import psycopg2.extras
 import json
+import re
 from datetime import datetime, timedelta
 import sys
 import hashlib
 import secrets
+import base64
 import bcrypt
+import threading
+sys.path.append(os.path.dirname(__file__))
+from db_pool import pool_from_env
+from migrations import migrate, get_schema_version, LATEST_VERSION
 
 # Load database URL from environment variable
 DB_URL = os.getenv('NEON_DATABASE_URL')
 print(f"[DEBUG] NEON_DATABASE_URL={DB_URL}", file=sys.stderr)
 
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Get the process-wide connection pool (recreated after fork, e.g. in gunicorn workers)"""
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = pool_from_env(DB_URL)
+                _pool_pid = os.getpid()
+    return _pool
+
 def get_connection():
-    """Get a new database connection"""
-    return psycopg2.connect(DB_URL)
+    """Get a pooled database connection; closing it or leaving its `with` block returns it to the pool"""
+    return get_pool().getconn()
+
+def get_pool_stats() -> dict:
+    """Connection pool usage statistics (in use, idle, waits, wait time, ...)"""
+    return {'ok': True, 'pool': get_pool().stats()}
+
+_schema_ready = False
 
 def init_db():
+    """Bring the schema up to date; after the first call in a process this is a no-op"""
+    global _schema_ready
+    if _schema_ready:
+        return {'ok': True, 'version': LATEST_VERSION, 'applied': []}
     with get_connection() as conn:
-        c = conn.cursor()
-        
-        # Users table for authentication
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id SERIAL PRIMARY KEY,
-                username TEXT UNIQUE NOT NULL,
-                email TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                salt TEXT NOT NULL,
-                created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                last_login TIMESTAMPTZ,
-                is_active BOOLEAN DEFAULT TRUE,
-                role TEXT DEFAULT 'user',
-                failed_login_attempts INTEGER DEFAULT 0,
-                locked_until TIMESTAMPTZ
-            )
-        ''')
-        
-        # Sessions table for session management
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS user_sessions (
-                id SERIAL PRIMARY KEY,
-                user_id INTEGER NOT NULL,
-                session_token TEXT UNIQUE NOT NULL,
-                created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                expires_at TIMESTAMPTZ NOT NULL,
-                is_active BOOLEAN DEFAULT TRUE,
-                FOREIGN KEY(user_id) REFERENCES users(id)
-            )
-        ''')
-        
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS analyses (
-                id SERIAL PRIMARY KEY,
-                fileName TEXT,
-                date TIMESTAMPTZ,
-                status TEXT,
-                analysis_json TEXT,
-                filePath TEXT,
-                analysis_hash TEXT,
-                provider TEXT,
-                model TEXT,
-                user_id INTEGER,
-                FOREIGN KEY(user_id) REFERENCES users(id)
-            )
-        ''')
-        
-        # Migration: add user_id to analyses if missing
-        try:
-            c.execute('ALTER TABLE analyses ADD COLUMN user_id INTEGER')
-        except Exception:
-            pass  # Already exists
-            
-        # Add analysis_json to baselines if not present
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS baselines (
-                id SERIAL PRIMARY KEY,
-                fileName TEXT,
-                originalName TEXT,
-                date TIMESTAMPTZ,
-                filePath TEXT,
-                analysis_json TEXT,
-                analysis_hash TEXT,
-                provider TEXT,
-                model TEXT,
-                user_id INTEGER,
-                FOREIGN KEY(user_id) REFERENCES users(id)
-            )
-        ''')
-        
-        # Migration: add user_id to baselines if missing
-        try:
-            c.execute('ALTER TABLE baselines ADD COLUMN user_id INTEGER')
-        except Exception:
-            pass  # Already exists
-        # Migration: add analysis_json if missing
-        try:
-            c.execute('ALTER TABLE baselines ADD COLUMN analysis_json TEXT')
-        except Exception:
-            pass  # Already exists
-        # Migration: add analysis_hash if missing
-        try:
-            c.execute('ALTER TABLE analyses ADD COLUMN analysis_hash TEXT')
-        except Exception:
-            pass  # Already exists
-        try:
-            c.execute('ALTER TABLE baselines ADD COLUMN analysis_hash TEXT')
-        except Exception:
-            pass  # Already exists
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS comparison_history (
-                id SERIAL PRIMARY KEY,
-                analysisId INTEGER,
-                baselineId INTEGER,
-                timestamp TIMESTAMPTZ,
-                llm_prompt TEXT,
-                llm_result TEXT,
-                FOREIGN KEY(analysisId) REFERENCES analyses(id),
-                FOREIGN KEY(baselineId) REFERENCES baselines(id)
-            )
-        ''')
-        # Migration: add analysisFileName and baselineFileName if missing
-        try:
-            c.execute('ALTER TABLE comparison_history ADD COLUMN analysisFileName TEXT')
-        except Exception:
-            pass  # Already exists
-        try:
-            c.execute('ALTER TABLE comparison_history ADD COLUMN baselineFileName TEXT')
-        except Exception:
-            pass  # Already exists
-        # Migration: add provider and model columns if missing
-        try:
-            c.execute('ALTER TABLE comparison_history ADD COLUMN provider TEXT')
-        except Exception:
-            pass  # Already exists
-        try:
-            c.execute('ALTER TABLE comparison_history ADD COLUMN model TEXT')
-        except Exception:
-            pass  # Already exists
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS ot_threat_intel (
-                id TEXT PRIMARY KEY,
-                title TEXT,
-                summary TEXT,
-                source TEXT,
-                retrieved_at TEXT,
-                affected_vendors TEXT,
-                threat_type TEXT,
-                severity TEXT,
-                industrial_protocols TEXT,
-                system_targets TEXT,
-                tags TEXT,
-                created_at TEXT,
-                updated_at TEXT,
-                site_relevance TEXT,
-                response_notes TEXT,
-                llm_response TEXT
-            )
-        ''')
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS audit_log (
-                id SERIAL PRIMARY KEY,
-                timestamp TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                action TEXT,
-                user TEXT,
-                details TEXT
-            )
-        ''')
-        conn.commit()
+        result = migrate(conn)
+    _schema_ready = True
+    return result
+
+def get_db_schema_version() -> dict:
+    with get_connection() as conn:
+        return {'ok': True, 'version': get_schema_version(conn), 'latest': LATEST_VERSION}
 
 def get_analysis_hash(analysis_json):
     # Use a stable hash of the analysis_json for uniqueness
     return hashlib.sha256(json.dumps(analysis_json, sort_keys=True).encode('utf-8')).hexdigest() if analysis_json else None
 
+THREAT_INTEL_FINGERPRINT_FIELDS = ['title', 'summary', 'source', 'threat_type', 'severity',
+                                   'affected_vendors', 'industrial_protocols', 'system_targets', 'tags']
+
+def threat_intel_fingerprint(entry):
+    """
+    Content fingerprint of a threat intel entry as ingested; list fields are hashed in their stored JSON form.
+    Mirrors the SQL backfill in migration 3, so both must change together.
+    """
+    values = {
+        'title': entry.get('title'),
+        'summary': entry.get('summary'),
+        'source': entry.get('source'),
+        'threat_type': entry.get('threat_type'),
+        'severity': entry.get('severity'),
+        'affected_vendors': json.dumps(entry.get('affected_vendors', [])),
+        'industrial_protocols': json.dumps(entry.get('industrial_protocols', [])),
+        'system_targets': json.dumps(entry.get('system_targets', [])),
+        'tags': json.dumps(entry.get('tags', [])),
+    }
+    joined = '\x1f'.join(values[field] or '' for field in THREAT_INTEL_FINGERPRINT_FIELDS)
+    return hashlib.md5(joined.encode('utf-8')).hexdigest()
+
 # === USER AUTHENTICATION FUNCTIONS ===
 
 def hash_password(password: str) -> tuple[str, str]:
@@ -508,16 +418,172 @@ def save_analysis(file_name, status, analysis_json, file_path=None, provider=Non
     with get_connection() as conn:
         c = conn.cursor()
         analysis_hash = get_analysis_hash(analysis_json)
-        # Uniqueness check: do not insert if an analysis with the same fileName, filePath, and hash exists
-        c.execute('''SELECT id FROM analyses WHERE fileName = %s AND (filePath = %s OR (%s IS NULL AND filePath IS NULL)) AND analysis_hash = %s''', (file_name, file_path, file_path, analysis_hash))
-        if c.fetchone():
-            return None  # Already exists, do not insert duplicate
+        # Uniqueness on (fileName, filePath, hash) is enforced by uq_analyses_file_hash; duplicates return None
         c.execute('''
             INSERT INTO analyses (fileName, date, status, analysis_json, filePath, analysis_hash, provider, model)
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT (fileName, (COALESCE(filePath, '')), analysis_hash) DO NOTHING
+            RETURNING id
         ''', (file_name, datetime.now().isoformat(), status, json.dumps(analysis_json), file_path, analysis_hash, provider, model))
+        row = c.fetchone()
+        if row and isinstance(analysis_json, dict) and analysis_json.get('xref'):
+            _insert_xref(c, row[0], analysis_json['xref'])
         conn.commit()
-        return c.lastrowid
+        return row[0] if row else None
+
+def save_analyses_batch(entries):
+    """
+    Insert many analyses in one transaction. Entries are dicts with file_name, status, analysis_json
+    and optional file_path, provider, model, blob_sha. Returns one id per entry (None for duplicates).
+    """
+    if not entries:
+        return []
+    init_db()
+    now = datetime.now().isoformat()
+    rows = [
+        (e['file_name'], now, e.get('status', 'completed'), json.dumps(e['analysis_json']), e.get('file_path'),
+         get_analysis_hash(e['analysis_json']), e.get('provider'), e.get('model'), e.get('blob_sha'))
+        for e in entries
+    ]
+    with get_connection() as conn:
+        c = conn.cursor()
+        inserted = psycopg2.extras.execute_values(c, '''
+            INSERT INTO analyses (fileName, date, status, analysis_json, filePath, analysis_hash, provider, model, blob_sha)
+            VALUES %s
+            ON CONFLICT (fileName, (COALESCE(filePath, '')), analysis_hash) DO NOTHING
+            RETURNING id, fileName, COALESCE(filePath, ''), analysis_hash
+        ''', rows, fetch=True)
+        ids = {(name, path, digest): row_id for row_id, name, path, digest in inserted}
+        result = []
+        for entry, row in zip(entries, rows):
+            analysis_id = ids.pop((row[0], row[4] or '', row[5]), None)
+            if analysis_id is not None and isinstance(entry['analysis_json'], dict) and entry['analysis_json'].get('xref'):
+                _insert_xref(c, analysis_id, entry['analysis_json']['xref'])
+            result.append(analysis_id)
+        conn.commit()
+    return result
+
+def get_analyzed_blobs(blob_shas, provider=None):
+    """Blob ids (of the given ones) that already have a stored analysis, optionally for one provider"""
+    blob_shas = list(set(blob_shas))
+    if not blob_shas:
+        return set()
+    init_db()
+    query = 'SELECT DISTINCT blob_sha FROM analyses WHERE blob_sha = ANY(%s)'
+    params = [blob_shas]
+    if provider:
+        query += ' AND provider = %s'
+        params.append(provider)
+    with get_connection() as conn:
+        c = conn.cursor()
+        c.execute(query, params)
+        return {row[0] for row in c.fetchall()}
+
+def get_scan_state(repo_path, branch, kind='changes'):
+    """Last scanned commit of a branch: {'last_commit', 'details', 'scanned_at'} or None"""
+    init_db()
+    with get_connection() as conn:
+        c = conn.cursor()
+        c.execute('''
+            SELECT last_commit, details, scanned_at FROM git_scan_state
+            WHERE repo_path = %s AND branch = %s AND kind = %s
+        ''', (repo_path, branch, kind))
+        row = c.fetchone()
+    if not row:
+        return None
+    return {'last_commit': row[0], 'details': _load_json_column(row[1]), 'scanned_at': _to_iso(row[2])}
+
+def save_scan_state(repo_path, branch, last_commit, details=None, kind='changes'):
+    """Record the commit a branch has been scanned up to"""
+    init_db()
+    with get_connection() as conn:
+        c = conn.cursor()
+        c.execute('''
+            INSERT INTO git_scan_state (repo_path, branch, kind, last_commit, details, scanned_at)
+            VALUES (%s, %s, %s, %s, %s, NOW())
+            ON CONFLICT (repo_path, branch, kind) DO UPDATE SET
+                last_commit = EXCLUDED.last_commit,
+                details = EXCLUDED.details,
+                scanned_at = NOW()
+        ''', (repo_path, branch, kind, last_commit, json.dumps(details) if details is not None else None))
+        conn.commit()
+
+HISTORY_COLUMNS = ('commit_sha', 'author', 'author_email', 'authored_at', 'committed_at',
+                   'file_path', 'change', 'line', 'position', 'op', 'operand', 'instruction')
+
+def save_history(repo_path, rows, branch=None, last_commit=None, details=None):
+    """
+    Insert instruction history rows (dicts with HISTORY_COLUMNS) and, when last_commit is given,
+    advance the branch's 'history' scan state in the same transaction. Returns the rows inserted.
+    """
+    init_db()
+    with get_connection() as conn:
+        c = conn.cursor()
+        inserted = 0
+        if rows:
+            inserted = len(psycopg2.extras.execute_values(c, '''
+                INSERT INTO plc_history (repo_path, commit_sha, author, author_email, authored_at, committed_at,
+                                         file_path, change, line, position, op, operand, instruction)
+                VALUES %s
+                ON CONFLICT (repo_path, commit_sha, file_path, change, line, position) DO NOTHING
+                RETURNING id
+            ''', [(repo_path,) + tuple(row[col] for col in HISTORY_COLUMNS) for row in rows], page_size=1000, fetch=True))
+        if last_commit:
+            c.execute('''
+                INSERT INTO git_scan_state (repo_path, branch, kind, last_commit, details, scanned_at)
+                VALUES (%s, %s, 'history', %s, %s, NOW())
+                ON CONFLICT (repo_path, branch, kind) DO UPDATE SET
+                    last_commit = EXCLUDED.last_commit,
+                    details = EXCLUDED.details,
+                    scanned_at = NOW()
+            ''', (repo_path, branch, last_commit, json.dumps(details) if details is not None else None))
+        conn.commit()
+    return inserted
+
+def find_instruction_history(repo_path=None, op=None, operand=None, instruction=None, file_path=None,
+                             change='added', first=False, limit=100):
+    """
+    Commits that added (or removed) matching instructions, oldest first. op matches the opcode,
+    operand an operand token or tag prefix ('DB12' matches DB12.DBW4 and DB12_Speed, not DB120)
+    and instruction a normalized instruction (a whole rung matches any of its instructions).
+    With first, only the earliest match is returned.
+    """
+    from plc_model import normalize_line
+    from plc_xref import split_instructions
+    init_db()
+    query = f'SELECT {", ".join(HISTORY_COLUMNS)}, repo_path FROM plc_history WHERE TRUE'
+    params = []
+    if repo_path:
+        query += ' AND repo_path = %s'
+        params.append(repo_path)
+    if change:
+        query += ' AND change = %s'
+        params.append(change)
+    if op:
+        query += ' AND op = %s'
+        params.append(op.upper())
+    if operand:
+        query += ' AND operand ~* %s'
+        params.append(r'(^|[^A-Za-z0-9_])' + re.escape(operand.strip()) + r'([^A-Za-z0-9]|$)')
+    if instruction:
+        query += ' AND instruction = ANY(%s)'
+        params.append([parsed[2] for parsed in split_instructions(normalize_line(instruction))])
+    if file_path:
+        query += ' AND file_path = %s'
+        params.append(file_path)
+    query += ' ORDER BY committed_at, id LIMIT %s'
+    params.append(1 if first else limit)
+    with get_connection() as conn:
+        c = conn.cursor()
+        c.execute(query, params)
+        rows = c.fetchall()
+    matches = []
+    for row in rows:
+        match = dict(zip(HISTORY_COLUMNS + ('repo_path',), row))
+        match['authored_at'] = _to_iso(match['authored_at'])
+        match['committed_at'] = _to_iso(match['committed_at'])
+        matches.append(match)
+    return {'ok': True, 'matches': matches, 'count': len(matches)}
 
 def get_analysis(analysis_id):
     with get_connection() as conn:
@@ -596,16 +662,16 @@ def save_baseline(file_name, original_name=None, file_path=None, analysis_json=N
     with get_connection() as conn:
         c = conn.cursor()
         analysis_hash = get_analysis_hash(analysis_json)
-        # Uniqueness check: do not insert if a baseline with the same fileName, filePath, and hash exists
-        c.execute('''SELECT id FROM baselines WHERE fileName = %s AND (filePath = %s OR (%s IS NULL AND filePath IS NULL)) AND analysis_hash = %s''', (file_name, file_path, file_path, analysis_hash))
-        if c.fetchone():
-            return None  # Already exists, do not insert duplicate
+        # Uniqueness on (fileName, filePath, hash) is enforced by uq_baselines_file_hash; duplicates return None
         c.execute('''
             INSERT INTO baselines (fileName, originalName, date, filePath, analysis_json, analysis_hash, provider, model)
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT (fileName, (COALESCE(filePath, '')), analysis_hash) DO NOTHING
+            RETURNING id
         ''', (file_name, original_name or file_name, datetime.now().isoformat(), file_path, json.dumps(analysis_json) if analysis_json else None, analysis_hash, provider, model))
+        row = c.fetchone()
         conn.commit()
-        return c.lastrowid
+        return row[0] if row else None
 
 def get_baseline(baseline_id):
     with get_connection() as conn:
@@ -647,6 +713,143 @@ def list_baselines():
             for row in c.fetchall()
         ]
 
+# === PAGINATED LISTING ===
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+ANALYSIS_SUMMARY_COLUMNS = ['id', 'fileName', 'date', 'status', 'filePath', 'provider', 'model']
+BASELINE_SUMMARY_COLUMNS = ['id', 'fileName', 'originalName', 'date', 'filePath', 'provider', 'model']
+
+def _to_iso(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+def encode_page_cursor(date, row_id) -> str:
+    """Opaque keyset cursor for the (date, id) position of the last row on a page"""
+    raw = json.dumps([_to_iso(date), row_id])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_page_cursor(cursor):
+    """Decode a cursor produced by encode_page_cursor; None/empty means the first page"""
+    if not cursor:
+        return None
+    try:
+        date, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+        return date, int(row_id)
+    except Exception:
+        raise ValueError(f'Invalid page cursor: {cursor}')
+
+def _keyset_page(table, columns, limit, cursor):
+    """
+    Fetch one page ordered by date DESC, id DESC using keyset pagination.
+    Rows without a date come last, ordered by id.
+    """
+    limit = max(1, min(int(limit or DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE))
+    after = decode_page_cursor(cursor)
+    select = f"SELECT {', '.join(columns)} FROM {table}"
+    rows = []
+    with get_connection() as conn:
+        c = conn.cursor()
+        if after is None or after[0] is not None:
+            if after:
+                c.execute(f'{select} WHERE date IS NOT NULL AND (date, id) < (%s::timestamptz, %s) ORDER BY date DESC, id DESC LIMIT %s',
+                          (after[0], after[1], limit + 1))
+            else:
+                c.execute(f'{select} WHERE date IS NOT NULL ORDER BY date DESC, id DESC LIMIT %s', (limit + 1,))
+            rows = c.fetchall()
+        if len(rows) <= limit:
+            if after and after[0] is None:
+                c.execute(f'{select} WHERE date IS NULL AND id < %s ORDER BY id DESC LIMIT %s', (after[1], limit + 1 - len(rows)))
+            else:
+                c.execute(f'{select} WHERE date IS NULL ORDER BY id DESC LIMIT %s', (limit + 1 - len(rows),))
+            rows += c.fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    items = [dict(zip(columns, row)) for row in rows]
+    for item in items:
+        item['date'] = _to_iso(item['date'])
+    next_cursor = encode_page_cursor(rows[-1][columns.index('date')], rows[-1][0]) if has_more else None
+    return items, next_cursor
+
+def _load_json_column(value):
+    if not value:
+        return None
+    try:
+        return json.loads(value) if isinstance(value, str) else value
+    except Exception:
+        return None
+
+def list_analyses_page(limit=DEFAULT_PAGE_SIZE, cursor=None, mode='summary') -> dict:
+    """
+    Keyset-paginated analyses listing.
+    mode='summary' omits analysis_json; mode='full' includes the parsed report.
+    """
+    if mode not in ('summary', 'full'):
+        raise ValueError(f'Invalid listing mode: {mode}')
+    columns = ANALYSIS_SUMMARY_COLUMNS + (['analysis_json'] if mode == 'full' else [])
+    items, next_cursor = _keyset_page('analyses', columns, limit, cursor)
+    if mode == 'full':
+        for item in items:
+            item['analysis_json'] = _load_json_column(item['analysis_json'])
+    return {'ok': True, 'items': items, 'next_cursor': next_cursor, 'has_more': next_cursor is not None, 'mode': mode}
+
+def list_baselines_page(limit=DEFAULT_PAGE_SIZE, cursor=None, mode='summary') -> dict:
+    """Keyset-paginated baselines listing; see list_analyses_page"""
+    if mode not in ('summary', 'full'):
+        raise ValueError(f'Invalid listing mode: {mode}')
+    columns = BASELINE_SUMMARY_COLUMNS + (['analysis_json'] if mode == 'full' else [])
+    items, next_cursor = _keyset_page('baselines', columns, limit, cursor)
+    if mode == 'full':
+        for item in items:
+            item['analysis_json'] = _load_json_column(item['analysis_json'])
+    return {'ok': True, 'items': items, 'next_cursor': next_cursor, 'has_more': next_cursor is not None, 'mode': mode}
+
+def count_analyses(status=None) -> int:
+    with get_connection() as conn:
+        c = conn.cursor()
+        if status:
+            c.execute('SELECT COUNT(*) FROM analyses WHERE status = %s', (status,))
+        else:
+            c.execute('SELECT COUNT(*) FROM analyses')
+        return c.fetchone()[0]
+
+def count_baselines() -> int:
+    with get_connection() as conn:
+        c = conn.cursor()
+        c.execute('SELECT COUNT(*) FROM baselines')
+        return c.fetchone()[0]
+
+def get_analysis_stats() -> dict:
+    """Aggregate counts for dashboards without transferring any report bodies"""
+    with get_connection() as conn:
+        c = conn.cursor()
+        c.execute('SELECT status, provider, COUNT(*), MAX(date) FROM analyses GROUP BY status, provider')
+        rows = c.fetchall()
+        c.execute('SELECT COUNT(*), MAX(date) FROM baselines')
+        baseline_total, baseline_latest = c.fetchone()
+    by_status, by_provider = {}, {}
+    latest = None
+    for status, provider, count, max_date in rows:
+        by_status[status or 'unknown'] = by_status.get(status or 'unknown', 0) + count
+        by_provider[provider or 'unknown'] = by_provider.get(provider or 'unknown', 0) + count
+        if max_date is not None and (latest is None or max_date > latest):
+            latest = max_date
+    return {
+        'ok': True,
+        'analyses': {
+            'total': sum(by_status.values()),
+            'by_status': by_status,
+            'by_provider': by_provider,
+            'latest': _to_iso(latest),
+        },
+        'baselines': {
+            'total': baseline_total,
+            'latest': _to_iso(baseline_latest),
+        },
+    }
+
+# === END PAGINATED LISTING ===
+
 def delete_baseline(baseline_id):
     with get_connection() as conn:
         c = conn.cursor()
@@ -708,29 +911,86 @@ def delete_comparison_history(comparison_id):
         conn.commit()
         return {'ok': True, 'deleted_id': comparison_id}
 
+OT_THREAT_INTEL_INSERT_COLUMNS = (
+    'id, title, summary, source, retrieved_at, affected_vendors, threat_type, severity, industrial_protocols, '
+    'system_targets, tags, created_at, updated_at, site_relevance, response_notes, llm_response, content_fingerprint'
+)
+
+def _ot_threat_intel_row(entry):
+    """Column values for an ot_threat_intel INSERT, in OT_THREAT_INTEL_INSERT_COLUMNS order"""
+    return (
+        entry['id'], entry['title'], entry['summary'], entry['source'], entry['retrieved_at'],
+        json.dumps(entry.get('affected_vendors', [])), entry.get('threat_type'), entry.get('severity'),
+        json.dumps(entry.get('industrial_protocols', [])), json.dumps(entry.get('system_targets', [])),
+        json.dumps(entry.get('tags', [])), entry['created_at'], entry['updated_at'],
+        entry.get('site_relevance'), entry.get('response_notes'), entry.get('llm_response'),
+        threat_intel_fingerprint(entry)
+    )
+
 def save_ot_threat_intel(entry):
     with get_connection() as conn:
         c = conn.cursor()
-        # Prevent duplicate: unique on (title, summary, source, threat_type, severity, affected_vendors, industrial_protocols, system_targets, tags)
-        c.execute('''SELECT id FROM ot_threat_intel WHERE title = %s AND summary = %s AND source = %s AND threat_type = %s AND severity = %s AND affected_vendors = %s AND industrial_protocols = %s AND system_targets = %s AND tags = %s''', (
-            entry['title'], entry['summary'], entry['source'], entry.get('threat_type'), entry.get('severity'),
-            json.dumps(entry.get('affected_vendors', [])), json.dumps(entry.get('industrial_protocols', [])),
-            json.dumps(entry.get('system_targets', [])), json.dumps(entry.get('tags', []))
-        ))
-        if c.fetchone():
-            return None
-        c.execute('''
-            INSERT INTO ot_threat_intel (id, title, summary, source, retrieved_at, affected_vendors, threat_type, severity, industrial_protocols, system_targets, tags, created_at, updated_at, site_relevance, response_notes, llm_response)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        ''', (
-            entry['id'], entry['title'], entry['summary'], entry['source'], entry['retrieved_at'],
-            json.dumps(entry.get('affected_vendors', [])), entry.get('threat_type'), entry.get('severity'),
-            json.dumps(entry.get('industrial_protocols', [])), json.dumps(entry.get('system_targets', [])),
-            json.dumps(entry.get('tags', [])), entry['created_at'], entry['updated_at'],
-            entry.get('site_relevance'), entry.get('response_notes'), entry.get('llm_response')
-        ))
+        # Duplicates (same content fingerprint or id) are skipped by the unique indexes
+        c.execute(f'''
+            INSERT INTO ot_threat_intel ({OT_THREAT_INTEL_INSERT_COLUMNS})
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT DO NOTHING
+            RETURNING id
+        ''', _ot_threat_intel_row(entry))
+        row = c.fetchone()
         conn.commit()
-        return entry['id']
+        return entry['id'] if row else None
+
+def save_ot_threat_intel_batch(entries, audit_action='ingest_ot_threat_intel', audit_user='system', audit_details=None):
+    """
+    Dedup and insert a list of threat intel entries in one transaction with a single multi-row INSERT.
+    Returns per-entry outcomes: inserted, duplicate (already stored), duplicate_in_batch or invalid.
+    One audit_log row is written for the whole batch.
+    """
+    outcomes = []
+    rows = []
+    pending = []
+    seen_ids, seen_fingerprints = set(), set()
+    for index, entry in enumerate(entries):
+        entry_id = entry.get('id') if isinstance(entry, dict) else None
+        try:
+            row = _ot_threat_intel_row(entry)
+        except (KeyError, TypeError, AttributeError) as e:
+            outcomes.append({'index': index, 'id': entry_id, 'status': 'invalid', 'error': f'Missing or invalid field: {e}'})
+            continue
+        fingerprint = row[-1]
+        if entry_id in seen_ids or fingerprint in seen_fingerprints:
+            outcomes.append({'index': index, 'id': entry_id, 'status': 'duplicate_in_batch'})
+            continue
+        seen_ids.add(entry_id)
+        seen_fingerprints.add(fingerprint)
+        rows.append(row)
+        outcome = {'index': index, 'id': entry_id, 'status': 'duplicate'}
+        outcomes.append(outcome)
+        pending.append(outcome)
+    with get_connection() as conn:
+        c = conn.cursor()
+        inserted_ids = set()
+        if rows:
+            inserted = psycopg2.extras.execute_values(
+                c,
+                f'INSERT INTO ot_threat_intel ({OT_THREAT_INTEL_INSERT_COLUMNS}) VALUES %s ON CONFLICT DO NOTHING RETURNING id',
+                rows,
+                page_size=len(rows),
+                fetch=True
+            )
+            inserted_ids = {row[0] for row in inserted}
+        for outcome in pending:
+            if outcome['id'] in inserted_ids:
+                outcome['status'] = 'inserted'
+        counts = {}
+        for outcome in outcomes:
+            counts[outcome['status']] = counts.get(outcome['status'], 0) + 1
+        details = dict(audit_details or {})
+        details.update({'received': len(outcomes), 'counts': counts})
+        _insert_audit(c, audit_action, audit_user, details)
+        conn.commit()
+    return {'ok': True, 'new_entries': counts.get('inserted', 0), 'counts': counts, 'outcomes': outcomes}
 
 def list_ot_threat_intel():
     with get_connection() as conn:
@@ -758,6 +1018,159 @@ def list_ot_threat_intel():
             for row in c.fetchall()
         ]
 
+def get_block_analyses(block_hashes, prompt_version, provider, model):
+    """Stored per-block LLM results for the given normalized block hashes: {hash: {'llm_result', 'instruction_analysis'}}"""
+    block_hashes = list(set(block_hashes))
+    if not block_hashes:
+        return {}
+    init_db()
+    with get_connection() as conn:
+        c = conn.cursor()
+        c.execute('''
+            UPDATE block_analyses SET last_used_at = NOW(), use_count = use_count + 1
+            WHERE block_hash = ANY(%s) AND prompt_version = %s AND provider = %s AND model = %s
+            RETURNING block_hash, llm_result, instruction_analysis
+        ''', (block_hashes, prompt_version, provider, model))
+        rows = c.fetchall()
+        conn.commit()
+    return {
+        row[0]: {'llm_result': row[1], 'instruction_analysis': json.loads(row[2] or '[]')}
+        for row in rows
+    }
+
+def save_block_analyses(entries, prompt_version, provider, model):
+    """Upsert per-block LLM results; entries are dicts with block_hash, block_name, block_kind, llm_result, instruction_analysis"""
+    rows = [
+        (e['block_hash'], prompt_version, provider, model, e.get('block_name'), e.get('block_kind'),
+         e['llm_result'], json.dumps(e.get('instruction_analysis') or []))
+        for e in entries
+    ]
+    if not rows:
+        return 0
+    init_db()
+    with get_connection() as conn:
+        c = conn.cursor()
+        psycopg2.extras.execute_values(c, '''
+            INSERT INTO block_analyses (block_hash, prompt_version, provider, model, block_name, block_kind,
+                                        llm_result, instruction_analysis)
+            VALUES %s
+            ON CONFLICT (block_hash, prompt_version, provider, model) DO UPDATE SET
+                llm_result = EXCLUDED.llm_result,
+                instruction_analysis = EXCLUDED.instruction_analysis,
+                block_name = EXCLUDED.block_name,
+                last_used_at = NOW()
+        ''', rows)
+        conn.commit()
+    return len(rows)
+
+XREF_RELATIONS = {'readers': 'read', 'writers': 'write'}
+
+def _xref_rows(analysis_id, xref):
+    """Flatten a plc_xref.CrossReference.to_dict() into plc_xref rows"""
+    rows = []
+    blocks = xref.get('blocks') or {}
+    for name, entry in blocks.items():
+        rows.append((analysis_id, 'block', name, entry.get('kind'), name, None, entry.get('line'), False))
+        for call in entry.get('calls') or []:
+            rows.append((analysis_id, 'call', name, entry.get('kind'), call['block'], call.get('network'),
+                         call.get('line'), bool(call.get('conditional'))))
+    for address, refs in (xref.get('addresses') or {}).items():
+        for key, relation in XREF_RELATIONS.items():
+            for site in refs.get(key) or []:
+                kind = blocks.get(site['block'], {}).get('kind')
+                rows.append((analysis_id, relation, site['block'], kind, address, site.get('network'),
+                             site.get('line'), False))
+    return rows
+
+def _insert_xref(c, analysis_id, xref):
+    rows = _xref_rows(analysis_id, xref)
+    if rows:
+        psycopg2.extras.execute_values(c, '''
+            INSERT INTO plc_xref (analysis_id, relation, source_block, source_kind, target, network, line, conditional)
+            VALUES %s
+        ''', rows, page_size=1000)
+
+def _xref_site(row):
+    return {'block': row[0], 'kind': row[1], 'network': row[2], 'line': row[3], 'conditional': row[4]}
+
+def get_address_xref(analysis_id, address):
+    """Readers and writers of an address (e.g. 'DB12.DBX4.0', 'M 10.0', '"Motor".run') in a saved analysis"""
+    from plc_xref import canonical_address
+    target = canonical_address(address)
+    with get_connection() as conn:
+        c = conn.cursor()
+        c.execute('''
+            SELECT relation, source_block, source_kind, network, line, conditional FROM plc_xref
+            WHERE analysis_id = %s AND target = %s AND relation IN ('read', 'write')
+            ORDER BY line
+        ''', (analysis_id, target))
+        rows = c.fetchall()
+    return {
+        'ok': True,
+        'address': target,
+        'readers': [_xref_site(row[1:]) for row in rows if row[0] == 'read'],
+        'writers': [_xref_site(row[1:]) for row in rows if row[0] == 'write'],
+    }
+
+def get_block_xref(analysis_id, block):
+    """Callers and callees of a block (e.g. 'FC 12', '"Pump"') in a saved analysis"""
+    from rules import normalize_block_name
+    name = normalize_block_name(block)
+    with get_connection() as conn:
+        c = conn.cursor()
+        c.execute('''
+            SELECT target, source_kind, network, line, conditional FROM plc_xref
+            WHERE analysis_id = %s AND source_block = %s AND relation = 'call' ORDER BY line
+        ''', (analysis_id, name))
+        callees = [_xref_site(row) for row in c.fetchall()]
+        c.execute('''
+            SELECT source_block, source_kind, network, line, conditional FROM plc_xref
+            WHERE analysis_id = %s AND target = %s AND relation = 'call' ORDER BY line
+        ''', (analysis_id, name))
+        callers = [_xref_site(row) for row in c.fetchall()]
+    return {'ok': True, 'block': name, 'calls': callees, 'called_by': callers}
+
+def get_unreachable_blocks(analysis_id, roots=None):
+    """FCs/FBs of a saved analysis that no call chain from roots (default: every OB) reaches"""
+    from rules import normalize_block_name
+    roots = [normalize_block_name(r) for r in roots or []]
+    root_filter = 'source_block = ANY(%s)' if roots else "source_kind = 'ORGANIZATION_BLOCK'"
+    params = [analysis_id] + ([roots] if roots else []) + [analysis_id, analysis_id]
+    with get_connection() as conn:
+        c = conn.cursor()
+        c.execute(f'''
+            WITH RECURSIVE reachable(block) AS (
+                SELECT source_block FROM plc_xref WHERE analysis_id = %s AND relation = 'block' AND {root_filter}
+                UNION
+                SELECT x.target FROM plc_xref x JOIN reachable r ON x.source_block = r.block
+                WHERE x.analysis_id = %s AND x.relation = 'call'
+            )
+            SELECT source_block, source_kind, line FROM plc_xref
+            WHERE analysis_id = %s AND relation = 'block' AND source_kind IN ('FUNCTION', 'FUNCTION_BLOCK')
+              AND source_block NOT IN (SELECT block FROM reachable)
+            ORDER BY line
+        ''', params)
+        rows = c.fetchall()
+    unreachable = [{'block': row[0], 'kind': row[1], 'line': row[2]} for row in rows]
+    return {'ok': True, 'roots': roots or ['OB'], 'unreachable': unreachable}
+
+def list_ot_threat_intel_terms():
+    """Title, severity and the searchable term lists (vendors, protocols, tags) of every threat intel entry"""
+    with get_connection() as conn:
+        c = conn.cursor()
+        c.execute('SELECT id, title, severity, affected_vendors, industrial_protocols, tags FROM ot_threat_intel')
+        return [
+            {
+                'id': row[0],
+                'title': row[1],
+                'severity': row[2],
+                'affected_vendors': json.loads(row[3] or '[]'),
+                'industrial_protocols': json.loads(row[4] or '[]'),
+                'tags': json.loads(row[5] or '[]'),
+            }
+            for row in c.fetchall()
+        ]
+
 def get_ot_threat_intel_last_sync():
     with get_connection() as conn:
         c = conn.cursor()
@@ -765,13 +1178,17 @@ def get_ot_threat_intel_last_sync():
         row = c.fetchone()
         return row[0] if row and row[0] else None
 
+def _insert_audit(c, action, user, details=None):
+    """Write an audit_log row on an existing cursor, as part of the caller's transaction"""
+    c.execute('''
+        INSERT INTO audit_log (timestamp, action, "user", details)
+        VALUES (%s, %s, %s, %s)
+    ''', (datetime.now().isoformat(), action, user, json.dumps(details) if details else None))
+
 def log_audit(action, user, details=None):
     with get_connection() as conn:
         c = conn.cursor()
-        c.execute('''
-            INSERT INTO audit_log (timestamp, action, user, details)
-            VALUES (%s, %s, %s, %s)
-        ''', (datetime.now().isoformat(), action, user, json.dumps(details) if details else None))
+        _insert_audit(c, action, user, details)
         conn.commit()
 
 def update_ot_threat_intel(entry):
@@ -837,6 +1254,27 @@ def main():
         from db import list_baselines
         print(json.dumps(list_baselines()))
         return
+    if len(sys.argv) > 1 and sys.argv[1] in ('--list-analyses-page', '--list-baselines-page'):
+        # Args: [limit] [cursor] [mode]
+        limit = int(sys.argv[2]) if len(sys.argv) > 2 and sys.argv[2] else DEFAULT_PAGE_SIZE
+        cursor = sys.argv[3] if len(sys.argv) > 3 and sys.argv[3] not in ('', 'null', 'None') else None
+        mode = sys.argv[4] if len(sys.argv) > 4 and sys.argv[4] else 'summary'
+        list_page = list_analyses_page if sys.argv[1] == '--list-analyses-page' else list_baselines_page
+        try:
+            print(json.dumps(list_page(limit, cursor, mode)))
+        except ValueError as e:
+            print(json.dumps({'ok': False, 'error': str(e)}))
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == '--count-analyses':
+        status = sys.argv[2] if len(sys.argv) > 2 else None
+        print(json.dumps({'ok': True, 'count': count_analyses(status)}))
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == '--count-baselines':
+        print(json.dumps({'ok': True, 'count': count_baselines()}))
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == '--analysis-stats':
+        print(json.dumps(get_analysis_stats()))
+        return
     if len(sys.argv) > 2 and sys.argv[1] == '--get-baseline':
         from db import get_baseline
         print(json.dumps(get_baseline(int(sys.argv[2]))))
@@ -861,6 +1299,16 @@ def main():
         delete_baseline(int(sys.argv[2]))
         print(json.dumps({'ok': True, 'deleted': sys.argv[2]}))
         return
+    if len(sys.argv) > 3 and sys.argv[1] == '--xref-address':
+        print(json.dumps(get_address_xref(int(sys.argv[2]), sys.argv[3])))
+        return
+    if len(sys.argv) > 3 and sys.argv[1] == '--xref-block':
+        print(json.dumps(get_block_xref(int(sys.argv[2]), sys.argv[3])))
+        return
+    if len(sys.argv) > 2 and sys.argv[1] == '--xref-unreachable':
+        # Args: <analysis_id> [root block ...]
+        print(json.dumps(get_unreachable_blocks(int(sys.argv[2]), sys.argv[3:])))
+        return
     if len(sys.argv) > 2 and sys.argv[1] == '--delete-analysis':
         print(json.dumps(delete_analysis(int(sys.argv[2]))))
         return
@@ -922,6 +1370,15 @@ def main():
         clear_ot_threat_intel()
         print(json.dumps({'ok': True, 'cleared': True}))
         return
+    if len(sys.argv) > 1 and sys.argv[1] == '--migrate':
+        print(json.dumps(init_db()))
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == '--schema-version':
+        print(json.dumps(get_db_schema_version()))
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == '--pool-stats':
+        print(json.dumps(get_pool_stats()))
+        return
     if len(sys.argv) > 1 and sys.argv[1] == '--reset-db':
         from db import clear_all_data
         clear_all_data()
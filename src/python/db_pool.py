@@ -0,0 +1,246 @@
+"""
+Thread-safe PostgreSQL connection pool for PLC Code Checker
+Provides pooled connections with min/max sizing, health checks on checkout,
+idle reaping and usage statistics for monitoring
+"""
+
+import os
+import sys
+import time
+import threading
+from collections import deque
+
+import psycopg2
+import psycopg2.extensions
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the pool timeout"""
+
+class PooledConnection:
+    """
+    Proxy around a pooled psycopg2 connection.
+    Behaves like the raw connection; `with` commits or rolls back like psycopg2 and then
+    returns the connection to the pool, and close() returns it without closing the socket.
+    """
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        conn = self.__dict__.get('_conn')
+        if conn is None:
+            raise psycopg2.InterfaceError('connection already returned to the pool')
+        return getattr(conn, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self._conn is not None and not self._conn.closed:
+                if exc_type is None:
+                    self._conn.commit()
+                else:
+                    self._conn.rollback()
+        finally:
+            self.close()
+        return False
+
+    def close(self):
+        """Return the underlying connection to the pool"""
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._pool.release(conn)
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+class ConnectionPool:
+    """Bounded pool of psycopg2 connections shared by all threads of a process"""
+
+    def __init__(self, dsn, min_size=1, max_size=10, timeout=30.0, max_idle=300.0,
+                 health_check_interval=30.0, connect=psycopg2.connect):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError(f'Invalid pool size: min={min_size}, max={max_size}')
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.health_check_interval = health_check_interval
+        self._connect = connect
+        self._idle = deque()  # (conn, last_used) pairs, most recently used at the right
+        self._size = 0
+        self._in_use = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+            'timeouts': 0,
+            'connections_created': 0,
+            'connections_closed': 0,
+            'health_check_failures': 0,
+            'reaped': 0,
+        }
+        self._reaper = None
+        if max_idle and max_idle > 0:
+            self._reaper = threading.Thread(target=self._reap_loop, name='db-pool-reaper', daemon=True)
+            self._reaper.start()
+
+    def getconn(self) -> PooledConnection:
+        """Check out a healthy connection, waiting up to `timeout` seconds if the pool is exhausted"""
+        started = time.monotonic()
+        waited = False
+        conn = None
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise psycopg2.InterfaceError('connection pool is closed')
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    last_used = None
+                    break
+                waited = True
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeout(f'No database connection available within {self.timeout}s '
+                                      f'(pool max_size={self.max_size})')
+                self._cond.wait(remaining)
+            self._in_use += 1
+            self._stats['checkouts'] += 1
+            if waited:
+                wait_time = time.monotonic() - started
+                self._stats['waits'] += 1
+                self._stats['wait_time_total'] += wait_time
+                self._stats['wait_time_max'] = max(self._stats['wait_time_max'], wait_time)
+        try:
+            if conn is not None and not self._is_healthy(conn, last_used):
+                self._discard(conn)
+                conn = None
+                with self._cond:
+                    self._stats['health_check_failures'] += 1
+                    self._stats['connections_closed'] += 1
+            if conn is None:
+                conn = self._connect(self.dsn)
+                with self._cond:
+                    self._stats['connections_created'] += 1
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._size -= 1
+                self._cond.notify()
+            raise
+        return PooledConnection(self, conn)
+
+    def _is_healthy(self, conn, last_used) -> bool:
+        """Cheap status check on every checkout; a round-trip ping only after the connection sat idle"""
+        if conn.closed:
+            return False
+        if conn.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if last_used is not None and time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            cur = conn.cursor()
+            cur.execute('SELECT 1')
+            cur.close()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def release(self, conn):
+        """Return a connection to the pool, resetting any open transaction"""
+        healthy = not conn.closed
+        if healthy and conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except Exception:
+                healthy = False
+        with self._cond:
+            self._in_use -= 1
+            if healthy and not self._closed:
+                self._idle.append((conn, time.monotonic()))
+            else:
+                self._size -= 1
+                self._stats['connections_closed'] += 1
+            self._cond.notify()
+        if not healthy or self._closed:
+            self._discard(conn)
+
+    def reap_idle(self):
+        """Close connections idle for longer than max_idle, keeping at least min_size open"""
+        now = time.monotonic()
+        expired = []
+        with self._cond:
+            # Oldest connections sit at the left of the deque
+            while self._idle and self._size > self.min_size and now - self._idle[0][1] > self.max_idle:
+                conn, _ = self._idle.popleft()
+                self._size -= 1
+                expired.append(conn)
+            self._stats['reaped'] += len(expired)
+            self._stats['connections_closed'] += len(expired)
+        for conn in expired:
+            self._discard(conn)
+
+    def _reap_loop(self):
+        interval = max(self.max_idle / 2, 1.0)
+        while not self._closed:
+            time.sleep(interval)
+            try:
+                self.reap_idle()
+            except Exception as e:
+                print(f"[DEBUG] db pool reaper error: {e}", file=sys.stderr)
+
+    def stats(self) -> dict:
+        """Snapshot of pool usage for monitoring"""
+        with self._cond:
+            result = dict(self._stats)
+            result.update({
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self._size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'wait_time_avg': (self._stats['wait_time_total'] / self._stats['waits']) if self._stats['waits'] else 0.0,
+            })
+        return result
+
+    def closeall(self):
+        """Close every idle connection and refuse further checkouts"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+            self._stats['connections_closed'] += len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._discard(conn)
+
+def pool_from_env(dsn) -> ConnectionPool:
+    """Build a pool sized from the DB_POOL_* environment variables"""
+    return ConnectionPool(
+        dsn,
+        min_size=int(os.getenv('DB_POOL_MIN_SIZE', 1)),
+        max_size=int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+        timeout=float(os.getenv('DB_POOL_TIMEOUT', 30)),
+        max_idle=float(os.getenv('DB_POOL_MAX_IDLE', 300)),
+        health_check_interval=float(os.getenv('DB_POOL_HEALTH_CHECK_INTERVAL', 30)),
+    )
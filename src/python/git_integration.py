@@ -6,17 +6,330 @@ Provides functionality to connect to Git repositories, browse files, and manage
 import git
 import os
 import json
+import re
 import tempfile
 import shutil
 from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 import subprocess
 import logging
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+DEFAULT_PLC_EXTENSIONS = ['.l5x', '.l5k', '.acd', '.txt', '.json', '.xml']
+
+# Branch batch analysis: concurrent analyses, analyses saved per transaction, largest blob analysed
+BATCH_WORKERS = int(os.environ.get('GIT_BATCH_WORKERS', 4))
+BATCH_SAVE_SIZE = int(os.environ.get('GIT_BATCH_SAVE_SIZE', 20))
+BATCH_MAX_BYTES = int(os.environ.get('GIT_BATCH_MAX_BYTES', 20 * 1024 * 1024))
+
+# Repository status reuse window (0 disables the cache); the cache is also dropped when the index or HEAD change
+STATUS_CACHE_TTL = float(os.environ.get('GIT_STATUS_CACHE_TTL', 2))
+STATUS_CACHE_DIR = os.environ.get('GIT_STATUS_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'plc_git_status'))
+
+# History scan: commit separator in the git log output, unified diff hunk header, rows saved per transaction
+HISTORY_MARKER = '\x1ecommit '
+HUNK_RE = re.compile(r'@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+HISTORY_BATCH_ROWS = int(os.environ.get('GIT_HISTORY_BATCH_ROWS', 5000))
+
+# Blob contents kept in memory by BlobReader, and (commit, path) -> blob lookups remembered
+BLOB_CACHE_BYTES = int(os.environ.get('GIT_BLOB_CACHE_BYTES', 64 * 1024 * 1024))
+PATH_INDEX_ENTRIES = 100000
+
+# Working-directory walk: directories never descended into (gitignore-style patterns, on top of
+# .gitignore and .git/info/exclude) and threads walking top-level directories
+WALK_EXCLUDES = [p.strip() for p in os.environ.get(
+    'GIT_WALK_EXCLUDE', '.git,node_modules,__pycache__,.venv,venv,.tox').split(',') if p.strip()]
+WALK_WORKERS = int(os.environ.get('GIT_WALK_WORKERS', min(8, os.cpu_count() or 1)))
+
+def _glob_regex(pattern: str) -> str:
+    """Regex for a gitignore glob: * and ? stay within one path segment, ** spans segments"""
+    regex, i = '', 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            regex += '(?:.*/)?'
+            i += 3
+        elif pattern.startswith('**', i):
+            regex += '.*'
+            i += 2
+        elif pattern[i] == '*':
+            regex += '[^/]*'
+            i += 1
+        elif pattern[i] == '?':
+            regex += '[^/]'
+            i += 1
+        elif pattern[i] == '[' and ']' in pattern[i + 2:]:
+            end = pattern.index(']', i + 2)
+            body = pattern[i + 1:end]
+            regex += '[' + ('^' + body[1:] if body.startswith('!') else body) + ']'
+            i = end + 1
+        elif pattern[i] == '\\' and i + 1 < len(pattern):
+            regex += re.escape(pattern[i + 1])
+            i += 2
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+    return regex
+
+class IgnoreRules:
+    """
+    The rules of one ignore file (or exclude list), for paths relative to the directory it applies to.
+    Supports the common .gitignore syntax: globs, **, leading or inner slash anchoring, trailing
+    slash for directories and ! negation.
+    """
+
+    def __init__(self, lines, base: str = ''):
+        self.base = base
+        self.rules = []  # (regex, negate, directories only, match the name only)
+        for line in lines:
+            line = line.rstrip('\n').rstrip('\r')
+            if not line.endswith('\\ '):
+                line = line.rstrip(' ')
+            if not line or line.startswith('#'):
+                continue
+            negate = line.startswith('!')
+            if negate or line.startswith('\\!') or line.startswith('\\#'):
+                line = line[1:]
+            dir_only = line.endswith('/')
+            line = line.rstrip('/')
+            if not line:
+                continue
+            name_only = '/' not in line
+            self.rules.append((re.compile(_glob_regex(line.lstrip('/')) + r'\Z'), negate, dir_only, name_only))
+
+    @classmethod
+    def from_file(cls, path: str, base: str = '') -> Optional['IgnoreRules']:
+        try:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                rules = cls(f, base)
+        except OSError:
+            return None
+        return rules if rules.rules else None
+
+    def match(self, rel_path: str, name: str, is_dir: bool) -> Optional[bool]:
+        """True if ignored, False if re-included by a negation, None if no rule applies"""
+        if self.base:
+            if not rel_path.startswith(self.base + '/'):
+                return None
+            rel_path = rel_path[len(self.base) + 1:]
+        for regex, negate, dir_only, name_only in reversed(self.rules):
+            if dir_only and not is_dir:
+                continue
+            if regex.match(name if name_only else rel_path):
+                return not negate
+        return None
+
+def _ignored(levels: List[IgnoreRules], rel_path: str, name: str, is_dir: bool) -> bool:
+    # Deeper ignore files override shallower ones
+    for rules in reversed(levels):
+        result = rules.match(rel_path, name, is_dir)
+        if result is not None:
+            return result
+    return False
+
+def walk_worktree(root: str, extensions: List[str], excludes: List[str] = None, workers: int = None) -> List[Dict]:
+    """
+    Files under root with the given extensions, skipping excluded and git-ignored paths without
+    descending into them. Top-level directories are walked in parallel.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    extensions = tuple(ext.lower() for ext in extensions)
+    exclude = IgnoreRules(WALK_EXCLUDES if excludes is None else excludes)
+    root_levels = [rules for rules in (IgnoreRules.from_file(os.path.join(root, '.git', 'info', 'exclude')),
+                                       IgnoreRules.from_file(os.path.join(root, '.gitignore'))) if rules]
+
+    def scan(path: str, rel_dir: str, levels: List[IgnoreRules], files: List[Dict], dirs: List):
+        """Collect the matching files of one directory and queue its subdirectories"""
+        try:
+            entries = list(os.scandir(path))
+        except OSError:
+            return
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            # Only directories and candidate files are checked against the ignore rules
+            if not is_dir and not entry.name.lower().endswith(extensions):
+                continue
+            rel_path = f'{rel_dir}/{entry.name}' if rel_dir else entry.name
+            if exclude.match(rel_path, entry.name, is_dir) or _ignored(levels, rel_path, entry.name, is_dir):
+                continue
+            if is_dir:
+                dirs.append((entry.path, rel_path))
+            else:
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                files.append({
+                    'path': rel_path.replace('/', os.sep),
+                    'name': entry.name,
+                    'size': stat.st_size,
+                    'last_modified': stat.st_mtime,
+                    'full_path': entry.path
+                })
+
+    def walk(path: str, rel_dir: str, levels: List[IgnoreRules]) -> List[Dict]:
+        files, stack = [], [(path, rel_dir, levels)]
+        while stack:
+            path, rel_dir, levels = stack.pop()
+            rules = IgnoreRules.from_file(os.path.join(path, '.gitignore'), rel_dir)
+            if rules:
+                levels = levels + [rules]
+            dirs = []
+            scan(path, rel_dir, levels, files, dirs)
+            stack.extend((dir_path, dir_rel, levels) for dir_path, dir_rel in dirs)
+        return files
+
+    files, top_dirs = [], []
+    scan(root, '', root_levels, files, top_dirs)
+    workers = WALK_WORKERS if workers is None else workers
+    if workers > 1 and len(top_dirs) > 1:
+        with ThreadPoolExecutor(max_workers=min(workers, len(top_dirs))) as pool:
+            for result in pool.map(lambda d: walk(d[0], d[1], root_levels), top_dirs):
+                files.extend(result)
+    else:
+        for dir_path, rel_dir in top_dirs:
+            files.extend(walk(dir_path, rel_dir, root_levels))
+    files.sort(key=lambda f: f['path'])
+    return files
+
+def sparse_patterns(extensions: List[str]) -> List[str]:
+    """Case-insensitive non-cone sparse-checkout patterns for files with the given extensions"""
+    patterns = []
+    for ext in extensions:
+        glob = ''.join(f'[{c.lower()}{c.upper()}]' if c.isalpha() else c for c in ext)
+        patterns.append(f'*{glob}')
+    return patterns
+
+class BlobReader:
+    """
+    Reads blobs through one long-lived `git cat-file --batch` process, with an LRU cache of blob
+    contents keyed by blob sha (GIT_BLOB_CACHE_BYTES). Bulk reads pipeline all requests through
+    the same pipe. Safe to share between threads; requests are serialized.
+    """
+
+    def __init__(self, git_dir: str, cache_bytes: int = None):
+        self.git_dir = git_dir
+        self.cache_bytes = BLOB_CACHE_BYTES if cache_bytes is None else cache_bytes
+        self._cache = OrderedDict()  # blob sha -> bytes
+        self._cached_bytes = 0
+        self._paths = OrderedDict()  # (commit sha, path) -> blob sha
+        self._process = None
+        self._lock = threading.RLock()
+
+    def _pipe(self):
+        if self._process is None or self._process.poll() is not None:
+            self._process = subprocess.Popen(['git', '--git-dir', self.git_dir, 'cat-file', '--batch'],
+                                             stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        return self._process
+
+    def _read_response(self, process):
+        """(sha, content) for the next response, or (None, None) when the object is missing"""
+        header = process.stdout.readline()
+        if not header:
+            raise IOError('git cat-file exited unexpectedly')
+        header = header.rstrip(b'\n')
+        # '<spec> missing' echoes the spec, which may contain spaces (e.g. 'HEAD:my file.txt')
+        if header.endswith((b' missing', b' ambiguous')):
+            return None, None
+        parts = header.rsplit(b' ', 2)
+        if len(parts) != 3 or not parts[2].isdigit():
+            raise IOError(f'Unexpected git cat-file response: {header!r}')
+        sha, kind, size = parts[0].decode(), parts[1], int(parts[2])
+        data = process.stdout.read(size)
+        process.stdout.read(1)  # trailing newline
+        return sha, (data if kind == b'blob' else None)
+
+    def _cache_put(self, sha: str, data: bytes):
+        if sha in self._cache or len(data) > self.cache_bytes:
+            return
+        self._cache[sha] = data
+        self._cached_bytes += len(data)
+        while self._cached_bytes > self.cache_bytes:
+            _, evicted = self._cache.popitem(last=False)
+            self._cached_bytes -= len(evicted)
+
+    def _cache_get(self, sha: str) -> Optional[bytes]:
+        data = self._cache.get(sha)
+        if data is not None:
+            self._cache.move_to_end(sha)
+        return data
+
+    def _batch(self, specs: List[str]) -> List[Tuple[Optional[str], Optional[bytes]]]:
+        """Send all object specs, then read the responses in order"""
+        process = self._pipe()
+        # A writer thread keeps the pipe full while responses are read, so large batches cannot deadlock
+        def write():
+            try:
+                for spec in specs:
+                    process.stdin.write(spec.encode('utf-8') + b'\n')
+                process.stdin.flush()
+            except (BrokenPipeError, OSError):
+                pass
+        writer = threading.Thread(target=write, daemon=True)
+        writer.start()
+        try:
+            return [self._read_response(process) for _ in specs]
+        except Exception:
+            self.close()
+            raise
+        finally:
+            writer.join()
+
+    def read_blobs(self, shas: List[str]) -> Dict[str, Optional[bytes]]:
+        """{blob sha: content} (None for missing objects); cached blobs never touch the pipe"""
+        with self._lock:
+            result = {sha: self._cache_get(sha) for sha in shas}
+            missing = [sha for sha, data in result.items() if data is None]
+            for sha, (found, data) in zip(missing, self._batch(missing) if missing else []):
+                result[sha] = data
+                if data is not None:
+                    self._cache_put(found, data)
+            return result
+
+    def read_blob(self, sha: str) -> Optional[bytes]:
+        return self.read_blobs([sha])[sha]
+
+    def read_paths(self, commit_sha: str, paths: List[str]) -> Dict[str, Optional[bytes]]:
+        """{path: content} of files in a commit (None for paths that do not exist)"""
+        with self._lock:
+            result, unresolved = {}, []
+            for path in paths:
+                sha = self._paths.get((commit_sha, path))
+                data = self._cache_get(sha) if sha else None
+                if data is None:
+                    unresolved.append(path)
+                else:
+                    result[path] = data
+            responses = self._batch([f'{commit_sha}:{path}' for path in unresolved]) if unresolved else []
+            for path, (sha, data) in zip(unresolved, responses):
+                result[path] = data
+                if data is not None:
+                    self._cache_put(sha, data)
+                    self._paths[(commit_sha, path)] = sha
+                    if len(self._paths) > PATH_INDEX_ENTRIES:
+                        self._paths.popitem(last=False)
+            return result
+
+    def close(self):
+        with self._lock:
+            if self._process is not None:
+                try:
+                    self._process.stdin.close()
+                    self._process.wait(timeout=5)
+                except Exception:
+                    self._process.kill()
+                self._process = None
+
 class GitRepository:
     """Git repository management class"""
     
@@ -30,15 +343,29 @@ class GitRepository:
             except git.InvalidGitRepositoryError:
                 logger.error(f"Invalid Git repository at {repo_path}")
     
-    def clone_repository(self, url: str, local_path: str, branch: str = None, username: str = None, password: str = None) -> Dict:
-        """Clone a repository from URL to local path with optional authentication"""
+    def clone_repository(self, url: str, local_path: str, branch: str = None, username: str = None, password: str = None,
+                         partial: bool = False, depth: int = None, sparse: bool = False) -> Dict:
+        """
+        Clone a repository from URL to local path with optional authentication.
+        partial skips file contents (blob:none filter; blobs are fetched on demand), depth makes a
+        shallow clone of every branch, and sparse checks out only the PLC files.
+        """
         try:
             if os.path.exists(local_path):
                 shutil.rmtree(local_path)
             
             clone_kwargs = {}
+            multi_options = []
             if branch:
                 clone_kwargs['branch'] = branch
+            if partial:
+                multi_options.append('--filter=blob:none')
+            if depth:
+                clone_kwargs['depth'] = int(depth)
+                # --depth implies --single-branch; keep the other branches available for analysis
+                multi_options.append('--no-single-branch')
+            if sparse:
+                clone_kwargs['no_checkout'] = True
             
             # Handle authentication for private repositories
             if username and password:
@@ -54,13 +381,17 @@ class GitRepository:
                 ))
                 url = auth_url
             
-            self.repo = git.Repo.clone_from(url, local_path, **clone_kwargs)
+            self.repo = git.Repo.clone_from(url, local_path, multi_options=multi_options or None, **clone_kwargs)
             self.repo_path = local_path
+            if sparse:
+                self.repo.git.sparse_checkout('set', '--no-cone', *sparse_patterns(DEFAULT_PLC_EXTENSIONS))
+                self.repo.git.read_tree('-mu', 'HEAD')
             
             return {
                 'success': True,
                 'message': f'Repository cloned successfully to {local_path}',
-                'path': local_path
+                'path': local_path,
+                'mode': {'partial': bool(partial), 'depth': int(depth) if depth else None, 'sparse': bool(sparse)}
             }
         except Exception as e:
             logger.error(f"Failed to clone repository: {str(e)}")
@@ -231,6 +562,124 @@ class GitRepository:
                 'error': f'Failed to checkout branch: {str(e)}'
             }
     
+    def ref_index(self) -> Dict[str, str]:
+        """
+        {ref name: commit sha} from one for-each-ref call, under the full name ('refs/heads/main'),
+        the short name ('main', 'origin/main', 'v1.0') and, for remote branches, the bare branch name.
+        Built per call because refs move; the commits they point to are what gets cached.
+        """
+        output = self.repo.git.for_each_ref('--format=%(objectname) %(*objectname) %(refname)')
+        index, short_names = {}, {}
+        for line in output.splitlines():
+            parts = line.split(' ')
+            if len(parts) == 3:
+                sha, peeled, refname = parts
+            else:
+                sha, refname = parts[0], parts[-1]
+                peeled = ''
+            sha = peeled or sha
+            index[refname] = sha
+            for prefix in ('refs/heads/', 'refs/tags/', 'refs/remotes/'):
+                if refname.startswith(prefix):
+                    short = refname[len(prefix):]
+                    short_names.setdefault(short, sha)
+                    if prefix == 'refs/remotes/' and '/' in short:
+                        short_names.setdefault(short.split('/', 1)[1], sha)
+        for name, sha in short_names.items():
+            index.setdefault(name, sha)
+        return index
+
+    def resolve_commit(self, branch: str = None):
+        """Commit for a local branch, remote branch, tag or any rev (HEAD when branch is None)"""
+        if not branch:
+            return self.repo.head.commit
+        index = self.ref_index()
+        # Same precedence as git rev-parse, then origin/<branch>, then any ref ending in /<branch>
+        for name in (f'refs/{branch}', f'refs/tags/{branch}', f'refs/heads/{branch}', f'refs/remotes/{branch}',
+                     f'refs/remotes/origin/{branch}', branch):
+            if name in index:
+                return self.repo.commit(index[name])
+        try:
+            # Commit shas and rev expressions such as HEAD~3
+            return self.repo.commit(branch)
+        except Exception:
+            raise Exception(f"Branch '{branch}' not found")
+
+    def list_tree(self, commit, file_extensions: List[str] = None) -> List[Dict]:
+        """
+        Files of a commit matching the extensions: [{'path', 'name', 'size', 'sha', 'mode'}].
+        Built from one ls-tree -r -l call and cached per (commit sha, extension set) in memory and
+        on disk; commits are immutable, so cached listings never go stale.
+        """
+        extensions = tuple(sorted({ext.lower() for ext in (file_extensions or DEFAULT_PLC_EXTENSIONS)}))
+        return _listing_cache.get(commit.hexsha, extensions,
+                                  lambda: self._ls_tree(commit.hexsha, extensions))
+
+    def _blob(self, entry: Dict):
+        """git.Blob for a list_tree entry, with its size already known"""
+        blob = git.Blob(self.repo, bytes.fromhex(entry['sha']), int(entry['mode'], 8), entry['path'])
+        blob.size = entry['size']
+        return blob
+
+    def partial_clone_remote(self) -> Optional[str]:
+        """Promisor remote of a partial clone, or None for a complete repository"""
+        try:
+            promisors = self.repo.git.config('--get-regexp', r'^remote\..*\.promisor$')
+        except git.GitCommandError:
+            return None
+        for line in promisors.splitlines():
+            key, _, value = line.partition(' ')
+            if value.strip().lower() == 'true':
+                return key[len('remote.'):-len('.promisor')]
+        return None
+
+    def prefetch_blobs(self, commit, shas: List[str]) -> int:
+        """
+        In a partial clone, fetch the given blobs of a commit that are not local yet in one request
+        instead of one lazy fetch per blob. Returns the number of blobs fetched. A failed prefetch is
+        only logged: the blobs are then fetched lazily as they are read.
+        """
+        remote = self.partial_clone_remote()
+        if not remote or not shas:
+            return 0
+        try:
+            listing = self.repo.git.rev_list('--objects', '--no-walk', '--missing=print', commit.hexsha)
+            missing = {line[1:].split()[0] for line in listing.splitlines() if line.startswith('?')}
+            wanted = [sha for sha in shas if sha in missing]
+            if wanted:
+                subprocess.run(['git', '--git-dir', self.repo.git_dir, '-c', 'fetch.negotiationAlgorithm=noop',
+                                'fetch', remote, '--no-tags', '--no-write-fetch-head', '--recurse-submodules=no',
+                                '--filter=blob:none', '--stdin'],
+                               input='\n'.join(wanted).encode(), check=True, capture_output=True)
+        except subprocess.CalledProcessError as e:
+            stderr = e.stderr.decode('utf-8', errors='replace').strip() if e.stderr else ''
+            logger.warning(f"Blob prefetch from {remote} failed, falling back to lazy fetches: {stderr or str(e)}")
+            return 0
+        except (git.GitCommandError, OSError) as e:
+            logger.warning(f"Blob prefetch from {remote} failed, falling back to lazy fetches: {str(e)}")
+            return 0
+        return len(wanted)
+
+    def _ls_tree(self, sha: str, extensions: Tuple[str, ...]) -> List[Dict]:
+        # Object sizes would make a partial clone fetch every blob, so they are left unknown there
+        sized = self.partial_clone_remote() is None
+        args = ['-r', '-l', '-z', sha] if sized else ['-r', '-z', sha]
+        output = self.repo.git.ls_tree(*args, stdout_as_string=False)
+        files = []
+        for entry in output.split(b'\0'):
+            if not entry:
+                continue
+            meta, path = entry.split(b'\t', 1)
+            path = path.decode('utf-8', errors='surrogateescape')
+            if not path.lower().endswith(extensions):
+                continue
+            mode, kind, object_sha, *size = meta.split()
+            if kind != b'blob':
+                continue
+            files.append({'path': path, 'name': path.rsplit('/', 1)[-1], 'size': int(size[0]) if size else None,
+                          'sha': object_sha.decode(), 'mode': mode.decode()})
+        return files
+
     def get_files(self, branch: str = None, file_extensions: List[str] = None) -> Dict:
         """Get list of files in the repository, optionally filtered by extension"""
         if not self.repo:
@@ -239,82 +688,28 @@ class GitRepository:
         try:
             # Default to PLC file extensions
             if file_extensions is None:
-                file_extensions = ['.l5x', '.l5k', '.acd', '.txt', '.json', '.xml']
+                file_extensions = DEFAULT_PLC_EXTENSIONS
             
             files = []
             
             # If branch specified, get files from that branch
             if branch:
                 try:
-                    # Try different ways to resolve the branch
-                    commit = None
-                    
-                    # First try as a local branch
-                    try:
-                        commit = self.repo.commit(branch)
-                    except:
-                        pass
-                    
-                    # If not found, try as remote branch
-                    if not commit:
-                        try:
-                            commit = self.repo.commit(f'origin/{branch}')
-                        except:
-                            pass
-                    
-                    # If still not found, try to find it in all refs
-                    if not commit:
-                        for ref in self.repo.refs:
-                            if ref.name == branch or ref.name.endswith(f'/{branch}'):
-                                commit = ref.commit
-                                break
-                    
-                    if not commit:
-                        raise Exception(f"Branch '{branch}' not found")
-                    
-                    tree = commit.tree
-                    
-                    def traverse_tree(tree, path=""):
-                        for item in tree:
-                            if item.type == 'blob':  # File
-                                file_path = os.path.join(path, item.name)
-                                if any(file_path.lower().endswith(ext.lower()) for ext in file_extensions):
-                                    files.append({
-                                        'path': file_path,
-                                        'name': item.name,
-                                        'size': item.size,
-                                        'last_modified': commit.committed_datetime.isoformat(),
-                                        'sha': item.hexsha
-                                    })
-                            elif item.type == 'tree':  # Directory
-                                traverse_tree(item, os.path.join(path, item.name))
-                    
-                    traverse_tree(tree)
-                    
+                    commit = self.resolve_commit(branch)
+                    last_modified = commit.committed_datetime.isoformat()
+                    files = [
+                        {'path': f['path'], 'name': f['name'], 'size': f['size'],
+                         'last_modified': last_modified, 'sha': f['sha']}
+                        for f in self.list_tree(commit, file_extensions)
+                    ]
                 except Exception as e:
                     return {
                         'success': False,
                         'error': f'Failed to get files from branch {branch}: {str(e)}'
                     }
             else:
-                # Get files from working directory
-                for root, dirs, files_in_dir in os.walk(self.repo_path):
-                    # Skip .git directory
-                    if '.git' in root:
-                        continue
-                    
-                    for file_name in files_in_dir:
-                        if any(file_name.lower().endswith(ext.lower()) for ext in file_extensions):
-                            file_path = os.path.join(root, file_name)
-                            rel_path = os.path.relpath(file_path, self.repo_path)
-                            
-                            files.append({
-                                'path': rel_path,
-                                'name': file_name,
-                                'size': os.path.getsize(file_path),
-                                'last_modified': os.path.getmtime(file_path),
-                                'full_path': file_path
-                            })
+                # Get files from working directory, skipping excluded and git-ignored directories
+                files = walk_worktree(self.repo_path, file_extensions)
             
             return {
                 'success': True,
@@ -329,6 +724,55 @@ class GitRepository:
                 'error': f'Failed to get files: {str(e)}'
             }
     
+    def blob_reader(self) -> BlobReader:
+        """The shared cat-file reader for the connected repository"""
+        git_dir = os.path.abspath(self.repo.git_dir)
+        reader = getattr(self, '_blob_reader', None)
+        if reader is None or reader.git_dir != git_dir:
+            if reader is not None:
+                reader.close()
+            reader = self._blob_reader = BlobReader(git_dir)
+        return reader
+
+    def get_files_content(self, file_paths: List[str], branch: str = None) -> Dict:
+        """Contents of several files of a branch (or the working directory) in one pass"""
+        if not self.repo:
+            return {'success': False, 'error': 'No repository connected'}
+        try:
+            files = []
+            if branch:
+                commit = self.resolve_commit(branch)
+                contents = self.blob_reader().read_paths(commit.hexsha, file_paths)
+            else:
+                contents = {}
+                for file_path in file_paths:
+                    full_path = os.path.join(self.repo_path, file_path)
+                    try:
+                        with open(full_path, 'rb') as f:
+                            contents[file_path] = f.read()
+                    except OSError:
+                        contents[file_path] = None
+            for file_path in file_paths:
+                data = contents.get(file_path)
+                if data is None:
+                    files.append({'file_path': file_path, 'success': False, 'error': f'File not found: {file_path}'})
+                    continue
+                try:
+                    files.append({'file_path': file_path, 'success': True, 'content': data.decode('utf-8')})
+                except UnicodeDecodeError as e:
+                    files.append({'file_path': file_path, 'success': False, 'error': f'File is not UTF-8 text: {str(e)}'})
+            return {
+                'success': True,
+                'files': files,
+                'branch': branch or (self.repo.active_branch.name if self.repo.active_branch else 'working')
+            }
+        except Exception as e:
+            logger.error(f"Failed to get file contents: {str(e)}")
+            return {
+                'success': False,
+                'error': f'Failed to get file contents: {str(e)}'
+            }
+
     def get_file_content(self, file_path: str, branch: str = None) -> Dict:
         """Get content of a specific file"""
         if not self.repo:
@@ -338,8 +782,11 @@ class GitRepository:
             if branch:
                 # Get file from specific branch
                 try:
-                    commit = self.repo.commit(branch)
-                    content = commit.tree[file_path].data_stream.read().decode('utf-8')
+                    commit = self.resolve_commit(branch)
+                    data = self.blob_reader().read_paths(commit.hexsha, [file_path])[file_path]
+                    if data is None:
+                        raise KeyError(f"'{file_path}' not found in {branch}")
+                    content = data.decode('utf-8')
                 except Exception as e:
                     return {
                         'success': False,
@@ -462,28 +909,116 @@ class GitRepository:
                 'error': f'Failed to push to remote: {str(e)}'
             }
     
-    def get_repository_status(self) -> Dict:
-        """Get current repository status"""
+    def _status_stamp(self) -> List:
+        """mtimes of the files a commit, checkout or staging change touches"""
+        git_dir = self.repo.git_dir
+        paths = [os.path.join(git_dir, 'index'), os.path.join(git_dir, 'HEAD'), os.path.join(git_dir, 'packed-refs')]
+        try:
+            with open(paths[1], 'r', encoding='utf-8') as f:
+                head = f.read().strip()
+            if head.startswith('ref: '):
+                paths.append(os.path.join(git_dir, head[5:]))
+        except OSError:
+            pass
+        stamp = []
+        for path in paths:
+            try:
+                stamp.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                stamp.append(None)
+        return stamp
+
+    def _status_cache_path(self) -> str:
+        key = hashlib.sha1(os.path.abspath(self.repo.git_dir).encode('utf-8')).hexdigest()
+        return os.path.join(STATUS_CACHE_DIR, f'{key}.json')
+
+    def _porcelain_status(self) -> Dict:
+        """Branch, staged, modified, untracked and conflicted files from one `git status --porcelain=v2` run"""
+        output = self.repo.git.status('--porcelain=v2', '-z', '--branch', '--untracked-files=all', '--no-renames',
+                                      stdout_as_string=False)
+        status = {'current_branch': None, 'staged_files': [], 'modified_files': [], 'untracked_files': [],
+                  'conflicted_files': []}
+        records = output.split(b'\0')
+        index = 0
+        while index < len(records):
+            record = records[index].decode('utf-8', errors='surrogateescape')
+            index += 1
+            if not record:
+                continue
+            kind = record[0]
+            if kind == '#':
+                if record.startswith('# branch.head '):
+                    head = record[len('# branch.head '):]
+                    status['current_branch'] = None if head == '(detached)' else head
+            elif kind == '?':
+                status['untracked_files'].append(record[2:])
+            elif kind in '12':
+                fields = record.split(' ', 9 if kind == '2' else 8)
+                xy, path = fields[1], fields[-1]
+                if kind == '2':
+                    index += 1  # the original path follows a rename/copy record
+                if xy[0] != '.':
+                    status['staged_files'].append(path)
+                if xy[1] != '.':
+                    status['modified_files'].append(path)
+            elif kind == 'u':
+                path = record.split(' ', 10)[-1]
+                status['conflicted_files'].append(path)
+                status['modified_files'].append(path)
+        return status
+
+    def get_repository_status(self, use_cache: bool = True) -> Dict:
+        """
+        Get current repository status.
+        The file lists come from a single porcelain v2 status; with use_cache the result is reused
+        for up to STATUS_CACHE_TTL seconds while the index, HEAD and the current branch are unchanged.
+        """
         if not self.repo:
             return {'success': False, 'error': 'No repository connected'}
         
         try:
+            cache_path = self._status_cache_path()
+            stamp = self._status_stamp()
+            if use_cache and STATUS_CACHE_TTL > 0:
+                try:
+                    with open(cache_path, 'r', encoding='utf-8') as f:
+                        cached = json.load(f)
+                    if cached['stamp'] == stamp and time.time() - cached['created'] < STATUS_CACHE_TTL:
+                        return {'success': True, 'status': cached['status'], 'cached': True}
+                except (OSError, ValueError, KeyError):
+                    pass
+
+            status = self._porcelain_status()
+            # git status may refresh the index, so stamp the result after it ran
+            stamp = self._status_stamp()
+            head = self.repo.head.commit if self.repo.head.is_valid() else None
             # Get repository info
             repo_info = {
                 'path': self.repo_path,
-                'current_branch': self.repo.active_branch.name if self.repo.active_branch else None,
-                'is_dirty': self.repo.is_dirty(),
-                'untracked_files': self.repo.untracked_files,
-                'modified_files': [item.a_path for item in self.repo.index.diff(None)],
-                'staged_files': [item.a_path for item in self.repo.index.diff('HEAD')],
+                'current_branch': status['current_branch'],
+                'is_dirty': bool(status['staged_files'] or status['modified_files']),
+                'untracked_files': status['untracked_files'],
+                'modified_files': status['modified_files'],
+                'staged_files': status['staged_files'],
+                'conflicted_files': status['conflicted_files'],
                 'remotes': [remote.name for remote in self.repo.remotes],
                 'last_commit': {
-                    'hash': str(self.repo.head.commit)[:8],
-                    'message': self.repo.head.commit.message.strip(),
-                    'author': str(self.repo.head.commit.author),
-                    'date': self.repo.head.commit.committed_datetime.isoformat()
-                } if self.repo.head.commit else None
+                    'hash': str(head)[:8],
+                    'message': head.message.strip(),
+                    'author': str(head.author),
+                    'date': head.committed_datetime.isoformat()
+                } if head else None
             }
+
+            if STATUS_CACHE_TTL > 0:
+                try:
+                    os.makedirs(STATUS_CACHE_DIR, exist_ok=True)
+                    tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+                    with open(tmp_path, 'w', encoding='utf-8') as f:
+                        json.dump({'stamp': stamp, 'created': time.time(), 'status': repo_info}, f)
+                    os.replace(tmp_path, cache_path)
+                except OSError as e:
+                    logger.warning(f"Failed to write status cache {cache_path}: {str(e)}")
             
             return {
                 'success': True,
@@ -533,6 +1068,374 @@ class GitRepository:
                 'error': f'Failed to copy file from branch: {str(e)}'
             }
 
+    def _branch_name(self, branch: str, commit) -> str:
+        if branch:
+            return branch
+        return commit.hexsha[:8] if self.repo.head.is_detached else self.repo.active_branch.name
+
+    def analyze_blobs(self, blobs, branch_name: str, commit, provider: str = None, escalation: str = None,
+                      workers: int = None, resume: bool = True, progress=None) -> Dict:
+        """
+        Analyse git blobs and save the results.
+        Blobs are read straight from the object database (no checkout, no temp files) and analysed
+        by a bounded worker pool; results are saved in batches of BATCH_SAVE_SIZE. With resume, blobs
+        that already have a stored analysis are skipped, so an interrupted run continues where it
+        stopped. progress(dict) is called after each file.
+        """
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+        from analyzer import analyze_file_content
+        from db import save_analyses_batch, get_analyzed_blobs
+
+        done = get_analyzed_blobs([b.hexsha for b in blobs], provider) if resume else set()
+        pending = [b for b in blobs if b.hexsha not in done]
+        self.prefetch_blobs(commit, [b.hexsha for b in pending])
+        summary = {'success': True, 'branch': branch_name, 'commit': commit.hexsha, 'total': len(blobs),
+                   'skipped': len(blobs) - len(pending), 'analyzed': 0, 'saved': 0, 'failed': [], 'files': []}
+        to_save = []
+
+        def report(path, status):
+            if progress:
+                progress({'path': path, 'status': status, 'done': summary['analyzed'] + len(summary['failed']),
+                          'total': len(pending)})
+
+        def flush():
+            ids = save_analyses_batch(to_save)
+            for entry, analysis_id in zip(to_save, ids):
+                summary['files'].append({'path': entry['file_path'], 'analysis_id': analysis_id,
+                                         'max_risk': entry['analysis_json'].get('rule_summary', {}).get('max_risk')})
+            summary['saved'] += sum(1 for i in ids if i is not None)
+            to_save.clear()
+
+        def collect(futures):
+            for future in futures:
+                blob = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"Failed to analyse {blob.path}: {str(e)}")
+                    summary['failed'].append({'path': blob.path, 'error': str(e)})
+                    report(blob.path, 'failed')
+                    continue
+                result['git_metadata'] = {'original_path': blob.path, 'branch': branch_name,
+                                          'commit': commit.hexsha, 'blob_sha': blob.hexsha}
+                to_save.append({'file_name': blob.name, 'status': 'completed', 'analysis_json': result,
+                                'file_path': blob.path, 'provider': provider, 'blob_sha': blob.hexsha})
+                summary['analyzed'] += 1
+                report(blob.path, 'analyzed')
+                if len(to_save) >= BATCH_SAVE_SIZE:
+                    flush()
+
+        workers = workers or BATCH_WORKERS
+        reader = self.blob_reader()
+        running = {}
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for blob in pending:
+                    # Keep at most two files per worker in memory
+                    if len(running) >= workers * 2:
+                        finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                        collect(finished)
+                    if blob.size is not None and blob.size > BATCH_MAX_BYTES:
+                        summary['failed'].append({'path': blob.path, 'error': f'File too large ({blob.size} bytes)'})
+                        report(blob.path, 'failed')
+                        continue
+                    # Object database reads stay on this thread; only the analysis runs in the pool
+                    data = reader.read_blob(blob.hexsha)
+                    if data is None:
+                        summary['failed'].append({'path': blob.path, 'error': 'Blob not found'})
+                        report(blob.path, 'failed')
+                        continue
+                    if len(data) > BATCH_MAX_BYTES:
+                        summary['failed'].append({'path': blob.path, 'error': f'File too large ({len(data)} bytes)'})
+                        report(blob.path, 'failed')
+                        continue
+                    if b'\0' in data[:8000]:
+                        summary['failed'].append({'path': blob.path, 'error': 'Binary file'})
+                        report(blob.path, 'failed')
+                        continue
+                    content = data.decode('utf-8', errors='replace')
+                    running[pool.submit(analyze_file_content, content, provider, escalation, blob.path)] = blob
+                while running:
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    collect(finished)
+            if to_save:
+                flush()
+        except Exception as e:
+            logger.error(f"Branch analysis of {branch_name} stopped: {str(e)}")
+            summary.update({'success': False, 'error': f'Branch analysis stopped: {str(e)}'})
+        return summary
+
+    def analyze_branch(self, branch: str = None, file_extensions: List[str] = None, provider: str = None,
+                       escalation: str = None, workers: int = None, resume: bool = True, progress=None) -> Dict:
+        """Analyse every matching file of a branch (see analyze_blobs)"""
+        if not self.repo:
+            return {'success': False, 'error': 'No repository connected'}
+        try:
+            commit = self.resolve_commit(branch)
+        except Exception as e:
+            return {'success': False, 'error': f'Failed to resolve branch {branch}: {str(e)}'}
+        blobs = [self._blob(f) for f in self.list_tree(commit, file_extensions)]
+        return self.analyze_blobs(blobs, self._branch_name(branch, commit), commit, provider, escalation,
+                                  workers, resume, progress)
+
+    def changed_files(self, from_commit, to_commit, file_extensions: List[str] = None) -> List[Dict]:
+        """
+        Matching files that differ between two commits, from a tree diff with rename detection:
+        [{'path', 'change_type' (A/M/D/R/T), 'old_path', 'blob'}]; blob is None for deletions.
+        """
+        extensions = tuple(ext.lower() for ext in (file_extensions or DEFAULT_PLC_EXTENSIONS))
+        changes = []
+        # GitPython detects renames by default (R=True would reverse the diff)
+        for diff in from_commit.diff(to_commit):
+            path = diff.b_path or diff.a_path
+            if not path.lower().endswith(extensions) and not (diff.a_path or '').lower().endswith(extensions):
+                continue
+            changes.append({
+                'path': path,
+                'change_type': diff.change_type,
+                'old_path': diff.a_path if diff.renamed_file else None,
+                'blob': None if diff.deleted_file else diff.b_blob,
+            })
+        return changes
+
+    def scan_changes(self, branch: str = None, since: str = None, file_extensions: List[str] = None,
+                     provider: str = None, escalation: str = None, workers: int = None, progress=None) -> Dict:
+        """
+        Analyse only the files that changed on a branch since a commit (default: the last scanned
+        commit recorded for the branch). The first scan of a branch analyses every file. The
+        recorded commit only advances when every changed file was analysed, so failures are retried.
+        """
+        if not self.repo:
+            return {'success': False, 'error': 'No repository connected'}
+        from db import get_scan_state, save_scan_state
+        try:
+            commit = self.resolve_commit(branch)
+        except Exception as e:
+            return {'success': False, 'error': f'Failed to resolve branch {branch}: {str(e)}'}
+        branch_name = self._branch_name(branch, commit)
+        repo_key = os.path.abspath(self.repo.git_dir)
+        if since is None:
+            state = get_scan_state(repo_key, branch_name)
+            since = state['last_commit'] if state else None
+        base = None
+        if since:
+            try:
+                base = self.repo.commit(since)
+            except Exception:
+                logger.warning(f"Last scanned commit {since} is not in the repository; scanning all files")
+        if base is not None and base.hexsha == commit.hexsha:
+            return {'success': True, 'branch': branch_name, 'commit': commit.hexsha, 'since': base.hexsha,
+                    'changes': [], 'total': 0, 'skipped': 0, 'analyzed': 0, 'saved': 0, 'failed': [], 'files': []}
+        if base is None:
+            result = self.analyze_branch(branch, file_extensions, provider, escalation, workers, True, progress)
+            changes = []
+        else:
+            changes = self.changed_files(base, commit, file_extensions)
+            blobs = [change['blob'] for change in changes if change['blob'] is not None]
+            result = self.analyze_blobs(blobs, branch_name, commit, provider, escalation, workers, True, progress)
+            result['changes'] = [{k: v for k, v in change.items() if k != 'blob'} for change in changes]
+        result['since'] = base.hexsha if base is not None else None
+        if result.get('success') and not result.get('failed'):
+            save_scan_state(repo_key, branch_name, commit.hexsha,
+                            {'analyzed': result.get('analyzed', 0), 'changes': len(changes)})
+        return result
+
+    def _history_commits(self, rev_range: str, pathspecs: List[str]):
+        """
+        Yield (commit header, [(path, change, line, text)]) for each commit of `git log -p --unified=0`
+        over rev_range, oldest first, limited to the pathspecs. The log is streamed, never held whole.
+        """
+        process = subprocess.Popen(
+            ['git', '--git-dir', self.repo.git_dir, '-c', 'core.quotePath=false', 'log', '--reverse',
+             '--no-color', '--no-ext-diff', '--no-prefix', '-M', '--unified=0', '-p',
+             f'--format={HISTORY_MARKER}%H%x1f%an%x1f%ae%x1f%aI%x1f%cI', rev_range, '--', *pathspecs],
+            stdout=subprocess.PIPE)
+        header, changes, path = None, [], None
+        old_line = new_line = old_left = new_left = 0
+        try:
+            for raw in process.stdout:
+                line = raw.decode('utf-8', errors='replace').rstrip('\n')
+                if old_left or new_left:
+                    # Hunk body: exactly old_left removed and new_left added lines
+                    if line.startswith('-') and old_left:
+                        changes.append((path, 'removed', old_line, line[1:]))
+                        old_line += 1
+                        old_left -= 1
+                    elif line.startswith('+') and new_left:
+                        changes.append((path, 'added', new_line, line[1:]))
+                        new_line += 1
+                        new_left -= 1
+                    continue
+                if line.startswith(HISTORY_MARKER):
+                    if header is not None:
+                        yield header, changes
+                    header, changes, path = line[len(HISTORY_MARKER):].split('\x1f'), [], None
+                elif line.startswith('diff --git '):
+                    path = None
+                elif line.startswith('--- ') or line.startswith('+++ '):
+                    # git ends names containing spaces with a tab; /dev/null stands for an added/deleted side
+                    name = line[4:].rstrip('\t')
+                    if name != '/dev/null' and (line[0] == '+' or path is None):
+                        path = name
+                elif line.startswith('@@ '):
+                    hunk = HUNK_RE.match(line)
+                    if hunk:
+                        old_line, new_line = int(hunk.group(1)), int(hunk.group(3))
+                        old_left = int(hunk.group(2)) if hunk.group(2) is not None else 1
+                        new_left = int(hunk.group(4)) if hunk.group(4) is not None else 1
+            if header is not None:
+                yield header, changes
+        finally:
+            process.stdout.close()
+            if process.wait() != 0:
+                raise Exception(f'git log exited with status {process.returncode}')
+
+    def scan_history(self, branch: str = None, since: str = None, file_extensions: List[str] = None,
+                     progress=None) -> Dict:
+        """
+        Index the instructions each commit of a branch added and removed in PLC files, with the
+        commit, author and dates, so that "which commit introduced this instruction" is a lookup.
+        Resumes after the last indexed commit of the branch (or since); the recorded commit advances
+        with every saved batch, so an interrupted scan continues where it stopped.
+        """
+        if not self.repo:
+            return {'success': False, 'error': 'No repository connected'}
+        from db import get_scan_state, save_history
+        from plc_model import normalize_line
+        from plc_xref import split_instructions
+        try:
+            commit = self.resolve_commit(branch)
+        except Exception as e:
+            return {'success': False, 'error': f'Failed to resolve branch {branch}: {str(e)}'}
+        branch_name = self._branch_name(branch, commit)
+        repo_key = os.path.abspath(self.repo.git_dir)
+        if since is None:
+            state = get_scan_state(repo_key, branch_name, 'history')
+            since = state['last_commit'] if state else None
+        base = None
+        if since:
+            try:
+                base = self.repo.commit(since)
+                if not self.repo.is_ancestor(base, commit):
+                    logger.warning(f"Last indexed commit {since} is not an ancestor of {branch_name}; re-indexing the branch")
+                    base = None
+            except Exception:
+                logger.warning(f"Last indexed commit {since} is not in the repository; re-indexing the branch")
+                base = None
+        summary = {'success': True, 'branch': branch_name, 'commit': commit.hexsha,
+                   'since': base.hexsha if base is not None else None, 'commits': 0, 'added': 0, 'removed': 0}
+        if base is not None and base.hexsha == commit.hexsha:
+            return summary
+
+        extensions = file_extensions or DEFAULT_PLC_EXTENSIONS
+        pathspecs = [f':(icase)*{ext}' for ext in extensions]
+        rev_range = f'{base.hexsha}..{commit.hexsha}' if base is not None else commit.hexsha
+        total = int(self.repo.git.rev_list('--count', rev_range, '--', *pathspecs) or 0)
+        rows, last_sha = [], None
+
+        def flush():
+            save_history(repo_key, rows, branch_name, last_sha,
+                         {'commits': summary['commits'], 'added': summary['added'], 'removed': summary['removed']})
+            rows.clear()
+
+        try:
+            for (sha, author, email, authored_at, committed_at), changes in self._history_commits(rev_range, pathspecs):
+                for path, change, line, text in changes:
+                    for position, (op, operand, instruction) in enumerate(split_instructions(normalize_line(text))):
+                        rows.append({'commit_sha': sha, 'author': author, 'author_email': email,
+                                     'authored_at': authored_at, 'committed_at': committed_at, 'file_path': path,
+                                     'change': change, 'line': line, 'position': position, 'op': op,
+                                     'operand': operand, 'instruction': instruction})
+                        summary[change] += 1
+                summary['commits'] += 1
+                last_sha = sha
+                if len(rows) >= HISTORY_BATCH_ROWS:
+                    flush()
+                if progress:
+                    progress({'commit': sha, 'done': summary['commits'], 'total': total})
+        except Exception as e:
+            logger.error(f"History scan of {branch_name} stopped: {str(e)}")
+            flush()
+            summary.update({'success': False, 'error': f'History scan stopped after {last_sha}: {str(e)}'})
+            return summary
+        # Also records the branch tip when the last commits touched no PLC file
+        last_sha = commit.hexsha
+        flush()
+        return summary
+
+    def find_instruction_history(self, op: str = None, operand: str = None, instruction: str = None,
+                                 file_path: str = None, change: str = 'added', first: bool = False,
+                                 limit: int = 100) -> Dict:
+        """Indexed history of matching instructions in the connected repository, oldest first"""
+        if not self.repo:
+            return {'success': False, 'error': 'No repository connected'}
+        from db import find_instruction_history
+        result = find_instruction_history(os.path.abspath(self.repo.git_dir), op, operand, instruction,
+                                          file_path, change, first, limit)
+        return {'success': True, 'matches': result['matches'], 'count': result['count']}
+
+class ListingCache:
+    """
+    Tree listings keyed by (commit sha, extensions): an in-memory LRU backed by JSON files in
+    GIT_LISTING_CACHE_DIR, pruned to the GIT_LISTING_CACHE_FILES most recently used.
+    """
+
+    def __init__(self, cache_dir: str, memory_entries: int = 16, disk_entries: int = 256):
+        self.cache_dir = cache_dir
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, sha: str, extensions: Tuple[str, ...]) -> str:
+        key = hashlib.sha1('\0'.join(extensions).encode('utf-8')).hexdigest()[:12]
+        return os.path.join(self.cache_dir, f'{sha}-{key}.json')
+
+    def get(self, sha: str, extensions: Tuple[str, ...], build):
+        key = (sha, extensions)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+        path = self._path(sha, extensions)
+        files = None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                files = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            files = build()
+            self._write(path, files)
+        with self._lock:
+            self._memory[key] = files
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+        return files
+
+    def _write(self, path: str, files: List[Dict]):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(files, f, separators=(',', ':'))
+            os.replace(tmp_path, path)
+            entries = sorted((entry for entry in os.scandir(self.cache_dir) if entry.name.endswith('.json')),
+                             key=lambda entry: entry.stat().st_mtime, reverse=True)
+            for entry in entries[self.disk_entries:]:
+                os.remove(entry.path)
+        except OSError as e:
+            logger.warning(f"Failed to write listing cache {path}: {str(e)}")
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+_listing_cache = ListingCache(
+    os.environ.get('GIT_LISTING_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'plc_git_listings')),
+    disk_entries=int(os.environ.get('GIT_LISTING_CACHE_FILES', 256)),
+)
+
 def cleanup_temp_directory(temp_dir: str):
     """Clean up temporary directory"""
     try:
@@ -575,6 +1478,17 @@ def ensure_repository_connection():
         if saved_path and os.path.exists(saved_path):
             git_repo.connect_to_repository(saved_path)
 
+def _cli_option(args: List[str], name: str) -> Optional[str]:
+    """Value following a --name flag, if any"""
+    if name in args and args.index(name) + 1 < len(args):
+        return args[args.index(name) + 1]
+    return None
+
+def _cli_positional(args: List[str], value_flags) -> List[str]:
+    """Arguments that are neither flags nor the values of value_flags"""
+    skip = {args.index(name) + 1 for name in value_flags if name in args}
+    return [a for i, a in enumerate(args) if not a.startswith('--') and i not in skip]
+
 # CLI functions for testing
 def main():
     """Main function for CLI testing"""
@@ -583,28 +1497,37 @@ def main():
     if len(sys.argv) < 2:
         print("Usage: python git_integration.py <command> [args...]")
         print("Commands:")
-        print("  --clone <url> <path> [branch]")
+        print("  --clone <url> <path> [branch] [--partial] [--depth N] [--sparse]")
         print("  --connect <path>")
         print("  --remote-branches <url>")
         print("  --branches")
         print("  --checkout <branch>")
         print("  --files [branch]")
-        print("  --status")
+        print("  --status [--no-cache]")
         print("  --create-temp-file <file_path> [branch]")
+        print("  --get-files-content <branch|--working> <file_path> [file_path ...]")
+        print("  --analyze-branch [branch] [--workers N] [--provider P] [--no-resume]")
+        print("  --scan-changes [branch] [--since SHA] [--workers N] [--provider P]")
+        print("  --scan-history [branch] [--since SHA] [--extensions .l5x,.xml]")
+        print("  --history-search [--op OP] [--operand X] [--instruction TEXT] [--file PATH] [--removed] [--first] [--limit N]")
         return
     
     command = sys.argv[1]
     
     if command == '--clone':
         if len(sys.argv) < 4:
-            print("Usage: --clone <url> <path> [branch] [username] [password]")
+            print("Usage: --clone <url> <path> [branch] [username] [password] [--partial] [--depth N] [--sparse]")
             return
-        url = sys.argv[2]
-        path = sys.argv[3]
-        branch = sys.argv[4] if len(sys.argv) > 4 else None
-        username = sys.argv[5] if len(sys.argv) > 5 else None
-        password = sys.argv[6] if len(sys.argv) > 6 else None
-        result = git_repo.clone_repository(url, path, branch, username, password)
+        args = _cli_positional(sys.argv[2:], ['--depth'])
+        url = args[0]
+        path = args[1]
+        branch = args[2] if len(args) > 2 else None
+        username = args[3] if len(args) > 3 else None
+        password = args[4] if len(args) > 4 else None
+        depth = _cli_option(sys.argv, '--depth')
+        result = git_repo.clone_repository(url, path, branch, username, password,
+                                           partial='--partial' in sys.argv, depth=int(depth) if depth else None,
+                                           sparse='--sparse' in sys.argv)
         if result['success']:
             save_repository_state(path)
         print(json.dumps(result, indent=2))
@@ -649,7 +1572,42 @@ def main():
     
     elif command == '--status':
         ensure_repository_connection()
-        result = git_repo.get_repository_status()
+        result = git_repo.get_repository_status(use_cache='--no-cache' not in sys.argv)
+        print(json.dumps(result, indent=2))
+    
+    elif command == '--scan-history':
+        # Args: [branch] [--since SHA] [--extensions .l5x,.xml]
+        args = sys.argv[2:]
+        positional = _cli_positional(args, ('--since', '--extensions'))
+        extensions = _cli_option(args, '--extensions')
+        ensure_repository_connection()
+        result = git_repo.scan_history(
+            positional[0] if positional else None,
+            since=_cli_option(args, '--since'),
+            file_extensions=extensions.split(',') if extensions else None,
+            progress=lambda p: print(f"[PROGRESS] {json.dumps(p)}", file=sys.stderr, flush=True),
+        )
+        print(json.dumps(result, indent=2))
+
+    elif command == '--history-search':
+        # Args: [--op OP] [--operand X] [--instruction TEXT] [--file PATH] [--removed] [--first] [--limit N]
+        ensure_repository_connection()
+        limit = _cli_option(sys.argv, '--limit')
+        result = git_repo.find_instruction_history(
+            op=_cli_option(sys.argv, '--op'), operand=_cli_option(sys.argv, '--operand'),
+            instruction=_cli_option(sys.argv, '--instruction'), file_path=_cli_option(sys.argv, '--file'),
+            change='removed' if '--removed' in sys.argv else 'added', first='--first' in sys.argv,
+            limit=int(limit) if limit else 100)
+        print(json.dumps(result, indent=2))
+    
+    elif command == '--get-files-content':
+        # Args: <branch|--working> <file_path> [file_path ...]
+        if len(sys.argv) < 4:
+            print("Usage: --get-files-content <branch|--working> <file_path> [file_path ...]")
+            return
+        branch = None if sys.argv[2] == '--working' else sys.argv[2]
+        ensure_repository_connection()
+        result = git_repo.get_files_content(sys.argv[3:], branch)
         print(json.dumps(result, indent=2))
     
     elif command == '--create-temp-file':
@@ -662,6 +1620,42 @@ def main():
         result = git_repo.create_temporary_file(file_path, branch)
         print(json.dumps(result, indent=2))
     
+    elif command == '--analyze-branch':
+        # Args: [branch] [--workers N] [--provider P] [--extensions .l5x,.xml] [--rules-only|--escalate-suspicious] [--no-resume]
+        args = sys.argv[2:]
+        positional = _cli_positional(args, ('--workers', '--provider', '--extensions'))
+        escalation = 'none' if '--rules-only' in args else 'suspicious' if '--escalate-suspicious' in args else None
+        extensions = _cli_option(args, '--extensions')
+        ensure_repository_connection()
+        result = git_repo.analyze_branch(
+            positional[0] if positional else None,
+            file_extensions=extensions.split(',') if extensions else None,
+            provider=_cli_option(args, '--provider'),
+            escalation=escalation,
+            workers=int(_cli_option(args, '--workers')) if _cli_option(args, '--workers') else None,
+            resume='--no-resume' not in args,
+            progress=lambda p: print(f"[PROGRESS] {json.dumps(p)}", file=sys.stderr, flush=True),
+        )
+        print(json.dumps(result, indent=2))
+    
+    elif command == '--scan-changes':
+        # Args: [branch] [--since SHA] [--workers N] [--provider P] [--extensions .l5x,.xml] [--rules-only|--escalate-suspicious]
+        args = sys.argv[2:]
+        positional = _cli_positional(args, ('--since', '--workers', '--provider', '--extensions'))
+        escalation = 'none' if '--rules-only' in args else 'suspicious' if '--escalate-suspicious' in args else None
+        extensions = _cli_option(args, '--extensions')
+        ensure_repository_connection()
+        result = git_repo.scan_changes(
+            positional[0] if positional else None,
+            since=_cli_option(args, '--since'),
+            file_extensions=extensions.split(',') if extensions else None,
+            provider=_cli_option(args, '--provider'),
+            escalation=escalation,
+            workers=int(_cli_option(args, '--workers')) if _cli_option(args, '--workers') else None,
+            progress=lambda p: print(f"[PROGRESS] {json.dumps(p)}", file=sys.stderr, flush=True),
+        )
+        print(json.dumps(result, indent=2))
+    
     elif command == '--commit-file':
         if len(sys.argv) < 4:
             print("Usage: --commit-file <file_path> <commit_message> [branch]")
@@ -697,11 +1691,14 @@ def main():
         print("  --branches")
         print("  --checkout <branch>")
         print("  --files [branch]")
-        print("  --status")
+        print("  --status [--no-cache]")
         print("  --create-temp-file <file_path> [branch]")
+        print("  --get-files-content <branch|--working> <file_path> [file_path ...]")
         print("  --commit-file <file_path> <commit_message> [branch]")
         print("  --push-to-remote [branch] [remote]")
         print("  --copy-file-from-branch <file_path> <source_branch> [target_path]")
+        print("  --analyze-branch [branch] [--workers N] [--provider P] [--extensions .l5x,.xml] [--no-resume]")
+        print("  --scan-changes [branch] [--since SHA] [--workers N] [--provider P] [--extensions .l5x,.xml]")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,274 @@
+"""
+Persistent analysis job queue for PLC Code Checker
+Jobs are stored in the analysis_jobs table, so they survive worker restarts.
+Each process runs a small worker pool that claims queued jobs with
+FOR UPDATE SKIP LOCKED; a lease lets another worker pick up a job whose
+owner died mid-run.
+"""
+
+import os
+import sys
+import json
+import uuid
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(__file__))
+from db import get_connection, init_db
+
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 2))
+JOB_LEASE_SECONDS = int(os.environ.get('JOB_LEASE_SECONDS', 300))
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))
+JOB_RETENTION_DAYS = int(os.environ.get('JOB_RETENTION_DAYS', 7))
+
+JOB_STATUSES = ('queued', 'running', 'succeeded', 'failed')
+
+def enqueue_job(content, file_name=None, provider=None, model=None, kind='analyze', max_attempts=JOB_MAX_ATTEMPTS):
+    """Persist a new job and return its id"""
+    init_db()
+    job_id = uuid.uuid4().hex
+    with get_connection() as conn:
+        c = conn.cursor()
+        c.execute('''
+            INSERT INTO analysis_jobs (id, kind, status, file_name, content, provider, model, max_attempts, created_at)
+            VALUES (%s, %s, 'queued', %s, %s, %s, %s, %s, NOW())
+        ''', (job_id, kind, file_name, content, provider, model, max_attempts))
+        conn.commit()
+    return job_id
+
+def get_job(job_id, include_result=True):
+    """Return a job's status (and result when finished), or None if it does not exist"""
+    init_db()
+    with get_connection() as conn:
+        c = conn.cursor()
+        c.execute('''
+            SELECT id, kind, status, file_name, provider, model, attempts, max_attempts,
+                   created_at, started_at, finished_at, error, result
+            FROM analysis_jobs WHERE id = %s
+        ''', (job_id,))
+        row = c.fetchone()
+    if not row:
+        return None
+    job = {
+        'id': row[0],
+        'kind': row[1],
+        'status': row[2],
+        'fileName': row[3],
+        'provider': row[4],
+        'model': row[5],
+        'attempts': row[6],
+        'max_attempts': row[7],
+        'created_at': row[8].isoformat() if row[8] else None,
+        'started_at': row[9].isoformat() if row[9] else None,
+        'finished_at': row[10].isoformat() if row[10] else None,
+        'error': row[11],
+    }
+    if include_result and row[12]:
+        job['result'] = json.loads(row[12])
+    return job
+
+def claim_job(worker_id, lease_seconds=JOB_LEASE_SECONDS):
+    """
+    Atomically take the oldest runnable job: queued, or running with an expired lease and attempts
+    left. Expired jobs that used all their attempts (a worker crashed on them every time) are marked
+    failed in the same transaction. SKIP LOCKED lets concurrent workers claim different jobs without
+    blocking each other.
+    """
+    with get_connection() as conn:
+        c = conn.cursor()
+        c.execute('''
+            UPDATE analysis_jobs SET
+                status = 'failed',
+                content = NULL,
+                finished_at = NOW(),
+                error = COALESCE(error, 'Worker lease expired after the last attempt'),
+                worker_id = NULL,
+                lease_expires_at = NULL
+            WHERE id IN (
+                SELECT id FROM analysis_jobs
+                WHERE status = 'running' AND lease_expires_at < NOW() AND attempts >= max_attempts
+                FOR UPDATE SKIP LOCKED
+            )
+        ''')
+        c.execute('''
+            UPDATE analysis_jobs SET
+                status = 'running',
+                worker_id = %s,
+                attempts = attempts + 1,
+                started_at = NOW(),
+                lease_expires_at = NOW() + make_interval(secs => %s)
+            WHERE id = (
+                SELECT id FROM analysis_jobs
+                WHERE status = 'queued'
+                   OR (status = 'running' AND lease_expires_at < NOW() AND attempts < max_attempts)
+                ORDER BY created_at
+                FOR UPDATE SKIP LOCKED
+                LIMIT 1
+            )
+            RETURNING id, kind, content, file_name, provider, model, attempts, max_attempts
+        ''', (worker_id, lease_seconds))
+        row = c.fetchone()
+        conn.commit()
+    if not row:
+        return None
+    return {
+        'id': row[0], 'kind': row[1], 'content': row[2], 'fileName': row[3],
+        'provider': row[4], 'model': row[5], 'attempts': row[6], 'max_attempts': row[7],
+    }
+
+def renew_leases(worker_id, lease_seconds=JOB_LEASE_SECONDS):
+    """Extend the lease on every job this worker is still running"""
+    with get_connection() as conn:
+        c = conn.cursor()
+        c.execute('''
+            UPDATE analysis_jobs SET lease_expires_at = NOW() + make_interval(secs => %s)
+            WHERE worker_id = %s AND status = 'running'
+        ''', (lease_seconds, worker_id))
+        conn.commit()
+        return c.rowcount
+
+def complete_job(job_id, worker_id, result):
+    """Store a job's result; ignored if the lease was lost to another worker"""
+    with get_connection() as conn:
+        c = conn.cursor()
+        c.execute('''
+            UPDATE analysis_jobs SET status = 'succeeded', result = %s, error = NULL,
+                content = NULL, finished_at = NOW(), lease_expires_at = NULL
+            WHERE id = %s AND worker_id = %s AND status = 'running'
+        ''', (json.dumps(result, default=str), job_id, worker_id))
+        conn.commit()
+        return c.rowcount == 1
+
+def fail_job(job_id, worker_id, error):
+    """Requeue a failed job, or mark it failed once it has used all its attempts"""
+    with get_connection() as conn:
+        c = conn.cursor()
+        c.execute('''
+            UPDATE analysis_jobs SET
+                status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END,
+                content = CASE WHEN attempts < max_attempts THEN content ELSE NULL END,
+                finished_at = CASE WHEN attempts < max_attempts THEN NULL ELSE NOW() END,
+                error = %s, worker_id = NULL, lease_expires_at = NULL
+            WHERE id = %s AND worker_id = %s AND status = 'running'
+            RETURNING status
+        ''', (str(error), job_id, worker_id))
+        row = c.fetchone()
+        conn.commit()
+        return row[0] if row else None
+
+def purge_finished_jobs(older_than_days=JOB_RETENTION_DAYS):
+    """Delete finished jobs older than the retention period"""
+    init_db()
+    with get_connection() as conn:
+        c = conn.cursor()
+        c.execute('''
+            DELETE FROM analysis_jobs
+            WHERE status IN ('succeeded', 'failed') AND finished_at < NOW() - make_interval(days => %s)
+        ''', (older_than_days,))
+        conn.commit()
+        return c.rowcount
+
+def get_job_counts():
+    """Number of jobs per status"""
+    init_db()
+    with get_connection() as conn:
+        c = conn.cursor()
+        c.execute('SELECT status, COUNT(*) FROM analysis_jobs GROUP BY status')
+        counts = {status: 0 for status in JOB_STATUSES}
+        counts.update({row[0]: row[1] for row in c.fetchall()})
+    return counts
+
+class JobRunner:
+    """
+    Per-process worker pool. A dispatcher thread claims jobs while a worker slot is free
+    and hands them to a ThreadPoolExecutor; handlers map job kind -> callable(job) -> result dict.
+    """
+
+    def __init__(self, handlers, max_workers=JOB_WORKERS, poll_interval=JOB_POLL_INTERVAL,
+                 lease_seconds=JOB_LEASE_SECONDS):
+        self.handlers = handlers
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='analysis-job')
+        self._slots = threading.Semaphore(max_workers)
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._dispatcher = None
+        self._heartbeat = None
+
+    def start(self):
+        init_db()
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name='analysis-job-dispatcher', daemon=True)
+        self._heartbeat = threading.Thread(target=self._heartbeat_loop, name='analysis-job-heartbeat', daemon=True)
+        self._dispatcher.start()
+        self._heartbeat.start()
+        return self
+
+    def notify(self):
+        """Wake the dispatcher immediately (e.g. right after enqueueing)"""
+        self._wake.set()
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+        self._executor.shutdown(wait=False)
+
+    def _dispatch_loop(self):
+        while not self._stopped.is_set():
+            self._slots.acquire()
+            try:
+                job = claim_job(self.worker_id, self.lease_seconds)
+            except Exception as e:
+                print(f"[DEBUG] job claim failed: {e}", file=sys.stderr)
+                job = None
+            if job is None:
+                self._slots.release()
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            self._executor.submit(self._run, job)
+
+    def _run(self, job):
+        try:
+            handler = self.handlers.get(job['kind'])
+            if handler is None:
+                raise ValueError(f"No handler for job kind '{job['kind']}'")
+            print(f"[DEBUG] job {job['id']} started (attempt {job['attempts']}/{job['max_attempts']})", file=sys.stderr)
+            result = handler(job)
+            complete_job(job['id'], self.worker_id, result)
+            print(f"[DEBUG] job {job['id']} succeeded", file=sys.stderr)
+        except Exception as e:
+            try:
+                status = fail_job(job['id'], self.worker_id, e)
+                print(f"[DEBUG] job {job['id']} failed ({status}): {e}", file=sys.stderr)
+            except Exception as db_error:
+                # The lease expires and another worker retries the job
+                print(f"[DEBUG] job {job['id']} could not record failure: {db_error}", file=sys.stderr)
+        finally:
+            self._slots.release()
+
+    def _heartbeat_loop(self):
+        interval = max(self.lease_seconds / 3, 1)
+        while not self._stopped.wait(interval):
+            try:
+                renew_leases(self.worker_id, self.lease_seconds)
+            except Exception as e:
+                print(f"[DEBUG] job lease renewal failed: {e}", file=sys.stderr)
+
+_runner = None
+_runner_pid = None
+_runner_lock = threading.Lock()
+
+def get_runner(handlers):
+    """Start (once per process, so after a gunicorn fork too) and return the job runner"""
+    global _runner, _runner_pid
+    if _runner is None or _runner_pid != os.getpid():
+        with _runner_lock:
+            if _runner is None or _runner_pid != os.getpid():
+                _runner = JobRunner(handlers).start()
+                _runner_pid = os.getpid()
+    return _runner
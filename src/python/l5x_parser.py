@@ -0,0 +1,151 @@
+"""
+Streaming parser for Rockwell L5X exports
+Walks the XML with iterparse and yields lightweight program, routine, rung, ST line
+and tag records, clearing each element once it has been read, so memory stays flat
+no matter how large the export is.
+"""
+
+import io
+import os
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterator, List, Tuple
+
+RECORD_KINDS = ('program', 'routine', 'rung', 'line', 'tag')
+L5X_EXTENSIONS = ('.l5x', '.xml')
+
+def _open_source(source):
+    """Accept a path, a binary/text file object or raw L5X content"""
+    if hasattr(source, 'read'):
+        return source
+    if isinstance(source, bytes):
+        return io.BytesIO(source)
+    if isinstance(source, str) and source.lstrip().startswith('<'):
+        return io.BytesIO(source.encode('utf-8'))
+    return source
+
+def iter_records(source, kinds=RECORD_KINDS) -> Iterator[Dict]:
+    """
+    Yield records in document order:
+      tag      {'kind', 'scope', 'name', 'data_type', 'tag_type', 'description'}
+      rung     {'kind', 'program', 'routine', 'number', 'text', 'comment'}
+      line     {'kind', 'program', 'routine', 'number', 'text'}         (structured text)
+      routine  {'kind', 'program', 'name', 'type', 'rungs', 'lines'}    (after its rungs/lines)
+      program  {'kind', 'name', 'routines', 'tags'}                     (after its routines)
+    Add-On Instruction definitions are reported as programs named 'AOI:<name>'.
+    """
+    kinds = set(kinds)
+    stack = []
+    program = None
+    routine = None
+    rung = None
+    tag = None
+    counts = {'routines': 0, 'tags': 0, 'rungs': 0, 'lines': 0}
+    for event, elem in ET.iterparse(_open_source(source), events=('start', 'end')):
+        name = elem.tag
+        if event == 'start':
+            parent = stack[-1].tag if stack else None
+            stack.append(elem)
+            if name == 'Program':
+                program = elem.get('Name')
+                counts['routines'] = counts['tags'] = 0
+            elif name == 'AddOnInstructionDefinition':
+                program = f"AOI:{elem.get('Name')}"
+                counts['routines'] = counts['tags'] = 0
+            elif name == 'Routine':
+                routine = {'kind': 'routine', 'program': program, 'name': elem.get('Name'), 'type': elem.get('Type')}
+                counts['rungs'] = counts['lines'] = 0
+            elif name == 'Rung':
+                rung = {'kind': 'rung', 'program': program, 'routine': routine and routine['name'],
+                        'number': elem.get('Number'), 'text': '', 'comment': ''}
+            elif name == 'Tag' and parent == 'Tags':
+                tag = {'kind': 'tag', 'scope': program or 'controller', 'name': elem.get('Name'),
+                       'data_type': elem.get('DataType'), 'tag_type': elem.get('TagType'), 'description': ''}
+            continue
+        stack.pop()
+        parent = stack[-1].tag if stack else None
+        if name == 'Text' and parent == 'Rung' and rung is not None:
+            rung['text'] = (elem.text or '').strip()
+        elif name == 'Comment' and parent == 'Rung' and rung is not None:
+            rung['comment'] = (elem.text or '').strip()
+        elif name == 'Description' and parent == 'Tag' and tag is not None:
+            tag['description'] = (elem.text or '').strip()
+        elif name == 'Rung' and rung is not None:
+            counts['rungs'] += 1
+            if 'rung' in kinds:
+                yield rung
+            rung = None
+        elif name == 'Line' and parent == 'STContent':
+            counts['lines'] += 1
+            if 'line' in kinds:
+                yield {'kind': 'line', 'program': program, 'routine': routine and routine['name'],
+                       'number': elem.get('Number'), 'text': elem.text or ''}
+        elif name == 'Tag' and tag is not None:
+            counts['tags'] += 1
+            if 'tag' in kinds:
+                yield tag
+            tag = None
+        elif name == 'Routine' and routine is not None:
+            counts['routines'] += 1
+            routine.update({'rungs': counts['rungs'], 'lines': counts['lines']})
+            if 'routine' in kinds:
+                yield routine
+            routine = None
+        elif name in ('Program', 'AddOnInstructionDefinition'):
+            if 'program' in kinds:
+                yield {'kind': 'program', 'name': program, 'routines': counts['routines'], 'tags': counts['tags']}
+            program = None
+        # Drop the parsed element (and its detached subtree) so the tree never grows
+        elem.clear()
+        if stack:
+            stack[-1].remove(elem)
+
+def format_rung(record: Dict) -> str:
+    """Compact one-line form of a rung for analysis"""
+    text = f"Rung {record['number']}: {record['text']}"
+    # A multi-line rung comment is folded onto the rung line so none of it reads as logic
+    comment = ' '.join(record['comment'].split())
+    return f"{text} // {comment}" if comment else text
+
+def iter_routines(source) -> Iterator[Dict]:
+    """
+    Yield one record per routine with its logic as compact text:
+    {'program', 'routine', 'type', 'name', 'text', 'parts'} where parts are the rungs/ST lines.
+    Only a single routine's logic is held in memory at a time.
+    """
+    parts: List[str] = []
+    for record in iter_records(source, kinds=('rung', 'line', 'routine')):
+        if record['kind'] == 'rung':
+            parts.append(format_rung(record) + '\n')
+        elif record['kind'] == 'line':
+            parts.append(record['text'] + '\n')
+        else:
+            name = f"{record['program']}/{record['name']}" if record['program'] else record['name']
+            header = f"// Routine {name} ({record['type']})\n"
+            yield {
+                'program': record['program'],
+                'routine': record['name'],
+                'type': record['type'],
+                'name': name,
+                'text': header + ''.join(parts),
+                'parts': [header] + parts if parts else [header],
+            }
+            parts = []
+
+def routine_units(source) -> Iterator[Tuple[str, str, List[str]]]:
+    """Routines as (name, text, parts) units for the chunker"""
+    for routine in iter_routines(source):
+        yield routine['name'], routine['text'], routine['parts']
+
+def list_tags(source) -> List[Dict]:
+    """All controller- and program-scoped tags of an export"""
+    return list(iter_records(source, kinds=('tag',)))
+
+def is_l5x_path(path: str) -> bool:
+    """True for L5X exports (by extension and root element) that should be read with the streaming parser"""
+    if os.path.splitext(path)[1].lower() not in L5X_EXTENSIONS:
+        return False
+    try:
+        with open(path, 'rb') as f:
+            return b'<RSLogix5000Content' in f.read(4096)
+    except OSError:
+        return False
@@ -0,0 +1,197 @@
+"""
+Persistent LLM result cache for PLC Code Checker
+Stores LLM responses keyed by (normalized content hash, prompt version, provider, model)
+in a local SQLite file with TTL expiry and size-bounded LRU eviction
+"""
+
+import os
+import sqlite3
+import hashlib
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.path.expanduser('~/.firstwatch/cache')
+CACHE_PATH = os.environ.get('LLM_CACHE_PATH') or os.path.join(CACHE_DIR, 'llm_cache.sqlite3')
+DEFAULT_TTL = int(os.environ.get('LLM_CACHE_TTL', 30 * 24 * 3600))  # 30 days
+DEFAULT_MAX_ENTRIES = int(os.environ.get('LLM_CACHE_MAX_ENTRIES', 20000))
+DEFAULT_MAX_BYTES = int(os.environ.get('LLM_CACHE_MAX_BYTES', 256 * 1024 * 1024))  # 256 MB
+
+def normalize_content(content: str) -> str:
+    """Normalize line endings and trailing whitespace so cosmetic re-exports hash identically"""
+    lines = content.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    return '\n'.join(line.rstrip() for line in lines).strip('\n')
+
+def content_hash(content: str) -> str:
+    """Stable SHA-256 of the normalized content"""
+    return hashlib.sha256(normalize_content(content).encode('utf-8')).hexdigest()
+
+def prompt_version(template: str) -> str:
+    """Short fingerprint of a prompt template; editing the template invalidates old entries"""
+    return hashlib.sha256(template.encode('utf-8')).hexdigest()[:16]
+
+class LLMCache:
+    """SQLite-backed LRU cache for LLM results"""
+
+    def __init__(self, path: str = CACHE_PATH, ttl: int = DEFAULT_TTL,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.enabled = os.environ.get('LLM_CACHE_DISABLED', '').lower() not in ('1', 'true', 'yes')
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        if not self._initialized:
+            with self._lock:
+                if not self._initialized:
+                    conn.execute('''
+                        CREATE TABLE IF NOT EXISTS llm_cache (
+                            cache_key TEXT PRIMARY KEY,
+                            content_hash TEXT NOT NULL,
+                            prompt_version TEXT NOT NULL,
+                            provider TEXT,
+                            model TEXT,
+                            result TEXT NOT NULL,
+                            size INTEGER NOT NULL,
+                            created_at REAL NOT NULL,
+                            last_access REAL NOT NULL
+                        )
+                    ''')
+                    conn.execute('CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache (last_access)')
+                    conn.execute('''
+                        CREATE TABLE IF NOT EXISTS llm_cache_counters (
+                            name TEXT PRIMARY KEY,
+                            value INTEGER NOT NULL DEFAULT 0
+                        )
+                    ''')
+                    conn.commit()
+                    self._initialized = True
+        return conn
+
+    @staticmethod
+    def make_key(content: str, prompt_ver: str, provider: str, model: str) -> str:
+        """Build the cache key from the normalized content hash and analysis settings"""
+        parts = [content_hash(content), prompt_ver or '', provider or '', model or '']
+        return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+    def _count(self, conn: sqlite3.Connection, name: str):
+        conn.execute('''
+            INSERT INTO llm_cache_counters (name, value) VALUES (?, 1)
+            ON CONFLICT(name) DO UPDATE SET value = value + 1
+        ''', (name,))
+
+    def get(self, key: str):
+        """Return the cached result for key, or None on miss/expiry"""
+        if not self.enabled:
+            return None
+        try:
+            conn = self._connect()
+            now = time.time()
+            row = conn.execute('SELECT result, created_at FROM llm_cache WHERE cache_key = ?', (key,)).fetchone()
+            if row and (self.ttl <= 0 or now - row[1] <= self.ttl):
+                conn.execute('UPDATE llm_cache SET last_access = ? WHERE cache_key = ?', (now, key))
+                self._count(conn, 'hits')
+                conn.commit()
+                self.hits += 1
+                return row[0]
+            if row:
+                conn.execute('DELETE FROM llm_cache WHERE cache_key = ?', (key,))
+            self._count(conn, 'misses')
+            conn.commit()
+        except Exception as e:
+            logger.warning(f"LLM cache lookup failed: {str(e)}")
+        self.misses += 1
+        return None
+
+    def set(self, key: str, result: str, content_hash_value: str = None, prompt_ver: str = None,
+            provider: str = None, model: str = None):
+        """Store a successful LLM result and evict old entries if over budget"""
+        if not self.enabled or not isinstance(result, str):
+            return
+        try:
+            conn = self._connect()
+            now = time.time()
+            conn.execute('''
+                INSERT OR REPLACE INTO llm_cache
+                    (cache_key, content_hash, prompt_version, provider, model, result, size, created_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (key, content_hash_value or '', prompt_ver or '', provider, model, result,
+                  len(result.encode('utf-8')), now, now))
+            self._evict(conn, now)
+            conn.commit()
+        except Exception as e:
+            logger.warning(f"LLM cache store failed: {str(e)}")
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        if self.ttl > 0:
+            conn.execute('DELETE FROM llm_cache WHERE created_at < ?', (now - self.ttl,))
+        count, total = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache').fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        # Walk least-recently-used entries until both budgets are met
+        to_delete = []
+        for key, size in conn.execute('SELECT cache_key, size FROM llm_cache ORDER BY last_access ASC'):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            to_delete.append((key,))
+            count -= 1
+            total -= size
+        conn.executemany('DELETE FROM llm_cache WHERE cache_key = ?', to_delete)
+        for _ in to_delete:
+            self._count(conn, 'evictions')
+
+    def stats(self) -> dict:
+        """Return process and persistent hit/miss counters plus cache size"""
+        result = {
+            'enabled': self.enabled,
+            'path': self.path,
+            'ttl': self.ttl,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'process_hits': self.hits,
+            'process_misses': self.misses,
+        }
+        try:
+            conn = self._connect()
+            count, total = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache').fetchone()
+            counters = dict(conn.execute('SELECT name, value FROM llm_cache_counters').fetchall())
+            result.update({
+                'entries': count,
+                'size_bytes': total,
+                'hits': counters.get('hits', 0),
+                'misses': counters.get('misses', 0),
+                'evictions': counters.get('evictions', 0),
+            })
+            lookups = result['hits'] + result['misses']
+            result['hit_rate'] = round(result['hits'] / lookups, 4) if lookups else 0.0
+        except Exception as e:
+            result['error'] = str(e)
+        return result
+
+    def clear(self) -> dict:
+        """Remove all cached entries and reset counters"""
+        conn = self._connect()
+        conn.execute('DELETE FROM llm_cache')
+        conn.execute('DELETE FROM llm_cache_counters')
+        conn.commit()
+        self.hits = 0
+        self.misses = 0
+        return {'ok': True, 'message': 'LLM cache cleared.'}
+
+# Global cache instance
+llm_cache = LLMCache()
@@ -0,0 +1,363 @@
+"""
+Rotating store for the LLM interaction log
+Entries are appended as NDJSON to an active segment that rotates by size; rotated segments are
+optionally gzip-compressed and the oldest are pruned. A sidecar offset index holds one short line
+per entry (segment, offset, length, timestamp, provider, model, success), so viewers page through
+recent entries by reading the index backwards instead of loading the whole log.
+"""
+
+import os
+import re
+import json
+import gzip
+import shutil
+import threading
+import logging
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: entries are still serialized within the process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+LOG_PATH = os.environ.get('LLM_LOG_PATH') or os.path.join(os.path.dirname(__file__), '../../llm-interactions.log.json')
+SEGMENT_BYTES = int(os.environ.get('LLM_LOG_SEGMENT_BYTES', 16 * 1024 * 1024))  # 16 MB
+MAX_SEGMENTS = int(os.environ.get('LLM_LOG_MAX_SEGMENTS', 32))  # rotated segments kept
+COMPRESS = os.environ.get('LLM_LOG_COMPRESS', '1').lower() not in ('0', 'false', 'no')
+PAGE_SIZE = 50
+
+# Index fields, in the order they are stored on each index line
+INDEX_FIELDS = ('segment', 'offset', 'length', 'timestamp', 'provider', 'model', 'success')
+READ_BLOCK = 64 * 1024
+
+class LLMLogStore:
+    """Append-only, size-rotated NDJSON log with an offset index"""
+
+    def __init__(self, path: str = LOG_PATH, segment_bytes: int = SEGMENT_BYTES,
+                 max_segments: int = MAX_SEGMENTS, compress: bool = COMPRESS):
+        self.path = os.path.abspath(path)
+        self.index_path = self.path + '.idx'
+        self.segment_bytes = segment_bytes
+        self.max_segments = max_segments
+        self.compress = compress
+        self._segment_re = re.compile(re.escape(os.path.basename(self.path)) + r'\.(\d{6})(\.gz)?$')
+        self._lock = threading.Lock()
+        self._data = None  # (file, inode, segment number) of the open active segment
+        self._index = None
+
+    # --- files ---
+
+    def _segments(self) -> dict:
+        """Rotated segment number -> file path (the .gz file once compressed)"""
+        segments = {}
+        directory = os.path.dirname(self.path)
+        if not os.path.isdir(directory):
+            return segments
+        for name in os.listdir(directory):
+            match = self._segment_re.match(name)
+            if match:
+                number = int(match.group(1))
+                if match.group(2) or number not in segments:
+                    segments[number] = os.path.join(directory, name)
+        return segments
+
+    def _segment_path(self, number: int, active: int, segments: dict):
+        """File of a segment number, given one listing of the rotated segments"""
+        if number == active:
+            return self.path
+        return segments.get(number)
+
+    def _active_number(self) -> int:
+        segments = self._segments()
+        return max(segments) + 1 if segments else 0
+
+    @contextmanager
+    def _locked(self):
+        """Serialize writers across threads and (where supported) processes"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path + '.lock', 'a') as lock_file:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _open(self):
+        """The active segment and index handles, reopened when another process rotated the log"""
+        try:
+            inode = os.stat(self.path).st_ino
+        except OSError:
+            inode = None
+        if self._data is not None and self._data[1] == inode and os.path.exists(self.index_path):
+            return self._data[0], self._index, self._data[2]
+        self._close()
+        if inode is not None and not os.path.exists(self.index_path):
+            self._rebuild_index()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        data = open(self.path, 'ab')
+        self._data = (data, os.fstat(data.fileno()).st_ino, self._active_number())
+        self._index = open(self.index_path, 'ab')
+        return data, self._index, self._data[2]
+
+    def _close(self):
+        for handle in (self._data[0] if self._data else None, self._index):
+            if handle is not None:
+                handle.close()
+        self._data = None
+        self._index = None
+
+    # --- writing ---
+
+    def append(self, entry: dict):
+        """Append one entry; rotates the active segment once it exceeds segment_bytes"""
+        line = (json.dumps(entry) + '\n').encode('utf-8')
+        rotated = None
+        with self._locked():
+            data, index, number = self._open()
+            offset = data.seek(0, os.SEEK_END)
+            data.write(line)
+            data.flush()
+            record = [number, offset, len(line), entry.get('timestamp'), entry.get('provider'),
+                      entry.get('model'), bool(entry.get('success'))]
+            index.write((json.dumps(record) + '\n').encode('utf-8'))
+            index.flush()
+            if offset + len(line) >= self.segment_bytes:
+                rotated = self._rotate(number)
+        if rotated and self.compress:
+            self._compress(rotated)
+
+    def _rotate(self, number: int) -> str:
+        """Move the active segment aside and drop segments (and their index lines) beyond max_segments"""
+        self._close()
+        rotated = f'{self.path}.{number:06d}'
+        os.replace(self.path, rotated)
+        segments = self._segments()
+        expired = sorted(segments)[:-self.max_segments] if self.max_segments else sorted(segments)
+        for old in expired:
+            for path in (f'{self.path}.{old:06d}', f'{self.path}.{old:06d}.gz'):
+                if os.path.exists(path):
+                    os.remove(path)
+        if expired:
+            self._compact_index(expired[-1] + 1)
+        return rotated if os.path.exists(rotated) else None
+
+    def _compress(self, path: str):
+        """
+        gzip a rotated segment; readers use the .gz file once it is complete. Compression runs outside
+        the lock, so the .gz is only put in place (under the lock) if pruning has not removed the segment.
+        """
+        tmp_path = path + '.gz.tmp'
+        try:
+            with open(path, 'rb') as source, gzip.open(tmp_path, 'wb') as target:
+                shutil.copyfileobj(source, target)
+            with self._locked():
+                if os.path.exists(path):
+                    os.replace(tmp_path, path + '.gz')
+                    os.remove(path)
+        except FileNotFoundError:
+            pass  # pruned before it was compressed
+        except OSError as e:
+            logger.warning(f"Failed to compress LLM log segment {path}: {str(e)}")
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _compact_index(self, first_segment: int):
+        tmp_path = f'{self.index_path}.{os.getpid()}.tmp'
+        with open(self.index_path, 'rb') as source, open(tmp_path, 'wb') as target:
+            for line in source:
+                try:
+                    if json.loads(line)[0] >= first_segment:
+                        target.write(line)
+                except (ValueError, IndexError, TypeError):
+                    continue
+        os.replace(tmp_path, self.index_path)
+
+    def _rebuild_index(self):
+        """Index every existing segment (e.g. a log written before the index existed)"""
+        segments = self._segments()
+        active = max(segments) + 1 if segments else 0
+        tmp_path = f'{self.index_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as index:
+            for number in sorted(segments) + [active]:
+                path = self._segment_path(number, active, segments)
+                if not path or not os.path.exists(path):
+                    continue
+                opener = gzip.open if path.endswith('.gz') else open
+                offset = 0
+                with opener(path, 'rb') as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            entry = None
+                        if isinstance(entry, dict):
+                            record = [number, offset, len(line), entry.get('timestamp'), entry.get('provider'),
+                                      entry.get('model'), bool(entry.get('success'))]
+                            index.write((json.dumps(record) + '\n').encode('utf-8'))
+                        offset += len(line)
+        os.replace(tmp_path, self.index_path)
+
+    def rebuild_index(self) -> dict:
+        with self._locked():
+            self._close()
+            self._rebuild_index()
+        return {'ok': True, 'entries': self._count_entries()}
+
+    def clear(self) -> dict:
+        """Remove every segment and the index"""
+        with self._locked():
+            self._close()
+            directory = os.path.dirname(self.path)
+            paths = [self.path, self.index_path]
+            if os.path.isdir(directory):
+                paths += [os.path.join(directory, name) for name in os.listdir(directory) if self._segment_re.match(name)]
+            removed = 0
+            for path in paths:
+                if os.path.exists(path):
+                    os.remove(path)
+                    removed += 1
+        return {'ok': True, 'removed_files': removed}
+
+    # --- reading ---
+
+    def _ensure_index(self):
+        if not os.path.exists(self.index_path) and os.path.exists(self.path):
+            with self._locked():
+                if not os.path.exists(self.index_path):
+                    self._rebuild_index()
+
+    def _index_backwards(self):
+        """Index records, newest first, reading the index file from its end in blocks"""
+        try:
+            f = open(self.index_path, 'rb')
+        except OSError:
+            return
+        with f:
+            position = f.seek(0, os.SEEK_END)
+            tail = b''
+            while position > 0:
+                size = min(READ_BLOCK, position)
+                position -= size
+                f.seek(position)
+                lines = (f.read(size) + tail).split(b'\n')
+                tail = lines.pop(0)
+                for line in reversed(lines):
+                    record = self._parse_record(line)
+                    if record:
+                        yield record
+            record = self._parse_record(tail)
+            if record:
+                yield record
+
+    @staticmethod
+    def _parse_record(line: bytes):
+        if not line.strip():
+            return None
+        try:
+            values = json.loads(line)
+        except ValueError:
+            return None  # a line cut short by a crash
+        return dict(zip(INDEX_FIELDS, values)) if isinstance(values, list) and len(values) == len(INDEX_FIELDS) else None
+
+    def _read_entries(self, records: list) -> list:
+        """
+        Load the entries for index records (in the order given). The segments are listed once and each
+        segment is opened once and read forward in offset order, so a .gz segment is streamed up to the
+        last entry needed instead of being inflated into memory.
+        """
+        segments = self._segments()
+        active = max(segments) + 1 if segments else 0
+        by_segment = {}
+        for record in records:
+            by_segment.setdefault(record['segment'], []).append(record)
+        loaded = {}
+        for number, wanted in by_segment.items():
+            path = self._segment_path(number, active, segments)
+            if not path:
+                continue
+            opener = gzip.open if path.endswith('.gz') else open
+            try:
+                with opener(path, 'rb') as f:
+                    for record in sorted(wanted, key=lambda r: r['offset']):
+                        f.seek(record['offset'])  # gzip: decompresses forward without keeping the data
+                        try:
+                            entry = json.loads(f.read(record['length']))
+                        except ValueError:
+                            continue
+                        entry['id'] = f"{record['segment']}-{record['offset']}"
+                        loaded[(number, record['offset'])] = entry
+            except OSError:
+                continue
+        return [loaded[key] for key in ((r['segment'], r['offset']) for r in records) if key in loaded]
+
+    def page(self, limit: int = PAGE_SIZE, cursor: str = None, provider: str = None, model: str = None,
+             success: bool = None, since: str = None, until: str = None) -> dict:
+        """
+        Entries newest first, filtered on the index. Pass the returned next_cursor to get the next
+        (older) page; it is None after the last page.
+        """
+        self._ensure_index()
+        before = tuple(int(part) for part in cursor.split('-')) if cursor else None
+        records = []
+        has_more = False
+        for record in self._index_backwards():
+            if before and (record['segment'], record['offset']) >= before:
+                continue
+            if provider and record['provider'] != provider:
+                continue
+            if model and record['model'] != model:
+                continue
+            if success is not None and record['success'] != success:
+                continue
+            timestamp = record['timestamp'] or ''
+            if until and timestamp > until:
+                continue
+            if since and timestamp < since:
+                continue
+            if len(records) == limit:
+                has_more = True
+                break
+            records.append(record)
+        entries = self._read_entries(records)
+        next_cursor = f"{records[-1]['segment']}-{records[-1]['offset']}" if has_more and records else None
+        return {'ok': True, 'entries': entries, 'next_cursor': next_cursor}
+
+    def get(self, entry_id: str) -> dict:
+        """A single entry by its id ('<segment>-<offset>')"""
+        segment, offset = (int(part) for part in entry_id.split('-'))
+        self._ensure_index()
+        for record in self._index_backwards():
+            if record['segment'] == segment and record['offset'] == offset:
+                entries = self._read_entries([record])
+                if entries:
+                    return {'ok': True, 'entry': entries[0]}
+                break
+        return {'ok': False, 'error': f'Log entry {entry_id} not found'}
+
+    def _count_entries(self) -> int:
+        try:
+            with open(self.index_path, 'rb') as f:
+                return sum(block.count(b'\n') for block in iter(lambda: f.read(READ_BLOCK), b''))
+        except OSError:
+            return 0
+
+    def stats(self) -> dict:
+        self._ensure_index()
+        segments = self._segments()
+        files = [self.path] + list(segments.values())
+        return {
+            'entries': self._count_entries(),
+            'segments': len(segments) + (1 if os.path.exists(self.path) else 0),
+            'compressed_segments': sum(1 for path in segments.values() if path.endswith('.gz')),
+            'bytes': sum(os.path.getsize(path) for path in files if os.path.exists(path)),
+            'index_bytes': os.path.getsize(self.index_path) if os.path.exists(self.index_path) else 0,
+        }
+
+llm_log = LLMLogStore()
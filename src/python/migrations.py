@@ -0,0 +1,359 @@
+"""
+Versioned schema migrations for PLC Code Checker
+Each migration is applied once, in order, in its own transaction and is recorded
+in the schema_version table. Startup only needs a single version query.
+"""
+
+import sys
+from datetime import datetime
+
+import psycopg2
+import psycopg2.errors
+
+# Arbitrary constant identifying the migration advisory lock
+MIGRATION_LOCK_ID = 7317402
+
+# (version, description, statements); statements must be idempotent
+MIGRATIONS = [
+    (1, 'Baseline schema', [
+        '''
+        CREATE TABLE IF NOT EXISTS users (
+            id SERIAL PRIMARY KEY,
+            username TEXT UNIQUE NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            salt TEXT NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            last_login TIMESTAMPTZ,
+            is_active BOOLEAN DEFAULT TRUE,
+            role TEXT DEFAULT 'user',
+            failed_login_attempts INTEGER DEFAULT 0,
+            locked_until TIMESTAMPTZ
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS user_sessions (
+            id SERIAL PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            session_token TEXT UNIQUE NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            expires_at TIMESTAMPTZ NOT NULL,
+            is_active BOOLEAN DEFAULT TRUE,
+            FOREIGN KEY(user_id) REFERENCES users(id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS analyses (
+            id SERIAL PRIMARY KEY,
+            fileName TEXT,
+            date TIMESTAMPTZ,
+            status TEXT,
+            analysis_json TEXT,
+            filePath TEXT,
+            analysis_hash TEXT,
+            provider TEXT,
+            model TEXT,
+            user_id INTEGER,
+            FOREIGN KEY(user_id) REFERENCES users(id)
+        )
+        ''',
+        'ALTER TABLE analyses ADD COLUMN IF NOT EXISTS user_id INTEGER',
+        'ALTER TABLE analyses ADD COLUMN IF NOT EXISTS analysis_hash TEXT',
+        '''
+        CREATE TABLE IF NOT EXISTS baselines (
+            id SERIAL PRIMARY KEY,
+            fileName TEXT,
+            originalName TEXT,
+            date TIMESTAMPTZ,
+            filePath TEXT,
+            analysis_json TEXT,
+            analysis_hash TEXT,
+            provider TEXT,
+            model TEXT,
+            user_id INTEGER,
+            FOREIGN KEY(user_id) REFERENCES users(id)
+        )
+        ''',
+        'ALTER TABLE baselines ADD COLUMN IF NOT EXISTS user_id INTEGER',
+        'ALTER TABLE baselines ADD COLUMN IF NOT EXISTS analysis_json TEXT',
+        'ALTER TABLE baselines ADD COLUMN IF NOT EXISTS analysis_hash TEXT',
+        '''
+        CREATE TABLE IF NOT EXISTS comparison_history (
+            id SERIAL PRIMARY KEY,
+            analysisId INTEGER,
+            baselineId INTEGER,
+            timestamp TIMESTAMPTZ,
+            llm_prompt TEXT,
+            llm_result TEXT,
+            analysisFileName TEXT,
+            baselineFileName TEXT,
+            provider TEXT,
+            model TEXT,
+            FOREIGN KEY(analysisId) REFERENCES analyses(id),
+            FOREIGN KEY(baselineId) REFERENCES baselines(id)
+        )
+        ''',
+        'ALTER TABLE comparison_history ADD COLUMN IF NOT EXISTS analysisFileName TEXT',
+        'ALTER TABLE comparison_history ADD COLUMN IF NOT EXISTS baselineFileName TEXT',
+        'ALTER TABLE comparison_history ADD COLUMN IF NOT EXISTS provider TEXT',
+        'ALTER TABLE comparison_history ADD COLUMN IF NOT EXISTS model TEXT',
+        '''
+        CREATE TABLE IF NOT EXISTS ot_threat_intel (
+            id TEXT PRIMARY KEY,
+            title TEXT,
+            summary TEXT,
+            source TEXT,
+            retrieved_at TEXT,
+            affected_vendors TEXT,
+            threat_type TEXT,
+            severity TEXT,
+            industrial_protocols TEXT,
+            system_targets TEXT,
+            tags TEXT,
+            created_at TEXT,
+            updated_at TEXT,
+            site_relevance TEXT,
+            response_notes TEXT,
+            llm_response TEXT
+        )
+        ''',
+        # "user" is a reserved word in PostgreSQL and must be quoted
+        '''
+        CREATE TABLE IF NOT EXISTS audit_log (
+            id SERIAL PRIMARY KEY,
+            timestamp TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            action TEXT,
+            "user" TEXT,
+            details TEXT
+        )
+        ''',
+    ]),
+    (2, 'Indexes for listing, session and history queries', [
+        'CREATE INDEX IF NOT EXISTS idx_analyses_date_id ON analyses (date DESC, id DESC)',
+        'CREATE INDEX IF NOT EXISTS idx_baselines_date_id ON baselines (date DESC, id DESC)',
+        'CREATE INDEX IF NOT EXISTS idx_user_sessions_user_id ON user_sessions (user_id)',
+        'CREATE INDEX IF NOT EXISTS idx_user_sessions_active_expiry ON user_sessions (expires_at) WHERE is_active',
+        'CREATE INDEX IF NOT EXISTS idx_comparison_history_pair ON comparison_history (analysisId, baselineId, timestamp DESC)',
+        'CREATE INDEX IF NOT EXISTS idx_comparison_history_baseline ON comparison_history (baselineId, timestamp DESC)',
+        'CREATE INDEX IF NOT EXISTS idx_comparison_history_timestamp ON comparison_history (timestamp DESC)',
+        'CREATE INDEX IF NOT EXISTS idx_ot_threat_intel_retrieved_at ON ot_threat_intel (retrieved_at DESC)',
+        'CREATE INDEX IF NOT EXISTS idx_audit_log_timestamp ON audit_log (timestamp DESC)',
+    ]),
+    (3, 'Unique dedup keys for analyses, baselines and threat intel', [
+        # Collapse existing duplicates onto the oldest row before the unique indexes are built
+        '''
+        WITH ranked AS (
+            SELECT id, MIN(id) OVER (PARTITION BY fileName, COALESCE(filePath, ''), analysis_hash) AS keep_id
+            FROM analyses WHERE fileName IS NOT NULL AND analysis_hash IS NOT NULL
+        )
+        UPDATE comparison_history ch SET analysisId = r.keep_id
+        FROM ranked r WHERE ch.analysisId = r.id AND r.id <> r.keep_id
+        ''',
+        '''
+        WITH ranked AS (
+            SELECT id, MIN(id) OVER (PARTITION BY fileName, COALESCE(filePath, ''), analysis_hash) AS keep_id
+            FROM analyses WHERE fileName IS NOT NULL AND analysis_hash IS NOT NULL
+        )
+        DELETE FROM analyses a USING ranked r WHERE a.id = r.id AND r.id <> r.keep_id
+        ''',
+        '''
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_analyses_file_hash
+        ON analyses (fileName, (COALESCE(filePath, '')), analysis_hash)
+        ''',
+        '''
+        WITH ranked AS (
+            SELECT id, MIN(id) OVER (PARTITION BY fileName, COALESCE(filePath, ''), analysis_hash) AS keep_id
+            FROM baselines WHERE fileName IS NOT NULL AND analysis_hash IS NOT NULL
+        )
+        UPDATE comparison_history ch SET baselineId = r.keep_id
+        FROM ranked r WHERE ch.baselineId = r.id AND r.id <> r.keep_id
+        ''',
+        '''
+        WITH ranked AS (
+            SELECT id, MIN(id) OVER (PARTITION BY fileName, COALESCE(filePath, ''), analysis_hash) AS keep_id
+            FROM baselines WHERE fileName IS NOT NULL AND analysis_hash IS NOT NULL
+        )
+        DELETE FROM baselines b USING ranked r WHERE b.id = r.id AND r.id <> r.keep_id
+        ''',
+        '''
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_baselines_file_hash
+        ON baselines (fileName, (COALESCE(filePath, '')), analysis_hash)
+        ''',
+        # Must match db.threat_intel_fingerprint(): md5 over the stored columns joined by chr(31)
+        'ALTER TABLE ot_threat_intel ADD COLUMN IF NOT EXISTS content_fingerprint TEXT',
+        '''
+        UPDATE ot_threat_intel SET content_fingerprint = md5(concat_ws(chr(31),
+            COALESCE(title, ''), COALESCE(summary, ''), COALESCE(source, ''),
+            COALESCE(threat_type, ''), COALESCE(severity, ''), COALESCE(affected_vendors, ''),
+            COALESCE(industrial_protocols, ''), COALESCE(system_targets, ''), COALESCE(tags, '')))
+        WHERE content_fingerprint IS NULL
+        ''',
+        '''
+        WITH ranked AS (
+            SELECT id, ROW_NUMBER() OVER (PARTITION BY content_fingerprint ORDER BY retrieved_at NULLS LAST, id) AS rn
+            FROM ot_threat_intel
+        )
+        DELETE FROM ot_threat_intel t USING ranked r WHERE t.id = r.id AND r.rn > 1
+        ''',
+        'CREATE UNIQUE INDEX IF NOT EXISTS uq_ot_threat_intel_fingerprint ON ot_threat_intel (content_fingerprint)',
+    ]),
+    (4, 'Persistent analysis job queue', [
+        '''
+        CREATE TABLE IF NOT EXISTS analysis_jobs (
+            id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL DEFAULT 'analyze',
+            status TEXT NOT NULL DEFAULT 'queued',
+            file_name TEXT,
+            content TEXT,
+            provider TEXT,
+            model TEXT,
+            result TEXT,
+            error TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 3,
+            worker_id TEXT,
+            lease_expires_at TIMESTAMPTZ,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            started_at TIMESTAMPTZ,
+            finished_at TIMESTAMPTZ
+        )
+        ''',
+        # Claim order for workers; finished jobs drop out of the partial index
+        '''
+        CREATE INDEX IF NOT EXISTS idx_analysis_jobs_pending
+        ON analysis_jobs (created_at) WHERE status IN ('queued', 'running')
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_analysis_jobs_finished_at ON analysis_jobs (finished_at)',
+    ]),
+    (5, 'Per-block LLM analyses keyed by normalized block hash', [
+        '''
+        CREATE TABLE IF NOT EXISTS block_analyses (
+            block_hash TEXT NOT NULL,
+            prompt_version TEXT NOT NULL,
+            provider TEXT NOT NULL,
+            model TEXT NOT NULL,
+            block_name TEXT,
+            block_kind TEXT,
+            llm_result TEXT NOT NULL,
+            instruction_analysis TEXT,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            last_used_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            use_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (block_hash, prompt_version, provider, model)
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_block_analyses_last_used ON block_analyses (last_used_at)',
+    ]),
+    (6, 'Cross-reference rows (blocks, calls, address reads/writes) per analysis', [
+        '''
+        CREATE TABLE IF NOT EXISTS plc_xref (
+            analysis_id INTEGER NOT NULL REFERENCES analyses(id) ON DELETE CASCADE,
+            relation TEXT NOT NULL,
+            source_block TEXT NOT NULL,
+            source_kind TEXT,
+            target TEXT NOT NULL,
+            network INTEGER,
+            line INTEGER,
+            conditional BOOLEAN NOT NULL DEFAULT FALSE
+        )
+        ''',
+        # "Who writes X" / "who calls FC n", and the call-graph walk out of a block
+        'CREATE INDEX IF NOT EXISTS idx_plc_xref_target ON plc_xref (analysis_id, target, relation)',
+        'CREATE INDEX IF NOT EXISTS idx_plc_xref_source ON plc_xref (analysis_id, source_block, relation)',
+    ]),
+    (7, 'Git blob id on analyses for resumable branch scans', [
+        'ALTER TABLE analyses ADD COLUMN IF NOT EXISTS blob_sha TEXT',
+        'CREATE INDEX IF NOT EXISTS idx_analyses_blob_sha ON analyses (blob_sha) WHERE blob_sha IS NOT NULL',
+    ]),
+    (8, 'Last scanned commit per repository, branch and scan kind', [
+        '''
+        CREATE TABLE IF NOT EXISTS git_scan_state (
+            repo_path TEXT NOT NULL,
+            branch TEXT NOT NULL,
+            kind TEXT NOT NULL DEFAULT 'changes',
+            last_commit TEXT NOT NULL,
+            details TEXT,
+            scanned_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (repo_path, branch, kind)
+        )
+        ''',
+    ]),
+    (9, 'Instructions added and removed per commit for history lookups', [
+        '''
+        CREATE TABLE IF NOT EXISTS plc_history (
+            id BIGSERIAL PRIMARY KEY,
+            repo_path TEXT NOT NULL,
+            commit_sha TEXT NOT NULL,
+            author TEXT,
+            author_email TEXT,
+            authored_at TIMESTAMPTZ,
+            committed_at TIMESTAMPTZ NOT NULL,
+            file_path TEXT NOT NULL,
+            change TEXT NOT NULL,
+            line INTEGER NOT NULL,
+            position INTEGER NOT NULL DEFAULT 0,
+            op TEXT NOT NULL,
+            operand TEXT NOT NULL,
+            instruction TEXT NOT NULL
+        )
+        ''',
+        # One row per instruction of a changed line (a rung holds several; position is the instruction's
+        # index within the line), so re-indexing a commit after an interrupted scan is a no-op
+        'CREATE UNIQUE INDEX IF NOT EXISTS uq_plc_history_instruction ON plc_history (repo_path, commit_sha, file_path, change, line, position)',
+        # "First commit that introduced MOV ... DB12": by opcode or exact instruction, oldest first
+        'CREATE INDEX IF NOT EXISTS idx_plc_history_op ON plc_history (repo_path, op, committed_at)',
+        'CREATE INDEX IF NOT EXISTS idx_plc_history_instruction ON plc_history (repo_path, instruction, committed_at)',
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def get_schema_version(conn) -> int:
+    """Return the applied schema version (0 when the schema_version table does not exist yet)"""
+    c = conn.cursor()
+    try:
+        c.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version')
+        return c.fetchone()[0]
+    except psycopg2.errors.UndefinedTable:
+        conn.rollback()
+        return 0
+
+def migrate(conn, target: int = None) -> dict:
+    """Apply pending migrations up to target (default: latest) and return what was applied"""
+    target = LATEST_VERSION if target is None else target
+    current = get_schema_version(conn)
+    conn.commit()
+    start_version = current
+    applied = []
+    if current >= target:
+        return {'ok': True, 'from_version': start_version, 'version': current, 'applied': applied}
+    c = conn.cursor()
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        )
+    ''')
+    conn.commit()
+    for version, description, statements in MIGRATIONS:
+        if version > target:
+            break
+        try:
+            # Serialize concurrent migrators (e.g. several gunicorn workers starting at once)
+            c.execute('SELECT pg_advisory_xact_lock(%s)', (MIGRATION_LOCK_ID,))
+            c.execute('SELECT 1 FROM schema_version WHERE version = %s', (version,))
+            if c.fetchone():
+                conn.commit()
+                continue
+            for statement in statements:
+                c.execute(statement)
+            c.execute('INSERT INTO schema_version (version, description, applied_at) VALUES (%s, %s, %s)',
+                      (version, description, datetime.now().isoformat()))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            print(f"[DEBUG] Migration {version} ({description}) failed", file=sys.stderr)
+            raise
+        applied.append({'version': version, 'description': description})
+    return {'ok': True, 'from_version': start_version, 'version': get_schema_version(conn), 'applied': applied}
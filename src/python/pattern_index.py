@@ -0,0 +1,174 @@
+"""
+Multi-pattern matcher for instruction-level scanning
+Compiles the rule engine's literal instruction patterns and the ot_threat_intel
+terms (vendors, protocols, tags) into one Aho-Corasick automaton, so every line
+of a file is checked against all patterns in a single linear pass.
+"""
+
+import os
+import re
+import sys
+import time
+import threading
+from collections import deque
+from typing import Dict, List
+
+sys.path.append(os.path.dirname(__file__))
+from rules import INSTRUCTION_PATTERNS, RISK_ORDER, COMMENT_RE, max_risk
+
+# Rebuild the shared index after this many seconds so newly synced threat intel is picked up
+PATTERN_INDEX_TTL = float(os.environ.get('PATTERN_INDEX_TTL', 300))
+# Threat intel terms shorter than this are too ambiguous to match on
+MIN_TERM_LENGTH = 3
+
+WHITESPACE_RE = re.compile(r'\s+')
+
+def normalize(text: str) -> str:
+    """Case- and whitespace-insensitive form used for both patterns and scanned lines"""
+    return WHITESPACE_RE.sub(' ', text).strip().upper()
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == '_'
+
+class PatternIndex:
+    """
+    Aho-Corasick automaton over normalized literal patterns.
+    Matches must sit on token boundaries, so 'SFC 1' does not fire inside 'SFC 14'.
+    """
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]  # state -> indexes into self.patterns
+        self.patterns = []  # (normalized pattern, insight, risk_level, source)
+        self._compiled = False
+
+    def add(self, pattern: str, insight: str, risk_level: str = 'Low', source: str = 'rules'):
+        key = normalize(pattern)
+        if not key:
+            return
+        state = 0
+        for ch in key:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append(len(self.patterns))
+        self.patterns.append((key, insight, risk_level, source))
+        self._compiled = False
+
+    def compile(self):
+        """Compute failure links breadth-first; outputs of fallback states are merged in"""
+        queue = deque()
+        for state in self._goto[0].values():
+            self._fail[state] = 0
+            queue.append(state)
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+        self._compiled = True
+        return self
+
+    def search(self, text: str) -> List[int]:
+        """Indexes of the patterns found in already-normalized text (each at most once)"""
+        if not self._compiled:
+            self.compile()
+        goto, fail, out, patterns = self._goto, self._fail, self._out, self.patterns
+        found = []
+        state = 0
+        for pos, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for index in out[state]:
+                key = patterns[index][0]
+                start = pos - len(key) + 1
+                before = text[start - 1] if start > 0 else ' '
+                after = text[pos + 1] if pos + 1 < len(text) else ' '
+                if (_is_word_char(key[0]) and _is_word_char(before)) or (_is_word_char(key[-1]) and _is_word_char(after)):
+                    continue
+                if index not in found:
+                    found.append(index)
+        return found
+
+    def scan(self, content: str) -> List[Dict]:
+        """
+        Scan content line by line and return one instruction_analysis row per line with hits:
+        {'instruction', 'insight', 'risk_level', 'line'}; several hits on a line are combined.
+        """
+        rows = []
+        for line_no, raw in enumerate(content.splitlines(), 1):
+            text = normalize(COMMENT_RE.sub('', raw))
+            if not text:
+                continue
+            hits = self.search(text)
+            if not hits:
+                continue
+            insights = []
+            for index in hits:
+                insight = self.patterns[index][1]
+                if insight not in insights:
+                    insights.append(insight)
+            rows.append({
+                'instruction': raw.strip(),
+                'insight': ' '.join(insights),
+                'risk_level': max_risk(self.patterns[index][2] for index in hits),
+                'line': line_no,
+            })
+        return rows
+
+def _threat_intel_risk(severity) -> str:
+    """A term match is indicative only, so threat intel hits are capped at Medium"""
+    level = str(severity or '').strip().capitalize()
+    if level not in RISK_ORDER:
+        return 'Low'
+    return min(level, 'Medium', key=RISK_ORDER.get)
+
+def build_pattern_index(threat_intel: List[Dict] = None) -> PatternIndex:
+    """Build and compile an index from the rule patterns plus threat intel term lists"""
+    index = PatternIndex()
+    for pattern, insight, risk_level in INSTRUCTION_PATTERNS:
+        index.add(pattern, insight, risk_level, 'rules')
+    for entry in threat_intel or []:
+        risk_level = _threat_intel_risk(entry.get('severity'))
+        for field, label in (('affected_vendors', 'vendor'), ('industrial_protocols', 'protocol'), ('tags', 'tag')):
+            for term in entry.get(field) or []:
+                if not isinstance(term, str) or len(term.strip()) < MIN_TERM_LENGTH:
+                    continue
+                index.add(term, f"Matches threat intel {label} '{term.strip()}' ({entry.get('title')}).",
+                          risk_level, f"threat_intel:{entry.get('id')}")
+    return index.compile()
+
+_indexes = {}  # include_threat_intel -> (index, built_at)
+_index_lock = threading.Lock()
+
+def get_pattern_index(include_threat_intel: bool = True) -> PatternIndex:
+    """Shared index, rebuilt every PATTERN_INDEX_TTL seconds; falls back to rule patterns if the DB is unavailable"""
+    with _index_lock:
+        cached = _indexes.get(include_threat_intel)
+        if cached and time.monotonic() - cached[1] <= PATTERN_INDEX_TTL:
+            return cached[0]
+        threat_intel = []
+        if include_threat_intel:
+            try:
+                from db import list_ot_threat_intel_terms
+                threat_intel = list_ot_threat_intel_terms()
+            except Exception as e:
+                print(f"[DEBUG] pattern index built without threat intel: {e}", file=sys.stderr)
+        index = build_pattern_index(threat_intel)
+        _indexes[include_threat_intel] = (index, time.monotonic())
+        return index
+
+def scan_content(content: str, include_threat_intel: bool = True) -> List[Dict]:
+    """Per-line pattern hits for content, in instruction_analysis shape"""
+    return get_pattern_index(include_threat_intel).scan(content)
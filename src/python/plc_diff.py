@@ -0,0 +1,142 @@
+"""
+Structural diff of two PLC programs
+Aligns blocks by name and networks by normalized hash, then diffs the instructions
+of modified networks, so --compare only has to send the changed hunks to the LLM.
+"""
+
+import os
+import sys
+from difflib import SequenceMatcher
+from typing import Dict, List
+
+sys.path.append(os.path.dirname(__file__))
+from plc_model import ProgramModel, Block, parse_program
+
+# Unchanged instructions shown around each change in a hunk
+CONTEXT_LINES = int(os.environ.get('DIFF_CONTEXT_LINES', 2))
+
+def _network_label(network) -> str:
+    return f"network {network.index}" if network is not None else 'network -'
+
+def diff_instructions(old_network, new_network, context: int = CONTEXT_LINES) -> Dict:
+    """Added/removed instructions between two versions of a network, plus a hunk with context"""
+    old = [i.text for i in old_network.instructions]
+    new = [i.text for i in new_network.instructions]
+    added, removed, lines = [], [], []
+    matcher = SequenceMatcher(None, old, new, autojunk=False)
+    for group in matcher.get_grouped_opcodes(context):
+        lines.append(f"@@ {_network_label(old_network)} (line {old_network.first_line}) -> "
+                     f"{_network_label(new_network)} (line {new_network.first_line}) @@")
+        for tag, i1, i2, j1, j2 in group:
+            if tag == 'equal':
+                lines.extend(f"  {text}" for text in old[i1:i2])
+                continue
+            for instruction in old_network.instructions[i1:i2]:
+                removed.append({'line': instruction.line, 'instruction': instruction.text})
+                lines.append(f"- {instruction.text}")
+            for instruction in new_network.instructions[j1:j2]:
+                added.append({'line': instruction.line, 'instruction': instruction.text})
+                lines.append(f"+ {instruction.text}")
+    return {'added': added, 'removed': removed, 'hunk': '\n'.join(lines)}
+
+def _whole_network_hunk(network, sign: str) -> str:
+    header = f"@@ {'added' if sign == '+' else 'removed'} {_network_label(network)} (line {network.first_line}) @@"
+    return '\n'.join([header] + [f"{sign} {i.text}" for i in network.instructions])
+
+def diff_blocks(old_block: Block, new_block: Block, context: int = CONTEXT_LINES) -> Dict:
+    """Align networks by hash and diff the instructions of networks that changed"""
+    result = {'name': new_block.name, 'kind': new_block.kind or old_block.kind,
+              'networks_added': 0, 'networks_removed': 0, 'networks_modified': 0,
+              'added': [], 'removed': [], 'hunks': []}
+    old_hashes = [n.hash for n in old_block.networks]
+    new_hashes = [n.hash for n in new_block.networks]
+    matcher = SequenceMatcher(None, old_hashes, new_hashes, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            continue
+        old_networks = old_block.networks[i1:i2]
+        new_networks = new_block.networks[j1:j2]
+        paired = min(len(old_networks), len(new_networks)) if tag == 'replace' else 0
+        for old_network, new_network in zip(old_networks[:paired], new_networks[:paired]):
+            changes = diff_instructions(old_network, new_network, context)
+            result['networks_modified'] += 1
+            result['added'].extend(changes['added'])
+            result['removed'].extend(changes['removed'])
+            if changes['hunk']:
+                result['hunks'].append(changes['hunk'])
+        for network in old_networks[paired:]:
+            result['networks_removed'] += 1
+            result['removed'].extend({'line': i.line, 'instruction': i.text} for i in network.instructions)
+            result['hunks'].append(_whole_network_hunk(network, '-'))
+        for network in new_networks[paired:]:
+            result['networks_added'] += 1
+            result['added'].extend({'line': i.line, 'instruction': i.text} for i in network.instructions)
+            result['hunks'].append(_whole_network_hunk(network, '+'))
+    return result
+
+def diff_programs(baseline: ProgramModel, analysis: ProgramModel, context: int = CONTEXT_LINES) -> Dict:
+    """
+    Structural diff from baseline to analysis. Blocks are matched by name; unchanged blocks
+    (same normalized hash) are skipped without looking at their networks.
+    """
+    added = [b for b in analysis.blocks if baseline.get(b.name) is None]
+    removed = [b for b in baseline.blocks if analysis.get(b.name) is None]
+    modified = []
+    unchanged = 0
+    for block in analysis.blocks:
+        old_block = baseline.get(block.name)
+        if old_block is None:
+            continue
+        # Identical text needs no parsing; otherwise compare normalized hashes
+        if old_block.text == block.text or old_block.hash == block.hash:
+            unchanged += 1
+            continue
+        block_diff = diff_blocks(old_block, block, context)
+        if block_diff['hunks']:
+            modified.append(block_diff)
+        else:
+            unchanged += 1
+    return {
+        'blocks_added': [{'name': b.name, 'kind': b.kind, 'instructions': len(b.instructions)} for b in added],
+        'blocks_removed': [{'name': b.name, 'kind': b.kind, 'instructions': len(b.instructions)} for b in removed],
+        'blocks_modified': modified,
+        'summary': {
+            'blocks_added': len(added),
+            'blocks_removed': len(removed),
+            'blocks_modified': len(modified),
+            'blocks_unchanged': unchanged,
+            'instructions_added': sum(len(m['added']) for m in modified) + sum(len(b.instructions) for b in added),
+            'instructions_removed': sum(len(m['removed']) for m in modified) + sum(len(b.instructions) for b in removed),
+        },
+        '_added_blocks': added,
+        '_removed_blocks': removed,
+    }
+
+def diff_contents(baseline_content: str, analysis_content: str, context: int = CONTEXT_LINES) -> Dict:
+    """Parse both sources and diff them"""
+    return diff_programs(parse_program(baseline_content), parse_program(analysis_content), context)
+
+def has_changes(diff: Dict) -> bool:
+    summary = diff['summary']
+    return bool(summary['blocks_added'] or summary['blocks_removed'] or summary['blocks_modified'])
+
+def diff_hunk_units(diff: Dict) -> List:
+    """
+    Changed hunks as (name, text, parts) units for chunker.chunk_units: one unit per changed
+    block, with each hunk as a part so oversized blocks split on hunk boundaries.
+    """
+    units = []
+    for block in diff['_added_blocks']:
+        parts = [f"### Added block {block.name}\n"] + [_whole_network_hunk(n, '+') + '\n' for n in block.networks if n.instructions]
+        units.append((block.name, ''.join(parts), parts))
+    for block in diff['_removed_blocks']:
+        parts = [f"### Removed block {block.name}\n"] + [_whole_network_hunk(n, '-') + '\n' for n in block.networks if n.instructions]
+        units.append((block.name, ''.join(parts), parts))
+    for block in diff['blocks_modified']:
+        parts = [f"### Modified block {block['name']}\n"] + [hunk + '\n' for hunk in block['hunks']]
+        units.append((block['name'], ''.join(parts), parts))
+    return units
+
+def public_diff(diff: Dict) -> Dict:
+    """The JSON-serializable part of a diff (without the parsed block objects)"""
+    return {key: value for key, value in diff.items() if not key.startswith('_')}
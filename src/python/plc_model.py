@@ -0,0 +1,168 @@
+"""
+Parsed PLC program model: blocks -> networks -> instructions
+Each block and network carries a normalized content hash that ignores whitespace,
+comments and timestamps, so unchanged logic can be recognised across revisions.
+"""
+
+import os
+import re
+import sys
+import hashlib
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.dirname(__file__))
+from chunker import split_units, block_kind_and_name, detect_format
+from rules import clean_line
+
+# Lines that carry metadata rather than logic
+METADATA_LINE_RE = re.compile(r'^\s*(?:VERSION|AUTHOR|FAMILY|KNOW_HOW_PROTECT|CODE_VERSION1)\b\s*:', re.IGNORECASE)
+# Export/edit timestamps in L5X attributes (ExportDate="...", LastModifiedDate="..."). Only these are
+# dropped: dates in code (D#2025-01-01, DT#..., constants) are logic and must change the hash.
+TIMESTAMP_ATTR_RE = re.compile(r'\b(\w*Date|LastModified\w*|Time[Ss]tamp)="[^"]*"')
+L5X_COMMENT_RE = re.compile(r'\s//\s.*$')
+WHITESPACE_RE = re.compile(r'\s+')
+
+def normalize_line(line: str) -> str:
+    """Logic-only form of a source line ('' for comments, metadata and blank lines)"""
+    if METADATA_LINE_RE.match(line):
+        return ''
+    if '//' in line:
+        line = L5X_COMMENT_RE.sub('', line)
+    line = clean_line(line)
+    if '<' in line and '="' in line:
+        line = TIMESTAMP_ATTR_RE.sub(r'\1=""', line)
+    return WHITESPACE_RE.sub(' ', line).strip()
+
+def normalized_hash(lines: List[str]) -> str:
+    """Stable hash over normalized logic lines"""
+    digest = hashlib.sha256()
+    for line in lines:
+        if line:
+            digest.update(line.encode('utf-8'))
+            digest.update(b'\n')
+    return digest.hexdigest()[:32]
+
+class Instruction:
+    """One logic line of a network"""
+
+    def __init__(self, line: int, text: str):
+        self.line = line
+        self.text = text
+        parts = text.split(None, 1)
+        self.op = parts[0].upper() if parts else ''
+        self.operand = parts[1].strip().rstrip(';') if len(parts) > 1 else ''
+
+    def to_dict(self) -> Dict:
+        return {'line': self.line, 'text': self.text, 'op': self.op, 'operand': self.operand}
+
+class Network:
+    """A network (STL/SCL) or rung/ST line group (L5X) within a block"""
+
+    def __init__(self, index: int, text: str, first_line: int):
+        self.index = index
+        self.text = text
+        self.first_line = first_line
+        self.instructions = []
+        for offset, raw in enumerate(text.splitlines()):
+            normalized = normalize_line(raw)
+            if normalized:
+                self.instructions.append(Instruction(first_line + offset, normalized))
+        self._hash = None
+
+    @property
+    def hash(self) -> str:
+        if self._hash is None:
+            self._hash = normalized_hash([i.text for i in self.instructions])
+        return self._hash
+
+    def to_dict(self) -> Dict:
+        return {'index': self.index, 'first_line': self.first_line, 'hash': self.hash,
+                'instructions': len(self.instructions)}
+
+class Block:
+    """An OB/FB/FC/DB/UDT (or L5X routine) with its networks; networks and hash are built on first use"""
+
+    def __init__(self, name: str, text: str, parts: List[str], first_line: int = 1):
+        self.name = name
+        self.text = text
+        self.parts = parts
+        self.first_line = first_line
+        header = text.lstrip().splitlines()[0] if text.strip() else ''
+        self.kind, _ = block_kind_and_name(header)
+        self._networks = None
+        self._hash = None
+
+    @property
+    def networks(self) -> List[Network]:
+        if self._networks is None:
+            self._networks = []
+            pos, line = 0, self.first_line
+            for index, part in enumerate(self.parts):
+                found = self.text.find(part, pos)
+                start = found if found >= 0 else pos
+                line += self.text.count('\n', pos, start)
+                self._networks.append(Network(index, part, line))
+                line += part.count('\n')
+                pos = start + len(part)
+        return self._networks
+
+    @property
+    def hash(self) -> str:
+        # The networks cover the whole block, so their normalized lines are the block's logic
+        if self._hash is None:
+            self._hash = normalized_hash([i.text for network in self.networks for i in network.instructions])
+        return self._hash
+
+    @property
+    def instructions(self) -> List[Instruction]:
+        return [i for network in self.networks for i in network.instructions]
+
+    def to_dict(self) -> Dict:
+        return {'name': self.name, 'kind': self.kind, 'hash': self.hash, 'first_line': self.first_line,
+                'networks': len(self.networks), 'instructions': sum(len(n.instructions) for n in self.networks)}
+
+class ProgramModel:
+    """All blocks of a source file or export, in source order"""
+
+    def __init__(self, blocks: List[Block]):
+        self.blocks = blocks
+        self.by_name = {}
+        counts = {}
+        for block in blocks:
+            # Segments outside blocks (header, interblock, trailer) repeat: later ones become 'interblock#2', ...
+            counts[block.name] = counts.get(block.name, 0) + 1
+            if counts[block.name] > 1:
+                block.name = f'{block.name}#{counts[block.name]}'
+            self.by_name[block.name] = block
+
+    def get(self, name: str) -> Optional[Block]:
+        return self.by_name.get(name)
+
+    def to_dict(self) -> Dict:
+        return {'blocks': [block.to_dict() for block in self.blocks]}
+
+def parse_units(units) -> ProgramModel:
+    """Build a model from (name, text, parts) units (chunker.split_units or l5x_parser.routine_units)"""
+    blocks = []
+    line = 1
+    for name, text, parts in units:
+        blocks.append(Block(name, text, parts, line))
+        line += text.count('\n')
+    return ProgramModel(blocks)
+
+def parse_program(content: str) -> ProgramModel:
+    """Parse STL/SCL source or an L5X export into a program model"""
+    units = split_units(content)
+    if detect_format(content) == 'l5x':
+        # Routine text is rebuilt by the L5X parser, so line numbers are relative to the compact form
+        return parse_units(units)
+    blocks = []
+    pos, line = 0, 1
+    for name, text, parts in units:
+        found = content.find(text, pos)
+        start = found if found >= 0 else pos
+        line += content.count('\n', pos, start)
+        blocks.append(Block(name, text, parts, line))
+        line += text.count('\n')
+        pos = start + len(text)
+    return ProgramModel(blocks)
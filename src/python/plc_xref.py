@@ -0,0 +1,263 @@
+"""
+Cross-reference index for a parsed PLC program
+Maps each block to its callers/callees and each address (I/Q/M, DB, timers, counters,
+symbols, L5X tags) to the instructions that read or write it, so questions like
+"who writes DB12.DBX4.0" or "which FCs are unreachable from OB1" are lookups
+instead of a rescan or an LLM guess.
+"""
+
+import os
+import re
+import sys
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(__file__))
+from plc_model import ProgramModel, parse_program
+from rules import CALL_RE, SCL_CALL_RE, normalize_block_name
+
+# Absolute addresses; bare I/Q/M need a bit number so jump labels such as M001 never match
+ABSOLUTE_ADDRESS = (
+    r'%?(?:DB\s*\d+\s*\.\s*DB[XBWD]\s*\d+(?:\.[0-7])?'
+    r'|D[BI][XBWD]\s*\d+(?:\.[0-7])?'
+    r'|P[IQ][BWD]\s*\d+'
+    r'|[IQM]\s*\d+\.[0-7]'
+    r'|[IQM][BWD]\s*\d+'
+    r'|[TCZ]\s*\d+)'
+)
+SYMBOL = r'"[^"]+"(?:\.(?:"[^"]+"|[A-Za-z_]\w*))*'
+ADDRESS_RE = re.compile(rf'(?<![\w.#"]){ABSOLUTE_ADDRESS}(?![\w.])|{SYMBOL}', re.IGNORECASE)
+OPEN_DB_RE = re.compile(r'^OPN\s+%?DB\s*(\d+)$', re.IGNORECASE)
+INSTANCE_DB_RE = re.compile(r',\s*(%?DB\s*\d+|"[^"]+")', re.IGNORECASE)
+SCL_ASSIGN_RE = re.compile(r'^(?P<target>[^:=()]+?)\s*:=(?P<value>.*)$')
+SCL_OUTPUT_RE = re.compile(r'=>\s*(' + SYMBOL + r'|' + ABSOLUTE_ADDRESS + r'|[A-Za-z_][\w.]*)', re.IGNORECASE)
+SCL_BRANCH_RE = re.compile(r'^(?:IF|CASE|WHILE|FOR|REPEAT)\b', re.IGNORECASE)
+SCL_END_IF_RE = re.compile(r'\b(?:END_IF|END_CASE|END_WHILE|END_FOR|END_REPEAT)\b', re.IGNORECASE)
+BARE_DB_ADDRESS_RE = re.compile(r'^DB[XBWD]\d')
+SYMBOL_DOT_RE = re.compile(r'\s*\.\s*')
+WHITESPACE_RE = re.compile(r'\s+')
+CDATA_RE = re.compile(r'<!\[CDATA\[|\]\]>')
+
+# STL operations that store to their operand; everything else with an address operand reads it
+STL_WRITE_OPS = {'=', 'S', 'R', 'T', 'FP', 'FN', 'SP', 'SE', 'SD', 'SS', 'SF', 'SI', 'SV', 'SA',
+                 'CU', 'CD', 'ZV', 'ZR'}
+STL_CONDITIONAL_JUMPS = {'JC', 'JCN', 'JCB', 'JNB', 'JBI', 'JNBI', 'JZ', 'JN', 'JP', 'JM', 'JPZ', 'JMZ',
+                         'JO', 'JOS', 'JUO', 'SPB', 'SPBN', 'SPBB', 'SPBNB'}
+STL_READ_OPS = {'A', 'AN', 'O', 'ON', 'X', 'XN', 'U', 'UN', 'L', 'LC', 'LAR1', 'LAR2'}
+STL_SKIP_OPS = {'JU', 'JL', 'LOOP', 'SPA', 'SPL', 'BE', 'BEC', 'BEU', 'NETWORK', 'TITLE', 'BEGIN', 'NOP'}
+BLOCK_HEADER_OPS = {'ORGANIZATION_BLOCK', 'FUNCTION_BLOCK', 'FUNCTION', 'DATA_BLOCK', 'TYPE', 'VERSION',
+                    'AUTHOR', 'FAMILY', 'NAME'}
+
+# RSLogix ladder: instruction(operands); operand positions that are written
+LADDER_RE = re.compile(r'\b([A-Z]{2,4})\s*\(([^()]*)\)')
+LADDER_WRITES = {'OTE': (0,), 'OTL': (0,), 'OTU': (0,), 'ONS': (0,), 'OSR': (0, 1), 'OSF': (0, 1),
+                 'TON': (0,), 'TOF': (0,), 'RTO': (0,), 'CTU': (0,), 'CTD': (0,), 'RES': (0,),
+                 'MOV': (1,), 'COP': (1,), 'CPS': (1,), 'CPT': (0,), 'ADD': (2,), 'SUB': (2,),
+                 'MUL': (2,), 'DIV': (2,), 'CLR': (0,), 'MSG': (0,)}
+LADDER_TAG_RE = re.compile(r'^[A-Za-z_][\w:.\[\]]*$')
+LADDER_CONDITIONS = {'XIC', 'XIO', 'EQU', 'NEQ', 'GRT', 'GEQ', 'LES', 'LEQ', 'LIM', 'MEQ'}
+
+def canonical_address(address: str) -> str:
+    """'DB 12.DBX 4.0' -> 'DB12.DBX4.0', '%M10.0' -> 'M10.0'; symbols keep their spelling"""
+    address = address.strip()
+    if address.startswith('"'):
+        return SYMBOL_DOT_RE.sub('.', address)
+    return WHITESPACE_RE.sub('', address.lstrip('%')).upper()
+
+def _addresses(text: str, open_db: Optional[str] = None) -> List[str]:
+    found = []
+    for match in ADDRESS_RE.finditer(text):
+        address = canonical_address(match.group(0))
+        if open_db and BARE_DB_ADDRESS_RE.match(address):
+            # DBX 4.0 after OPN DB 12 is DB12.DBX4.0
+            address = f'{open_db}.{address}'
+        if address not in found:
+            found.append(address)
+    return found
+
+def split_instructions(text: str) -> List[Tuple[str, str, str]]:
+    """
+    (op, operand, instruction) for each instruction on a normalized logic line: every ladder
+    MNEMONIC(args) (RSLogix rungs, SCL calls such as MOV(100, DB12.DBW4)), an SCL assignment as
+    op ':=', otherwise the STL/SCL statement as op and operand. XML markup lines yield nothing.
+    """
+    text = CDATA_RE.sub('', text).strip()
+    if not text or (text.startswith('<') and text.endswith('>')):
+        return []
+    found = []
+    assign = SCL_ASSIGN_RE.match(text)
+    if assign:
+        target, value = assign.group('target').strip(), assign.group('value').strip().rstrip(';').strip()
+        found.append((':=', f'{target} := {value}', f'{target} := {value}'))
+    for mnemonic, args in LADDER_RE.findall(text):
+        operand = ','.join(arg.strip() for arg in args.split(','))
+        found.append((mnemonic, operand, f'{mnemonic}({operand})'))
+    if not found:
+        parts = text.rstrip(';').split(None, 1)
+        operand = parts[1].strip() if len(parts) > 1 else ''
+        found.append((parts[0].upper(), operand, ' '.join(parts)))
+    return found
+
+def _block_entry(block) -> Dict:
+    return {'name': block.name, 'kind': block.kind, 'line': block.first_line, 'calls': [], 'called_by': []}
+
+class CrossReference:
+    """Call graph and address readers/writers of one program"""
+
+    def __init__(self):
+        self.blocks = {}     # canonical name -> {'name', 'kind', 'line', 'calls', 'called_by'}
+        self.addresses = {}  # canonical address -> {'readers': [...], 'writers': [...]}
+
+    def _ref(self, address: str, relation: str, site: Dict):
+        refs = self.addresses.setdefault(address, {'readers': [], 'writers': []})
+        refs[relation].append(site)
+
+    def _call(self, source: str, target: str, site: Dict, conditional: bool):
+        if target == source:
+            return
+        self.blocks[source]['calls'].append(dict(site, block=target, conditional=conditional))
+        if target in self.blocks:
+            self.blocks[target]['called_by'].append(dict(site, block=source, conditional=conditional))
+
+    def add_block(self, block):
+        """Index the calls and address accesses of one block (all blocks must be registered first)"""
+        source = normalize_block_name(block.name)
+        program = block.name.split('/', 1)[0] if '/' in block.name else None
+        open_db = None
+        depth = 0
+        in_declaration = False
+        for network in block.networks:
+            jumped = False
+            for instruction in network.instructions:
+                site = {'block': source, 'network': network.index, 'line': instruction.line}
+                text, op = instruction.text, instruction.op
+                if op.startswith('VAR') or op == 'STRUCT':
+                    in_declaration = True
+                if in_declaration or op in STL_SKIP_OPS or op in BLOCK_HEADER_OPS or op.startswith('END_'):
+                    in_declaration = in_declaration and op not in ('END_VAR', 'END_STRUCT')
+                    depth = max(depth - 1, 0) if SCL_END_IF_RE.match(text) else depth
+                    continue
+                if text.upper().startswith('RUNG '):
+                    self._add_ladder(source, program, text, site)
+                    continue
+                calls = CALL_RE.findall(text)
+                if calls:
+                    for target in calls:
+                        self._call(source, normalize_block_name(target), site, op == 'CC' or jumped or depth > 0)
+                    for instance in INSTANCE_DB_RE.findall(text):
+                        self._ref(canonical_address(instance), 'writers', site)
+                    continue
+                if op in STL_CONDITIONAL_JUMPS:
+                    jumped = True
+                    continue
+                opened = OPEN_DB_RE.match(text)
+                if opened:
+                    open_db = f'DB{opened.group(1)}'
+                    continue
+                if op in STL_WRITE_OPS or op in STL_READ_OPS:
+                    relation = 'writers' if op in STL_WRITE_OPS else 'readers'
+                    for address in _addresses(instruction.operand, open_db):
+                        self._ref(address, relation, site)
+                    continue
+                self._add_scl(source, text, site, depth > 0)
+                if SCL_BRANCH_RE.match(text) and not SCL_END_IF_RE.search(text):
+                    depth += 1
+
+    def _add_scl(self, source: str, text: str, site: Dict, conditional: bool):
+        """SCL statement (or STL CALL parameter line): calls, outputs (=>), assignment target, reads"""
+        for callee in SCL_CALL_RE.findall(text):
+            self._call(source, normalize_block_name(callee), site, conditional)
+        body = SCL_CALL_RE.sub('(', text)
+        for output in SCL_OUTPUT_RE.findall(body):
+            self._ref(canonical_address(output), 'writers', site)
+        body = SCL_OUTPUT_RE.sub('', body)
+        assign = SCL_ASSIGN_RE.match(body)
+        if assign:
+            # A bare parameter name on the left (STL CALL lists, FB parameters) is not an address
+            for address in _addresses(assign.group('target')):
+                self._ref(address, 'writers', site)
+            body = assign.group('value')
+        for address in _addresses(body):
+            self._ref(address, 'readers', site)
+
+    def _add_ladder(self, source: str, program: Optional[str], text: str, site: Dict):
+        conditional = False
+        for mnemonic, args in LADDER_RE.findall(text):
+            operands = [arg.strip() for arg in args.split(',')]
+            if mnemonic == 'JSR' and operands and operands[0]:
+                target = f'{program}/{operands[0]}' if program else operands[0]
+                self._call(source, normalize_block_name(target), site, conditional)
+                continue
+            writes = LADDER_WRITES.get(mnemonic, ())
+            for position, operand in enumerate(operands):
+                if LADDER_TAG_RE.match(operand) and not operand.isdigit():
+                    self._ref(operand, 'writers' if position in writes else 'readers', site)
+            if mnemonic in LADDER_CONDITIONS:
+                conditional = True
+
+    def roots(self) -> List[str]:
+        return [name for name, entry in self.blocks.items() if entry['kind'] == 'ORGANIZATION_BLOCK']
+
+    def reachable(self, roots: List[str] = None) -> set:
+        """Blocks reachable through calls from roots (default: every OB)"""
+        roots = [normalize_block_name(r) for r in roots] if roots else self.roots()
+        seen = set(r for r in roots if r in self.blocks)
+        queue = deque(seen)
+        while queue:
+            for call in self.blocks[queue.popleft()]['calls']:
+                if call['block'] in self.blocks and call['block'] not in seen:
+                    seen.add(call['block'])
+                    queue.append(call['block'])
+        return seen
+
+    def unreachable(self, roots: List[str] = None) -> List[str]:
+        """FCs/FBs that no call chain from roots (default: every OB) reaches; [] when there is no root"""
+        if not roots and not self.roots():
+            return []
+        seen = self.reachable(roots)
+        return [entry['name'] for name, entry in self.blocks.items()
+                if entry['kind'] in ('FUNCTION', 'FUNCTION_BLOCK') and name not in seen]
+
+    def callers(self, block: str) -> List[Dict]:
+        entry = self.blocks.get(normalize_block_name(block))
+        return entry['called_by'] if entry else []
+
+    def callees(self, block: str) -> List[Dict]:
+        entry = self.blocks.get(normalize_block_name(block))
+        return entry['calls'] if entry else []
+
+    def readers(self, address: str) -> List[Dict]:
+        return self.addresses.get(canonical_address(address), {}).get('readers', [])
+
+    def writers(self, address: str) -> List[Dict]:
+        return self.addresses.get(canonical_address(address), {}).get('writers', [])
+
+    def to_dict(self) -> Dict:
+        unreachable = self.unreachable()
+        return {
+            'blocks': self.blocks,
+            'addresses': self.addresses,
+            'roots': self.roots(),
+            'unreachable': unreachable,
+            'summary': {
+                'blocks': len(self.blocks),
+                'calls': sum(len(entry['calls']) for entry in self.blocks.values()),
+                'addresses': len(self.addresses),
+                'unreachable': len(unreachable),
+            },
+        }
+
+def build_xref(program: ProgramModel) -> CrossReference:
+    """Index every block of a program model"""
+    xref = CrossReference()
+    for block in program.blocks:
+        if block.kind or '/' in block.name:
+            xref.blocks[normalize_block_name(block.name)] = _block_entry(block)
+    for block in program.blocks:
+        if normalize_block_name(block.name) in xref.blocks:
+            xref.add_block(block)
+    return xref
+
+def xref_content(content: str) -> CrossReference:
+    """Parse STL/SCL source or an L5X export and index it"""
+    return build_xref(parse_program(content))
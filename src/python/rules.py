@@ -0,0 +1,411 @@
+"""
+Deterministic rule engine for STL/SCL PLC source
+Runs the checks the LLM prompt asks for (hardcoded overrides, alarm zeroing,
+M-bit toggles, counter/runtime triggers, uncalled FCs) locally with precompiled
+matchers, so blocks can be triaged before anything is escalated to an LLM.
+"""
+
+import os
+import re
+import sys
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.dirname(__file__))
+from chunker import split_blocks, NETWORK_RE
+
+RISK_LEVELS = ['Low', 'Medium', 'High', 'Critical']
+RISK_ORDER = {level: i for i, level in enumerate(RISK_LEVELS)}
+
+# Blocks with a finding at or above this level are escalated to the LLM in 'suspicious' mode
+ESCALATION_MIN_RISK = os.environ.get('RULES_ESCALATION_MIN_RISK', 'Medium')
+# Counter/runtime comparisons against constants at or above this value are treated as triggers
+TRIGGER_THRESHOLD = int(os.environ.get('RULES_TRIGGER_THRESHOLD', 100))
+
+RULES = {
+    'hardcoded_override': {
+        'title': 'Hardcoded override of setpoint or DB value',
+        'recommendation': 'Verify hardcoded writes to setpoints/DB values against the design; remove unauthorised overrides.',
+    },
+    'alarm_zeroing': {
+        'title': 'Alarm or interlock bit forced off',
+        'recommendation': 'Review code that resets or zeroes alarm/interlock bits; alarms should only clear from their own logic.',
+    },
+    'm_bit_toggle': {
+        'title': 'Memory marker toggled within block',
+        'recommendation': 'Document memory markers that are both set and reset, or inverted onto themselves; they can hide covert state.',
+    },
+    'counter_runtime_trigger': {
+        'title': 'Counter, timer or runtime used as a trigger',
+        'recommendation': 'Check comparisons of counters, runtime or clock values against constants for time-delayed logic bombs.',
+    },
+    'clock_read': {
+        'title': 'System clock or runtime read',
+        'recommendation': 'Confirm why the block reads the system clock/runtime and what logic depends on it.',
+    },
+    'uncalled_block': {
+        'title': 'Function or function block never called',
+        'recommendation': 'Remove or document FCs/FBs that are not called from any OB or block; unused blocks can hide persistence logic.',
+    },
+}
+
+# Literal instruction/address patterns for the multi-pattern index (pattern_index.py): (pattern, insight, risk)
+INSTRUCTION_PATTERNS = [
+    ('CALL SFC 46', 'STP: stops the CPU.', 'Critical'),
+    ('STP', 'STP: stops the CPU.', 'Critical'),
+    ('SFC 43', 'RE_TRIGR: retriggers the cycle-time watchdog, can hide long-running logic.', 'High'),
+    ('RE_TRIGR', 'Retriggers the cycle-time watchdog, can hide long-running logic.', 'High'),
+    ('SFC 22', 'CREAT_DB: creates a data block at runtime.', 'High'),
+    ('CREAT_DB', 'Creates a data block at runtime.', 'High'),
+    ('SFC 23', 'DEL_DB: deletes a data block at runtime.', 'High'),
+    ('DEL_DB', 'Deletes a data block at runtime.', 'High'),
+    ('SFC 24', 'TEST_DB: probes data blocks, common in reconnaissance logic.', 'Medium'),
+    ('SFC 28', 'SET_TINT: changes time-of-day interrupts.', 'High'),
+    ('SFC 29', 'CAN_TINT: cancels time-of-day interrupts.', 'High'),
+    ('SFC 30', 'ACT_TINT: activates time-of-day interrupts.', 'Medium'),
+    ('SFC 32', 'SRT_DINT: starts a time-delay interrupt.', 'Medium'),
+    ('SFC 39', 'DIS_IRT: disables interrupt/error handling.', 'High'),
+    ('DIS_IRT', 'Disables interrupt/error handling.', 'High'),
+    ('SFC 41', 'DIS_AIRT: delays interrupt handling.', 'Medium'),
+    ('SFC 14', 'DPRD_DAT: reads consistent data from a DP slave directly.', 'Medium'),
+    ('SFC 15', 'DPWR_DAT: writes consistent data to a DP slave directly.', 'High'),
+    ('DPWR_DAT', 'Writes consistent data to a DP slave directly.', 'High'),
+    ('SFC 58', 'WR_REC: writes a data record to a module.', 'High'),
+    ('WR_REC', 'Writes a data record to a module.', 'High'),
+    ('SFC 55', 'WR_PARM: changes module parameters at runtime.', 'High'),
+    ('SFC 56', 'WR_DPARM: writes default module parameters.', 'High'),
+    ('SFC 20', 'BLKMOV: bulk memory copy, check source and destination.', 'Low'),
+    ('SFC 21', 'FILL: bulk memory fill, check the destination area.', 'Medium'),
+    ('SFC 64', 'TIME_TCK: reads the system tick counter.', 'Medium'),
+    ('SFC 1', 'READ_CLK: reads the CPU clock.', 'Medium'),
+    ('SFC 0', 'SET_CLK: sets the CPU clock.', 'High'),
+    ('SET_CLK', 'Sets the CPU clock.', 'High'),
+    ('SFC 52', 'WR_USMSG: writes user diagnostic messages.', 'Low'),
+    ('SFB 8', 'USEND: unsolicited send over S7 communication.', 'Medium'),
+    ('SFB 9', 'URCV: receives S7 communication data.', 'Medium'),
+    ('SFB 14', 'GET: reads data from a remote CPU.', 'Medium'),
+    ('SFB 15', 'PUT: writes data to a remote CPU.', 'High'),
+    ('TSEND', 'Sends data over open TCP/IP communication.', 'Medium'),
+    ('TRCV', 'Receives data over open TCP/IP communication.', 'Medium'),
+    ('TCON', 'Opens a TCP/IP connection from the PLC.', 'Medium'),
+    ('TSEND_C', 'Connects and sends data over TCP/IP.', 'Medium'),
+    ('TRCV_C', 'Connects and receives data over TCP/IP.', 'Medium'),
+    ('AG_SEND', 'Sends data through a CP module.', 'Medium'),
+    ('AG_RECV', 'Receives data through a CP module.', 'Medium'),
+    ('OPN DI', 'Opens an instance DB through the DI register, can obscure data access.', 'Low'),
+    ('CDB', 'Swaps the DB and DI registers, can obscure data access.', 'Medium'),
+    ('LAR1', 'Loads address register 1 for indirect addressing.', 'Low'),
+    ('LAR2', 'Loads address register 2 for indirect addressing.', 'Low'),
+    ('BE', 'Block end: code after it is never executed.', 'Medium'),
+    ('BEC', 'Conditional block end: skips the rest of the block.', 'Low'),
+    ('MCRA', 'Activates the master control relay, disables outputs in the MCR zone.', 'Medium'),
+]
+
+COMMENT_RE = re.compile(r'//.*$|\(\*.*?\*\)')
+# STL jump labels ("M001:"), but not SCL assignments (":=")
+LABEL_RE = re.compile(r'^[A-Za-z_]\w{0,3}\s*:(?!=)\s*')
+CONSTANT_RE = re.compile(
+    r'^(?:[+-]?\d+(?:\.\d+)?(?:E[+-]?\d+)?|L#[+-]?\d+|(?:B|W|DW)?#?16#[0-9A-F_]+|2#[01_]+|'
+    r'S5T#\S+|T#\S+|TRUE|FALSE)$',
+    re.IGNORECASE
+)
+ZERO_RE = re.compile(r'^(?:[+-]?0+(?:\.0+)?|L#0|(?:B|W|DW)?#?16#0+|2#0+|FALSE)$', re.IGNORECASE)
+DB_ADDRESS_RE = re.compile(r'^(?:DB\d+\.)?DB[XBWD]\s*\d+|^"[^"]+"\s*\.|^%?DB\d+\.', re.IGNORECASE)
+SETPOINT_HINT_RE = re.compile(
+    r'(?<![A-Za-z])(?:SP|SETP|SETPOINT|SET_POINT|LIMIT|LIM|OVERRIDE|OVR|HIHI|LOLO|HI|LO|MAX|MIN|TRIP_?LEVEL)(?![A-Za-z])',
+    re.IGNORECASE
+)
+ALARM_HINT_RE = re.compile(
+    r'(?<![A-Za-z])(?:ALARM|ALM|ALRM|FAULT|FLT|TRIP|INTERLOCK|ILK|ESD|SIS|WARN|WARNING|ESTOP|E_STOP)(?![A-Za-z])',
+    re.IGNORECASE
+)
+MEMORY_BIT_RE = re.compile(r'^%?M\s*(\d+)\.([0-7])$', re.IGNORECASE)
+COUNTER_SOURCE_RE = re.compile(
+    r'^(?:[CZT]\s*\d+|%?[CZT]\d+)$|(?<![A-Za-z])(?:COUNT|COUNTER|CNT|CTR|CTU|CTD|RUNTIME|RUN_TIME|HOURS|HRS|'
+    r'OP_?HOURS|CYCLES?|TICKS?|DATE|DAYS?|TIME_TCK|SYSTIME|CLOCK)(?![A-Za-z])',
+    re.IGNORECASE
+)
+CLOCK_CALL_RE = re.compile(
+    r'\b(?:SFC\s*64|SFC\s*1|SFC\s*0|TIME_TCK|RD_SYS_T|READ_CLK|RD_LOC_T|RUNTIME|READ_RTM|SFC\s*4)\b',
+    re.IGNORECASE
+)
+STL_COMPARE_RE = re.compile(r'^(?:==|<>|>=|<=|>|<)[IDR]$', re.IGNORECASE)
+SCL_ASSIGN_RE = re.compile(r'^(?P<target>[^:=]+?)\s*:=\s*(?P<value>[^;]+?)\s*;?$')
+SCL_COMPARE_RE = re.compile(
+    r'(?P<left>"[^"]+"(?:\.[\w"]+)*|#?[A-Za-z_%][\w.%\[\]]*)\s*(?P<op>>=|>|=|<>)\s*(?P<right>[+-]?\d+(?:\.\d+)?|L#\d+|T#\S+)',
+    re.IGNORECASE
+)
+# SCL condition lines: their comparisons are checked like assignments even without ':='
+SCL_CONDITION_RE = re.compile(r'^(?:IF|ELSIF|CASE|WHILE|UNTIL)\b', re.IGNORECASE)
+SCL_NOT_SELF_RE = re.compile(r'^(?P<target>.+?)\s*:=\s*NOT\s+(?P<source>.+?)\s*;?$', re.IGNORECASE)
+MOVE_RE = re.compile(
+    r'\bMOVE\b.*?\bIN\s*:=\s*(?P<value>[^,)]+?)\s*,.*?\bOUT\s*(?:=>|:=)\s*(?P<target>[^,)]+?)\s*[,)]',
+    re.IGNORECASE
+)
+CALL_RE = re.compile(r'\b(?:CALL|UC|CC)\s+("[^"]+"|(?:FC|FB|SFC|SFB)\s*\d+)', re.IGNORECASE)
+SCL_CALL_RE = re.compile(r'("[^"]+"|\b(?:FC|FB)\s*\d+)\s*\(', re.IGNORECASE)
+
+def max_risk(levels) -> Optional[str]:
+    """Highest risk level in an iterable of levels (None if empty)"""
+    levels = [level for level in levels if level in RISK_ORDER]
+    return max(levels, key=RISK_ORDER.get) if levels else None
+
+def normalize_block_name(name: str) -> str:
+    """Canonical form for matching definitions and calls: 'FC 540' -> 'FC540', '"Pump"' -> 'PUMP'"""
+    return re.sub(r'\s+', '', name.strip().strip('"')).upper()
+
+def clean_line(line: str) -> str:
+    """Strip comments and STL labels"""
+    line = COMMENT_RE.sub('', line).strip()
+    return LABEL_RE.sub('', line) if line else line
+
+def _finding(rule_id, risk_level, block, network, line_no, instruction, insight):
+    return {
+        'rule': rule_id,
+        'title': RULES[rule_id]['title'],
+        'risk_level': risk_level,
+        'block': block,
+        'network': network,
+        'line': line_no,
+        'instruction': instruction,
+        'insight': insight,
+    }
+
+def _is_setpoint(operand: str) -> bool:
+    return bool(SETPOINT_HINT_RE.search(operand))
+
+def _is_alarm(operand: str) -> bool:
+    return bool(ALARM_HINT_RE.search(operand))
+
+def _override_finding(block, network, line_no, instruction, value, target):
+    """Classify a constant written to target as alarm zeroing or a hardcoded override"""
+    if _is_alarm(target) and ZERO_RE.match(value):
+        return _finding('alarm_zeroing', 'High', block, network, line_no, instruction,
+                        f'Alarm/interlock {target} is forced to {value}, which can suppress it.')
+    if _is_setpoint(target):
+        return _finding('hardcoded_override', 'High', block, network, line_no, instruction,
+                        f'Constant {value} overwrites setpoint/limit {target}.')
+    if DB_ADDRESS_RE.match(target):
+        return _finding('hardcoded_override', 'Medium', block, network, line_no, instruction,
+                        f'Constant {value} is written directly into {target}.')
+    return None
+
+def scan_block(block: str, text: str, first_line: int = 1) -> List[Dict]:
+    """Run the per-line checks over one block; line numbers are relative to first_line"""
+    findings = []
+    network = 0
+    prev_ops = []  # last few (op, operand) STL instructions in the current network
+    memory_writes = {}  # M-bit -> set of write ops seen ('S', 'R', '=')
+    for offset, raw in enumerate(text.splitlines()):
+        line_no = first_line + offset
+        if NETWORK_RE.match(raw):
+            network += 1
+            prev_ops = []
+            continue
+        line = clean_line(raw)
+        if not line:
+            continue
+        instruction = raw.strip()
+        if CLOCK_CALL_RE.search(line):
+            findings.append(_finding('clock_read', 'Medium', block, network, line_no, instruction,
+                                     'Reads the system clock or runtime meter; check what logic it gates.'))
+        move = MOVE_RE.search(line)
+        if move and CONSTANT_RE.match(move.group('value').strip()):
+            finding = _override_finding(block, network, line_no, instruction,
+                                        move.group('value').strip(), move.group('target').strip())
+            if finding:
+                findings.append(finding)
+            continue
+        if ':=' in line or SCL_CONDITION_RE.match(line):
+            findings.extend(_scan_scl_line(block, network, line_no, instruction, line))
+            continue
+        parts = line.rstrip(';').split(None, 1)
+        op = parts[0].upper()
+        operand = parts[1].strip() if len(parts) > 1 else ''
+        findings.extend(_scan_stl_instruction(block, network, line_no, instruction, op, operand, prev_ops, memory_writes))
+        prev_ops.append((op, operand))
+        if len(prev_ops) > 3:
+            prev_ops.pop(0)
+    return findings
+
+def _scan_stl_instruction(block, network, line_no, instruction, op, operand, prev_ops, memory_writes):
+    findings = []
+    last_op, last_operand = prev_ops[-1] if prev_ops else ('', '')
+    if op == 'T' and last_op == 'L' and CONSTANT_RE.match(last_operand):
+        finding = _override_finding(block, network, line_no, f"L {last_operand} / {instruction}", last_operand, operand)
+        if finding:
+            findings.append(finding)
+    elif op == 'R' and _is_alarm(operand):
+        findings.append(_finding('alarm_zeroing', 'High', block, network, line_no, instruction,
+                                 f'Alarm/interlock {operand} is reset directly.'))
+    elif op == '=' and last_op == 'CLR' and _is_alarm(operand):
+        findings.append(_finding('alarm_zeroing', 'High', block, network, line_no, instruction,
+                                 f'RLO is cleared and assigned to alarm/interlock {operand}.'))
+    if op in ('S', 'R', '=') and MEMORY_BIT_RE.match(operand):
+        bit = MEMORY_BIT_RE.sub(r'M\1.\2', operand).upper()
+        writes = memory_writes.setdefault(bit, set())
+        if op == '=' and last_op == 'AN' and MEMORY_BIT_RE.sub(r'M\1.\2', last_operand).upper() == bit:
+            findings.append(_finding('m_bit_toggle', 'Medium', block, network, line_no, f"AN {last_operand} / {instruction}",
+                                     f'Memory bit {bit} is inverted onto itself every scan (toggle).'))
+        elif op in ('S', 'R') and ('R' if op == 'S' else 'S') in writes and op not in writes:
+            findings.append(_finding('m_bit_toggle', 'Medium', block, network, line_no, instruction,
+                                     f'Memory bit {bit} is both set and reset in this block.'))
+        writes.add(op)
+    if STL_COMPARE_RE.match(op) and len(prev_ops) >= 2:
+        (_, first), (_, second) = prev_ops[-2], prev_ops[-1]
+        for source, constant in ((first, second), (second, first)):
+            if COUNTER_SOURCE_RE.search(source) and CONSTANT_RE.match(constant) and _numeric(constant) >= TRIGGER_THRESHOLD:
+                findings.append(_finding('counter_runtime_trigger', 'High', block, network, line_no,
+                                         f"L {first} / L {second} / {instruction}",
+                                         f'{source} is compared against constant {constant}; possible time-delayed trigger.'))
+                break
+    return findings
+
+def _scan_scl_line(block, network, line_no, instruction, line):
+    findings = []
+    toggle = SCL_NOT_SELF_RE.match(line)
+    if toggle and toggle.group('target').strip() == toggle.group('source').strip():
+        findings.append(_finding('m_bit_toggle', 'Medium', block, network, line_no, instruction,
+                                 f"{toggle.group('target').strip()} is inverted onto itself every scan (toggle)."))
+    assign = SCL_ASSIGN_RE.match(line)
+    if assign and CONSTANT_RE.match(assign.group('value')):
+        finding = _override_finding(block, network, line_no, instruction, assign.group('value'), assign.group('target').strip())
+        if finding:
+            findings.append(finding)
+    for compare in SCL_COMPARE_RE.finditer(line):
+        if COUNTER_SOURCE_RE.search(compare.group('left')) and _numeric(compare.group('right')) >= TRIGGER_THRESHOLD:
+            findings.append(_finding('counter_runtime_trigger', 'High', block, network, line_no, instruction,
+                                     f"{compare.group('left')} is compared against constant {compare.group('right')}; "
+                                     'possible time-delayed trigger.'))
+            break
+    return findings
+
+def _numeric(constant: str) -> float:
+    """Magnitude of a numeric STL/SCL constant (time literals and hex count as large)"""
+    value = constant.strip().upper()
+    if value.startswith('L#'):
+        value = value[2:]
+    try:
+        return abs(float(value))
+    except ValueError:
+        return float('inf') if '#' in value else 0
+
+def find_uncalled_blocks(xref) -> List[Dict]:
+    """
+    FCs/FBs that no other block calls, or that are only called from blocks no OB reaches,
+    from a plc_xref.CrossReference of the content.
+    Only meaningful when the content holds several blocks, so single-block exports are skipped.
+    """
+    definitions = [(name, entry) for name, entry in xref.blocks.items()
+                   if entry['kind'] in ('FUNCTION', 'FUNCTION_BLOCK')]
+    has_ob = bool(xref.roots())
+    if len(definitions) + (1 if has_ob else 0) < 2:
+        return []
+    reachable = xref.reachable() if has_ob else set()
+    findings = []
+    for name, entry in definitions:
+        kind, block = entry['kind'], entry['name']
+        if not entry['called_by']:
+            scope = 'any OB or block' if has_ob else 'any other block'
+            insight = f'{kind} {block} is not called from {scope} in this file.'
+        elif has_ob and name not in reachable:
+            insight = f'{kind} {block} is only called from blocks that no OB reaches in this file.'
+        else:
+            continue
+        findings.append(_finding('uncalled_block', 'Medium' if has_ob else 'Low', block, 0, entry['line'],
+                                 f'{kind} {block}', insight))
+    return findings
+
+def locate_blocks(content: str):
+    """split_blocks plus the 1-based line number each block starts on"""
+    located = []
+    pos, line = 0, 1
+    for name, text in split_blocks(content):
+        start = content.find(text, pos)
+        if start < 0:
+            start = pos
+        line += content.count('\n', pos, start)
+        located.append((name, text, line))
+        line += text.count('\n')
+        pos = start + len(text)
+    return located
+
+def _program_blocks(content: str, program=None):
+    """(name, text, first line) of each block: the program's blocks (e.g. L5X routines) or those of content"""
+    if program is None:
+        return locate_blocks(content)
+    return ((block.name, block.text, block.first_line) for block in program.blocks)
+
+def run_rules(content: str, xref=None, program=None) -> List[Dict]:
+    """
+    All rule findings for the content, in source order; xref is the content's cross-reference if already built.
+    With a plc_model.ProgramModel, its blocks are scanned one by one and content is not used.
+    """
+    if xref is None:
+        from plc_xref import build_xref, xref_content  # plc_xref builds on this module
+        xref = build_xref(program) if program is not None else xref_content(content)
+    findings = []
+    for name, text, first_line in _program_blocks(content, program):
+        findings.extend(scan_block(name, text, first_line))
+    findings.extend(find_uncalled_blocks(xref))
+    findings.sort(key=lambda f: f['line'])
+    return findings
+
+def triage_blocks(content: str, min_risk: str = ESCALATION_MIN_RISK, xref=None, program=None) -> Dict:
+    """Split blocks into suspicious (a finding at or above min_risk) and clean ones"""
+    threshold = RISK_ORDER.get(min_risk, RISK_ORDER['Medium'])
+    findings = run_rules(content, xref, program)
+    flagged = {f['block'] for f in findings if RISK_ORDER[f['risk_level']] >= threshold}
+    suspicious, clean = [], []
+    for name, text, _ in _program_blocks(content, program):
+        (suspicious if name in flagged else clean).append({'name': name, 'text': text})
+    return {'suspicious': suspicious, 'clean': clean, 'findings': findings}
+
+def rule_based_analysis(content: str, file_name: str = 'uploaded_file', findings: List[Dict] = None,
+                        xref=None) -> Dict:
+    """Build the rule-based part of an analysis result from the rule findings"""
+    findings = run_rules(content, xref) if findings is None else findings
+    blocks = {f['block'] for f in findings}
+    highest = max_risk(f['risk_level'] for f in findings)
+    if findings:
+        description = (f"Local rule checks found {len(findings)} issue(s) in {len(blocks)} block(s); "
+                       f"highest risk: {highest}.")
+    else:
+        description = 'Local rule checks found no issues.'
+    locations = [f"{f['block']}, line {f['line']}" for f in findings]
+    rule_ids = []
+    for f in findings:
+        if f['rule'] not in rule_ids:
+            rule_ids.append(f['rule'])
+    vulnerabilities = [
+        {
+            'title': f['title'],
+            'severity': f['risk_level'].lower(),
+            'risk_level': f['risk_level'],
+            'location': location,
+            'description': f['insight'],
+        }
+        for f, location in zip(findings, locations)
+        if RISK_ORDER[f['risk_level']] >= RISK_ORDER['High']
+    ]
+    return {
+        'fileName': file_name,
+        'report': {
+            'category': {
+                'description': description,
+                'findings': [f"{f['title']} ({location}): {f['insight']}" for f, location in zip(findings, locations)]
+                            or ['No issues found by local rules.'],
+                'potential_issues': [f"{f['title']} ({location})" for f, location in zip(findings, locations)
+                                     if RISK_ORDER[f['risk_level']] < RISK_ORDER['High']],
+                'example_malicious_change': None,
+                'vulnerabilities': vulnerabilities,
+            }
+        },
+        'vulnerabilities': vulnerabilities,
+        'recommendations': [RULES[rule_id]['recommendation'] for rule_id in rule_ids],
+        'instruction_analysis': [
+            {'instruction': f['instruction'], 'insight': f['insight'], 'risk_level': f['risk_level']}
+            for f in findings
+        ],
+        'rule_findings': findings,
+        'rule_summary': {'count': len(findings), 'max_risk': highest, 'blocks': sorted(blocks)},
+    }
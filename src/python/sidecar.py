@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Persistent Python sidecar for the Electron main process
+Serves the db.py, analyzer.py and git_integration.py CLI commands as line-delimited
+JSON-RPC 2.0 over stdin/stdout, so imports, database connections and the Git
+repository handle stay warm between calls instead of being rebuilt per spawn.
+
+Request:  {"jsonrpc": "2.0", "id": 1, "method": "db", "params": ["--list-analyses"]}
+Response: {"jsonrpc": "2.0", "id": 1, "result": [...]}
+
+Requests are handled one at a time because the CLI entry points read sys.argv
+and write to stdout; run one sidecar per workload that must not queue behind another.
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import traceback
+from contextlib import redirect_stdout
+
+sys.path.append(os.path.dirname(__file__))
+
+# JSON-RPC error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+COMMAND_FAILED = -32000
+
+# Per-request timing on stderr, off by default
+SIDECAR_TIMING = os.environ.get('FW_SIDECAR_TIMING') == '1'
+
+# Method name -> (module name, script name used for argv[0])
+COMMAND_MODULES = {
+    'db': ('db', 'db.py'),
+    'analyzer': ('analyzer', 'analyzer.py'),
+    'git': ('git_integration', 'git_integration.py'),
+}
+
+_modules = {}
+
+def load_module(method: str):
+    """Import (once) the module that backs an RPC method"""
+    module_name, _ = COMMAND_MODULES[method]
+    if module_name not in _modules:
+        module = __import__(module_name)
+        if module_name == 'analyzer':
+            module.load_openai_key()
+        _modules[module_name] = module
+    return _modules[module_name]
+
+def parse_output(output: str):
+    """Mirror createPythonHandler: JSON output is parsed, anything else is returned as raw data"""
+    try:
+        return json.loads(output)
+    except ValueError:
+        return {'success': True, 'data': output.strip()}
+
+def run_command(method: str, params: list):
+    """Run a module's CLI main() with the given argv and return its parsed stdout"""
+    module = load_module(method)
+    _, script_name = COMMAND_MODULES[method]
+    buffer = io.StringIO()
+    saved_argv = sys.argv
+    sys.argv = [script_name] + [str(p) if p is not None else '' for p in params]
+    try:
+        with redirect_stdout(buffer):
+            module.main()
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            raise RuntimeError(buffer.getvalue().strip() or f'Command exited with code {e.code}')
+    finally:
+        sys.argv = saved_argv
+    return parse_output(buffer.getvalue())
+
+def handle_request(request: dict) -> dict:
+    """Dispatch a single JSON-RPC request and build the response"""
+    request_id = request.get('id')
+    method = request.get('method')
+    params = request.get('params') or []
+    if not isinstance(method, str) or not isinstance(params, list):
+        return {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': INVALID_REQUEST, 'message': 'Invalid request'}}
+    if method == 'ping':
+        return {'jsonrpc': '2.0', 'id': request_id, 'result': {'ok': True, 'pid': os.getpid(), 'modules': sorted(_modules)}}
+    if method not in COMMAND_MODULES:
+        return {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': METHOD_NOT_FOUND, 'message': f'Unknown method: {method}'}}
+    started = time.perf_counter()
+    try:
+        result = run_command(method, params)
+    except Exception as e:
+        print(traceback.format_exc(), file=sys.stderr)
+        return {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': COMMAND_FAILED, 'message': str(e)}}
+    if SIDECAR_TIMING:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f"[DEBUG] sidecar {method} {params[:1]} took {elapsed_ms:.1f}ms", file=sys.stderr)
+    return {'jsonrpc': '2.0', 'id': request_id, 'result': result}
+
+def serve(preload=('db', 'analyzer', 'git')):
+    """Read requests from stdin until EOF or a shutdown request"""
+    rpc_out = sys.stdout
+    # Anything printed outside a request (import-time debug output etc.) must not corrupt the RPC stream
+    sys.stdout = sys.stderr
+    for method in preload:
+        try:
+            load_module(method)
+        except Exception as e:
+            print(f"[DEBUG] sidecar could not preload {method}: {e}", file=sys.stderr)
+    rpc_out.write(json.dumps({'jsonrpc': '2.0', 'method': 'ready', 'params': {'pid': os.getpid()}}) + '\n')
+    rpc_out.flush()
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            request = json.loads(line)
+        except ValueError:
+            response = {'jsonrpc': '2.0', 'id': None, 'error': {'code': PARSE_ERROR, 'message': 'Parse error'}}
+        else:
+            if request.get('method') == 'shutdown':
+                rpc_out.write(json.dumps({'jsonrpc': '2.0', 'id': request.get('id'), 'result': {'ok': True}}) + '\n')
+                rpc_out.flush()
+                break
+            response = handle_request(request)
+        rpc_out.write(json.dumps(response, default=str) + '\n')
+        rpc_out.flush()
+
+def main():
+    preload = tuple(m for m in sys.argv[1:] if m in COMMAND_MODULES) or ('db', 'analyzer', 'git')
+    serve(preload)
+
+if __name__ == '__main__':
+    main()
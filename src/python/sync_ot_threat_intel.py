@@ -3,7 +3,7 @@ import json
 import uuid
 import os
 from datetime import datetime
-from db import save_ot_threat_intel, log_audit
+from db import save_ot_threat_intel_batch, log_audit
 import requests
 
 def ollama_llm_query(prompt, model='llama3'):
@@ -152,19 +152,13 @@ def main():
     if len(sys.argv) > 2 and sys.argv[1] == '--provider':
         provider = sys.argv[2]
     entries = fetch_openai_ot_threat_intel(provider=provider)
-    new_count = 0
-    for entry in entries:
-        if save_ot_threat_intel(entry):
-            new_count += 1
-    print(json.dumps({'ok': True, 'new_entries': new_count}))
+    result = save_ot_threat_intel_batch(entries, audit_details={'source': provider or 'default'})
+    print(json.dumps(result))
 
 if __name__ == '__main__':
     if '--bulk-ot-threat-intel' in sys.argv:
         entries = fetch_bulk_openai_ot_threat_intel()
-        new_count = 0
-        for entry in entries:
-            if save_ot_threat_intel(entry):
-                new_count += 1
-        print(json.dumps({'ok': True, 'new_entries': new_count}))
+        result = save_ot_threat_intel_batch(entries, audit_action='bulk_ingest_ot_threat_intel', audit_details={'source': 'openai'})
+        print(json.dumps(result))
         sys.exit(0)
     main()
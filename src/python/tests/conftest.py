@@ -0,0 +1,35 @@
+import os
+import sys
+import uuid
+
+import pytest
+
+# The modules in src/python import each other as flat top-level modules
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+
+@pytest.fixture
+def database(monkeypatch):
+    """A throwaway schema on TEST_DATABASE_URL that db.get_connection() points at"""
+    if not TEST_DATABASE_URL:
+        pytest.skip('TEST_DATABASE_URL is not set')
+    import psycopg2
+    import psycopg2.extensions
+    import db
+
+    schema = f'test_{uuid.uuid4().hex[:12]}'
+    admin = psycopg2.connect(TEST_DATABASE_URL)
+    admin.autocommit = True
+    admin.cursor().execute(f'CREATE SCHEMA {schema}')
+    monkeypatch.setattr(db, 'DB_URL', psycopg2.extensions.make_dsn(TEST_DATABASE_URL, options=f'-csearch_path={schema}'))
+    monkeypatch.setattr(db, '_pool', None)
+    monkeypatch.setattr(db, '_pool_pid', None)
+    monkeypatch.setattr(db, '_schema_ready', False)
+    try:
+        yield db
+    finally:
+        if db._pool is not None:
+            db._pool.closeall()
+        admin.cursor().execute(f'DROP SCHEMA {schema} CASCADE')
+        admin.close()
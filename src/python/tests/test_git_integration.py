@@ -0,0 +1,103 @@
+import os
+import subprocess
+
+import git_integration
+from git_integration import GitRepository, walk_worktree
+
+def git(repo, *args, check=True):
+    subprocess.run(['git', '-C', str(repo), '-c', 'user.name=Test', '-c', 'user.email=test@example.com', *args],
+                   check=check, capture_output=True)
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+def make_repo(tmp_path):
+    repo = tmp_path / 'repo'
+    git(tmp_path, 'init', '-q', '-b', 'main', str(repo))
+    return repo
+
+def test_porcelain_status_lists_each_kind_of_change(tmp_path, monkeypatch):
+    monkeypatch.setattr(git_integration, 'STATUS_CACHE_DIR', str(tmp_path / 'status'))
+    repo = make_repo(tmp_path)
+    for name in ('staged.l5x', 'modified.l5x', 'both.l5x', 'old name.l5x'):
+        write(repo / name, 'XIC(Start)OTE(Run);\n')
+    git(repo, 'add', '.')
+    git(repo, 'commit', '-qm', 'initial')
+    write(repo / 'staged.l5x', 'XIC(Stop)OTE(Run);\n')
+    write(repo / 'both.l5x', 'XIC(Stop)OTE(Run);\n')
+    git(repo, 'add', 'staged.l5x', 'both.l5x')
+    write(repo / 'both.l5x', 'XIO(Stop)OTE(Run);\n')
+    write(repo / 'modified.l5x', 'XIC(Stop)OTE(Run);\n')
+    git(repo, 'mv', 'old name.l5x', 'new name.l5x')
+    write(repo / 'sub' / 'untracked file.l5x', 'OTE(Run);\n')
+
+    result = GitRepository(str(repo)).get_repository_status(use_cache=False)
+    assert result['success']
+    status = result['status']
+    assert status['current_branch'] == 'main'
+    assert status['is_dirty']
+    assert sorted(status['staged_files']) == ['both.l5x', 'new name.l5x', 'old name.l5x', 'staged.l5x']
+    assert sorted(status['modified_files']) == ['both.l5x', 'modified.l5x']
+    assert status['untracked_files'] == ['sub/untracked file.l5x']
+    assert status['conflicted_files'] == []
+
+def test_porcelain_status_reports_conflicts(tmp_path, monkeypatch):
+    monkeypatch.setattr(git_integration, 'STATUS_CACHE_DIR', str(tmp_path / 'status'))
+    repo = make_repo(tmp_path)
+    write(repo / 'main.l5x', 'MOV(100,Speed);\n')
+    git(repo, 'add', '.')
+    git(repo, 'commit', '-qm', 'initial')
+    git(repo, 'checkout', '-qb', 'other')
+    write(repo / 'main.l5x', 'MOV(200,Speed);\n')
+    git(repo, 'commit', '-qam', 'other')
+    git(repo, 'checkout', '-q', 'main')
+    write(repo / 'main.l5x', 'MOV(300,Speed);\n')
+    git(repo, 'commit', '-qam', 'main')
+    git(repo, 'merge', '-q', 'other', check=False)
+
+    status = GitRepository(str(repo)).get_repository_status(use_cache=False)['status']
+    assert status['conflicted_files'] == ['main.l5x']
+    assert status['modified_files'] == ['main.l5x']
+
+def test_walk_worktree_honours_gitignore_files(tmp_path):
+    root = tmp_path / 'tree'
+    for name in ('keep.l5x', 'notes.md', 'build/out.l5x', 'logs/run.l5x', 'logs/keep.l5x',
+                 'plc/a.l5x', 'plc/scratch.l5x', 'plc/deep/b.L5X', 'plc/deep/tmp/c.l5x', 'node_modules/d.l5x'):
+        write(root / name, 'XIC(Start)OTE(Run);\n')
+    write(root / '.gitignore', 'build/\nlogs/*\n!logs/keep.l5x\n')
+    write(root / 'plc' / '.gitignore', 'scratch.l5x\n/deep/tmp\n')
+
+    for workers in (1, 4):
+        files = walk_worktree(str(root), ['.l5x'], excludes=['node_modules/'], workers=workers)
+        assert [f['path'].replace(os.sep, '/') for f in files] == [
+            'keep.l5x', 'logs/keep.l5x', 'plc/a.l5x', 'plc/deep/b.L5X']
+
+def test_history_commits_reports_hunk_lines(tmp_path):
+    repo = make_repo(tmp_path)
+    write(repo / 'main.l5x', 'XIC(Start)OTE(Run);\nMOV(100,Speed);\nTON(Timer,1000,0);\n')
+    git(repo, 'add', '.')
+    git(repo, 'commit', '-qm', 'initial')
+    write(repo / 'main.l5x', 'XIC(Start)OTE(Run);\nMOV(250,Speed);\nTON(Timer,1000,0);\nOTL(Alarm);\n')
+    write(repo / 'with space.l5x', '+ starts with a plus\n')
+    git(repo, 'add', '.')
+    git(repo, 'commit', '-qm', 'change')
+    git(repo, 'rm', '-q', 'with space.l5x')
+    git(repo, 'commit', '-qm', 'remove')
+
+    commits = list(GitRepository(str(repo))._history_commits('HEAD', ['*.l5x']))
+    assert [len(header) for header, _ in commits] == [5, 5, 5]
+    assert commits[0][0][1:3] == ['Test', 'test@example.com']
+    assert commits[0][1] == [
+        ('main.l5x', 'added', 1, 'XIC(Start)OTE(Run);'),
+        ('main.l5x', 'added', 2, 'MOV(100,Speed);'),
+        ('main.l5x', 'added', 3, 'TON(Timer,1000,0);'),
+    ]
+    assert sorted(commits[1][1]) == [
+        ('main.l5x', 'added', 2, 'MOV(250,Speed);'),
+        ('main.l5x', 'added', 4, 'OTL(Alarm);'),
+        ('main.l5x', 'removed', 2, 'MOV(100,Speed);'),
+        ('with space.l5x', 'added', 1, '+ starts with a plus'),
+    ]
+    assert commits[2][1] == [('with space.l5x', 'removed', 1, '+ starts with a plus')]
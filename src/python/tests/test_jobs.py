@@ -0,0 +1,52 @@
+import jobs
+
+def expire_lease(database, job_id):
+    with database.get_connection() as conn:
+        conn.cursor().execute("UPDATE analysis_jobs SET lease_expires_at = NOW() - INTERVAL '1 second' WHERE id = %s",
+                              (job_id,))
+        conn.commit()
+
+def test_concurrent_workers_claim_different_jobs(database):
+    first = jobs.enqueue_job('A', file_name='a.l5x')
+    second = jobs.enqueue_job('B', file_name='b.l5x')
+    with database.get_connection() as conn:
+        # Another worker holds the oldest job's row lock mid-claim; SKIP LOCKED passes over it
+        c = conn.cursor()
+        c.execute('SELECT id FROM analysis_jobs WHERE id = %s FOR UPDATE', (first,))
+        claimed = jobs.claim_job('worker-2')
+        conn.rollback()
+    assert claimed['id'] == second
+    assert jobs.claim_job('worker-1')['id'] == first
+    assert jobs.claim_job('worker-3') is None
+
+def test_failed_job_is_retried_until_attempts_run_out(database):
+    job_id = jobs.enqueue_job('A', model='gpt-4o-mini', max_attempts=2)
+    job = jobs.claim_job('worker-1')
+    assert (job['id'], job['attempts'], job['model']) == (job_id, 1, 'gpt-4o-mini')
+    assert jobs.fail_job(job_id, 'worker-1', 'boom') == 'queued'
+    job = jobs.claim_job('worker-2')
+    assert (job['id'], job['attempts'], job['content']) == (job_id, 2, 'A')
+    assert jobs.fail_job(job_id, 'worker-2', 'boom again') == 'failed'
+    assert jobs.claim_job('worker-3') is None
+    assert jobs.get_job(job_id)['error'] == 'boom again'
+
+def test_expired_lease_is_reclaimed_and_exhausted_job_failed(database):
+    job_id = jobs.enqueue_job('A', max_attempts=2)
+    jobs.claim_job('crashed-1')
+    expire_lease(database, job_id)
+    job = jobs.claim_job('worker-2')
+    assert (job['id'], job['attempts']) == (job_id, 2)
+    # A late result from the worker that lost the lease is ignored
+    assert not jobs.complete_job(job_id, 'crashed-1', {'ok': True})
+    expire_lease(database, job_id)
+    assert jobs.claim_job('worker-3') is None
+    job = jobs.get_job(job_id)
+    assert (job['status'], job['error']) == ('failed', 'Worker lease expired after the last attempt')
+
+def test_completed_job_stores_its_result(database):
+    job_id = jobs.enqueue_job('A')
+    jobs.claim_job('worker-1')
+    assert jobs.complete_job(job_id, 'worker-1', {'ok': True, 'findings': 3})
+    job = jobs.get_job(job_id)
+    assert (job['status'], job['result']) == ('succeeded', {'ok': True, 'findings': 3})
+    assert jobs.get_job_counts()['succeeded'] == 1
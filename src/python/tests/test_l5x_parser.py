@@ -0,0 +1,33 @@
+from l5x_parser import routine_units
+from plc_diff import diff_contents, has_changes
+from plc_model import parse_units
+from rules import run_rules
+
+L5X_COMMENTED_RUNG = '''<?xml version="1.0" encoding="UTF-8"?>
+<RSLogix5000Content SchemaRevision="1.0" TargetName="Ctl" TargetType="Controller">
+<Controller Name="Ctl"><Programs><Program Name="MainProgram"><Routines>
+<Routine Name="MainRoutine" Type="RLL"><RLLContent>
+<Rung Number="0" Type="N">
+<Comment><![CDATA[Pump start interlock.
+High_Alarm := 0;
+IF RunTime_Hours >= 5000 THEN]]></Comment>
+<Text><![CDATA[XIC(Start)OTE(Motor_Run);]]></Text>
+</Rung>
+</RLLContent></Routine>
+</Routines></Program></Programs></Controller>
+</RSLogix5000Content>
+'''
+
+def test_multi_line_rung_comment_stays_on_the_rung_line():
+    (name, text, parts), = routine_units(L5X_COMMENTED_RUNG)
+    assert parts[1] == ('Rung 0: XIC(Start)OTE(Motor_Run); // Pump start interlock. High_Alarm := 0; '
+                        'IF RunTime_Hours >= 5000 THEN\n')
+    assert [i.text for i in parse_units([(name, text, parts)]).blocks[0].instructions][-1] == \
+        'Rung 0: XIC(Start)OTE(Motor_Run);'
+
+def test_rung_comment_text_is_not_logic():
+    assert run_rules('', program=parse_units(routine_units(L5X_COMMENTED_RUNG))) == []
+
+def test_comment_only_edit_is_not_a_change():
+    edited = L5X_COMMENTED_RUNG.replace('>= 5000 THEN]]>', '>= 6000 THEN]]>')
+    assert not has_changes(diff_contents(L5X_COMMENTED_RUNG, edited))
@@ -0,0 +1,46 @@
+import os
+
+from llm_cache import LLMCache, content_hash
+
+def make_cache(tmp_path, **kwargs):
+    return LLMCache(path=os.path.join(tmp_path, 'llm_cache.sqlite3'), **kwargs)
+
+def test_miss_then_hit(tmp_path):
+    cache = make_cache(tmp_path)
+    key = LLMCache.make_key('XIC(Start)OTE(Run);', 'v1', 'openai', 'gpt-4o')
+    assert cache.get(key) is None
+    cache.set(key, 'no findings')
+    assert cache.get(key) == 'no findings'
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+
+def test_key_ignores_line_endings_but_not_settings():
+    key = LLMCache.make_key('A := 1;\r\nB := 2;  \r\n', 'v1', 'openai', 'gpt-4o')
+    assert key == LLMCache.make_key('A := 1;\nB := 2;\n', 'v1', 'openai', 'gpt-4o')
+    assert key != LLMCache.make_key('A := 1;\nB := 2;\n', 'v1', 'openai', 'gpt-4o-mini')
+    assert key != LLMCache.make_key('A := 1;\nB := 2;\n', 'v2', 'openai', 'gpt-4o')
+    assert content_hash('A := 1;') != content_hash('A := 2;')
+
+def test_expired_entry_is_a_miss(tmp_path):
+    cache = make_cache(tmp_path, ttl=60)
+    cache.set('key', 'result')
+    cache._connect().execute('UPDATE llm_cache SET created_at = created_at - 120')
+    assert cache.get('key') is None
+    assert cache.stats()['entries'] == 0
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = make_cache(tmp_path, max_entries=2)
+    cache.set('a', '1')
+    cache.set('b', '2')
+    conn = cache._connect()
+    conn.execute("UPDATE llm_cache SET last_access = last_access - 10 WHERE cache_key = 'b'")
+    conn.commit()
+    cache.set('c', '3')
+    assert [cache.get(key) for key in ('a', 'b', 'c')] == ['1', None, '3']
+    assert cache.stats()['evictions'] == 1
+
+def test_disabled_cache_stores_nothing(tmp_path, monkeypatch):
+    monkeypatch.setenv('LLM_CACHE_DISABLED', '1')
+    cache = make_cache(tmp_path)
+    cache.set('key', 'result')
+    assert cache.get('key') is None
@@ -0,0 +1,43 @@
+import os
+
+from llm_log_store import LLMLogStore
+
+def write_entries(store, count):
+    for n in range(count):
+        store.append({'timestamp': f'2025-01-01T00:00:{n:02d}', 'provider': 'openai' if n % 2 else 'ollama',
+                      'model': 'gpt-4o', 'success': True, 'prompt': f'prompt {n}'})
+
+def read_all(store, **filters):
+    prompts, cursor = [], None
+    while True:
+        page = store.page(limit=4, cursor=cursor, **filters)
+        prompts += [entry['prompt'] for entry in page['entries']]
+        cursor = page['next_cursor']
+        if cursor is None:
+            return prompts
+
+def test_pages_span_rotated_and_compressed_segments(tmp_path):
+    store = LLMLogStore(os.path.join(tmp_path, 'llm.log.json'), segment_bytes=300, max_segments=50)
+    write_entries(store, 30)
+    stats = store.stats()
+    assert stats['compressed_segments'] > 1
+    assert stats['entries'] == 30
+    assert read_all(store) == [f'prompt {n}' for n in reversed(range(30))]
+    assert read_all(store, provider='ollama') == [f'prompt {n}' for n in reversed(range(0, 30, 2))]
+
+def test_pruned_segments_drop_out_of_the_index(tmp_path):
+    store = LLMLogStore(os.path.join(tmp_path, 'llm.log.json'), segment_bytes=300, max_segments=2, compress=False)
+    write_entries(store, 30)
+    prompts = read_all(store)
+    assert prompts and prompts[0] == 'prompt 29'
+    assert len(prompts) == store.stats()['entries'] < 30
+    assert prompts == [f'prompt {n}' for n in range(29, 29 - len(prompts), -1)]
+
+def test_rebuilt_index_matches_the_appended_one(tmp_path):
+    store = LLMLogStore(os.path.join(tmp_path, 'llm.log.json'), segment_bytes=300, max_segments=50)
+    write_entries(store, 12)
+    before = store.page(limit=20)['entries']
+    os.remove(store.index_path)
+    assert store.rebuild_index()['entries'] == 12
+    assert store.page(limit=20)['entries'] == before
+    assert store.get(before[5]['id'])['entry'] == before[5]
@@ -0,0 +1,15 @@
+from migrations import LATEST_VERSION, get_schema_version, migrate
+
+def test_migrations_apply_once(database):
+    with database.get_connection() as conn:
+        first = migrate(conn)
+        second = migrate(conn)
+        assert get_schema_version(conn) == LATEST_VERSION
+    assert [m['version'] for m in first['applied']] == list(range(1, LATEST_VERSION + 1))
+    assert second['applied'] == []
+    assert second['from_version'] == second['version'] == LATEST_VERSION
+
+def test_init_db_brings_the_schema_up_to_date(database):
+    assert database.init_db()['version'] == LATEST_VERSION
+    assert database.init_db()['applied'] == []
+    assert database.get_db_schema_version() == {'ok': True, 'version': LATEST_VERSION, 'latest': LATEST_VERSION}
@@ -0,0 +1,22 @@
+from plc_diff import diff_contents, has_changes
+from test_plc_model import SCL_DATE_TRIGGER, STL_INTERBLOCKS
+
+def test_date_literal_change_is_a_modification():
+    diff = diff_contents(SCL_DATE_TRIGGER, SCL_DATE_TRIGGER.replace('D#2025-01-01', 'D#2026-01-01'))
+    assert has_changes(diff)
+    assert diff['summary']['blocks_modified'] == 1
+    modified = diff['blocks_modified'][0]
+    assert [a['instruction'] for a in modified['added']] == ['IF "SysDate" > D#2026-01-01 THEN']
+    assert [r['instruction'] for r in modified['removed']] == ['IF "SysDate" > D#2025-01-01 THEN']
+
+def test_identical_programs_have_no_changes():
+    assert not has_changes(diff_contents(SCL_DATE_TRIGGER, SCL_DATE_TRIGGER))
+
+def test_repeated_interblock_segments_are_matched_in_order():
+    diff = diff_contents(STL_INTERBLOCKS, STL_INTERBLOCKS.replace('L 200;', 'L 300;'))
+    assert diff['summary']['blocks_modified'] == 1
+    assert diff['summary']['blocks_added'] == diff['summary']['blocks_removed'] == 0
+    modified = diff['blocks_modified'][0]
+    assert modified['name'] == 'interblock#2'
+    assert [a['instruction'] for a in modified['added']] == ['L 300;']
+    assert [r['instruction'] for r in modified['removed']] == ['L 200;']
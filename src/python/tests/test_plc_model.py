@@ -0,0 +1,50 @@
+from plc_model import normalize_line, parse_program
+
+SCL_DATE_TRIGGER = '''FUNCTION FC10 : VOID
+BEGIN
+IF "SysDate" > D#2025-01-01 THEN
+  "Pump_SP" := 0;
+END_IF;
+END_FUNCTION
+'''
+
+STL_INTERBLOCKS = '''FUNCTION FC1 : VOID
+BEGIN
+A I 0.0;
+= Q 0.0;
+END_FUNCTION
+L 100;
+T MW 10;
+FUNCTION FC2 : VOID
+BEGIN
+A I 0.1;
+= Q 0.1;
+END_FUNCTION
+L 200;
+T MW 20;
+FUNCTION FC3 : VOID
+BEGIN
+A I 0.2;
+END_FUNCTION
+'''
+
+def test_date_literals_are_logic():
+    assert normalize_line('IF "SysDate" > D#2025-01-01 THEN') == 'IF "SysDate" > D#2025-01-01 THEN'
+    assert normalize_line('L DT#2025-01-01-10:00:00.000') == 'L DT#2025-01-01-10:00:00.000'
+    assert normalize_line('L 01.02.2025') == 'L 01.02.2025'
+
+def test_export_timestamps_and_comments_are_ignored():
+    assert normalize_line('<Controller ExportDate="Fri Oct 17 2025" Name="PLC1">') == \
+        normalize_line('<Controller ExportDate="Mon Jan 05 2026" Name="PLC1">')
+    assert normalize_line('A I0.0 // changed 2025-01-01') == 'A I0.0'
+
+def test_blocks_differing_only_in_date_literal_hash_differently():
+    old = parse_program(SCL_DATE_TRIGGER).blocks[0]
+    new = parse_program(SCL_DATE_TRIGGER.replace('D#2025-01-01', 'D#2026-01-01')).blocks[0]
+    assert old.name == new.name == 'FC10'
+    assert old.hash != new.hash
+
+def test_repeated_segment_names_are_made_unique():
+    program = parse_program(STL_INTERBLOCKS)
+    assert [b.name for b in program.blocks] == ['FC1', 'interblock', 'FC2', 'interblock#2', 'FC3']
+    assert 'L 200;' in program.get('interblock#2').text
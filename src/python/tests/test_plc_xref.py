@@ -0,0 +1,18 @@
+from plc_model import normalize_line
+from plc_xref import split_instructions
+
+def test_ladder_rung_yields_each_instruction():
+    assert split_instructions(normalize_line('<![CDATA[XIC(Start)MOV(100,DB12_Speed);]]>')) == [
+        ('XIC', 'Start', 'XIC(Start)'),
+        ('MOV', '100,DB12_Speed', 'MOV(100,DB12_Speed)'),
+    ]
+
+def test_scl_call_and_assignment():
+    assert split_instructions(normalize_line('MOV(100, DB12.DBW4);')) == [('MOV', '100,DB12.DBW4', 'MOV(100,DB12.DBW4)')]
+    assert split_instructions(normalize_line('"Pump_SP" := D#2025-01-01; // setpoint')) == [
+        (':=', '"Pump_SP" := D#2025-01-01', '"Pump_SP" := D#2025-01-01'),
+    ]
+
+def test_stl_statement_and_markup():
+    assert split_instructions(normalize_line('L DB12.DBW4')) == [('L', 'DB12.DBW4', 'L DB12.DBW4')]
+    assert split_instructions(normalize_line('<Rung Number="0" Type="N">')) == []
@@ -0,0 +1,37 @@
+from l5x_parser import routine_units
+from plc_model import parse_units
+from rules import run_rules, scan_block
+
+SCL_RUNTIME_TRIGGER = '''IF "RunTime_Hours" >= 5000 THEN
+    "Pump_Enable" := FALSE;
+END_IF;
+'''
+
+def test_multi_line_if_condition_is_a_runtime_trigger():
+    findings = scan_block('FC10', SCL_RUNTIME_TRIGGER)
+    assert [(f['rule'], f['line']) for f in findings] == [('counter_runtime_trigger', 1)]
+    assert findings[0]['instruction'] == 'IF "RunTime_Hours" >= 5000 THEN'
+
+def test_elsif_condition_is_checked():
+    text = 'IF "Start" THEN\n    "Run" := TRUE;\nELSIF "Cycle_Count" > 250 THEN\n    "Run" := FALSE;\nEND_IF;\n'
+    assert [(f['rule'], f['line']) for f in scan_block('FC11', text)] == [('counter_runtime_trigger', 3)]
+
+L5X_RUNTIME_TRIGGER = '''<?xml version="1.0" encoding="UTF-8"?>
+<RSLogix5000Content SchemaRevision="1.0" TargetName="Ctl" TargetType="Controller">
+<Controller Name="Ctl"><Programs><Program Name="MainProgram"><Routines>
+<Routine Name="MainRoutine" Type="RLL"><RLLContent>
+<Rung Number="0" Type="N"><Text><![CDATA[XIC(Start)OTE(Motor_Run);]]></Text></Rung>
+</RLLContent></Routine>
+<Routine Name="Sub" Type="ST"><STContent>
+<Line Number="0"><![CDATA[IF RunTime_Hours >= 5000 THEN]]></Line>
+<Line Number="1"><![CDATA[  Motor_Run := 0;]]></Line>
+<Line Number="2"><![CDATA[END_IF;]]></Line>
+</STContent></Routine>
+</Routines></Program></Programs></Controller>
+</RSLogix5000Content>
+'''
+
+def test_l5x_routines_are_scanned_one_by_one():
+    program = parse_units(routine_units(L5X_RUNTIME_TRIGGER))
+    findings = [f for f in run_rules('', program=program) if f['rule'] == 'counter_runtime_trigger']
+    assert [(f['block'], f['line']) for f in findings] == [('MainProgram/Sub', 4)]
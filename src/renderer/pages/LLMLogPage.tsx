@@ -1,19 +1,31 @@
 import React, { useEffect, useState } from 'react';
 
+const PAGE_SIZE = 50;
+
 const LLMLogPage: React.FC = () => {
   const [logs, setLogs] = useState<any[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [expanded, setExpanded] = useState<number | null>(null);
 
+  // Pages come newest first; cursor continues with the entries older than the previous page
+  const fetchPage = async (cursor?: string) => {
+    const page = await window.electronAPI?.getLLMLogPage({ limit: PAGE_SIZE, cursor });
+    if (page && !page.ok) {
+      throw new Error(page.error || 'Failed to load logs');
+    }
+    return { entries: page?.entries || [], nextCursor: page?.next_cursor || null };
+  };
+
   const loadLogs = async () => {
     setLoading(true);
     setError(null);
+    setExpanded(null);
     try {
-      // @ts-ignore
-      const data = await window.electronAPI?.getLLMLogs();
-      // Sort logs newest to oldest
-      setLogs(Array.isArray(data) ? [...data].sort((a, b) => (b.timestamp || '').localeCompare(a.timestamp || '')) : []);
+      const page = await fetchPage();
+      setLogs(page.entries);
+      setNextCursor(page.nextCursor);
     } catch (e: any) {
       setError(e.message || 'Failed to load logs');
     } finally {
@@ -21,6 +33,21 @@ const LLMLogPage: React.FC = () => {
     }
   };
 
+  const loadOlder = async () => {
+    if (!nextCursor) return;
+    setLoading(true);
+    setError(null);
+    try {
+      const page = await fetchPage(nextCursor);
+      setLogs(prev => [...prev, ...page.entries]);
+      setNextCursor(page.nextCursor);
+    } catch (e: any) {
+      setError(e.message || 'Failed to load older logs');
+    } finally {
+      setLoading(false);
+    }
+  };
+
   useEffect(() => {
     loadLogs();
   }, []);
@@ -99,7 +126,7 @@ const LLMLogPage: React.FC = () => {
                   : (log.result && log.result.error ? log.result.error : 'No summary available');
                 
                 return (
-                  <React.Fragment key={idx}>
+                  <React.Fragment key={log.id || idx}>
                     <tr className="hover:bg-gray-50">
                       <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-900">{log.id || idx + 1}</td>
                       <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-900">
@@ -175,6 +202,17 @@ const LLMLogPage: React.FC = () => {
               })}
             </tbody>
           </table>
+          {nextCursor && (
+            <div className="px-6 py-3 border-t border-gray-200 text-center">
+              <button
+                onClick={loadOlder}
+                disabled={loading}
+                className="px-4 py-2 text-sm text-blue-600 hover:text-blue-900 disabled:opacity-50 disabled:cursor-not-allowed transition-colors"
+              >
+                {loading ? 'Loading...' : 'Load older'}
+              </button>
+            </div>
+          )}
         </div>
       )}
     </div>
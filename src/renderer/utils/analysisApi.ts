@@ -146,7 +146,95 @@ export async function analyzeFile(file: File, provider?: string, model?: string)
         const error = await response.text();
         throw new Error(error || 'Failed to analyze file');
     }
-    return await response.json();
+    const queued = await response.json();
+    if (!queued.job_id) {
+        return queued;
+    }
+    // The API queues the analysis; poll the job until it finishes
+    const jobUrl = new URL(`jobs/${queued.job_id}`, new URL(apiUrl, window.location.href)).toString();
+    return await pollAnalysisJob(jobUrl);
+}
+
+const JOB_POLL_INTERVAL_MS = 1500;
+const JOB_POLL_TIMEOUT_MS = 15 * 60 * 1000;
+
+async function pollAnalysisJob(jobUrl: string) {
+    const started = Date.now();
+    while (Date.now() - started < JOB_POLL_TIMEOUT_MS) {
+        const response = await fetch(jobUrl);
+        if (!response.ok) {
+            const error = await response.text();
+            throw new Error(error || 'Failed to fetch analysis job status');
+        }
+        const { job } = await response.json();
+        if (job.status === 'succeeded') {
+            return job.result;
+        }
+        if (job.status === 'failed') {
+            throw new Error(job.error || 'Analysis job failed');
+        }
+        await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+    }
+    throw new Error('Timed out waiting for analysis job');
+}
+
+export type AnalysisStreamEvent = { event: string; data: any };
+
+// Streams an analysis over Server-Sent Events; onEvent receives section text deltas and
+// instruction_analysis rows as they are generated. Resolves with the final analysis.
+export async function analyzeFileStream(
+    file: File,
+    onEvent: (event: AnalysisStreamEvent) => void,
+    provider?: string,
+    model?: string
+) {
+    const formData = new FormData();
+    formData.append('file', file);
+    if (provider) formData.append('provider', provider);
+    if (model) formData.append('model', model);
+    const apiUrl = process.env.REACT_APP_API_URL || '/api/analyze';
+    const streamUrl = new URL('analyze/stream', new URL(apiUrl, window.location.href)).toString();
+    const response = await fetch(streamUrl, {
+        method: 'POST',
+        body: formData,
+        headers: { Accept: 'text/event-stream' },
+    });
+    if (!response.ok || !response.body) {
+        const error = await response.text();
+        throw new Error(error || 'Failed to analyze file');
+    }
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let result: any = null;
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const raw = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            let event = 'message';
+            let data = '';
+            for (const line of raw.split('\n')) {
+                if (line.startsWith('event:')) event = line.slice(6).trim();
+                else if (line.startsWith('data:')) data += line.slice(5).trim();
+            }
+            const parsed = data ? JSON.parse(data) : {};
+            if (event === 'error') {
+                throw new Error(parsed.error || 'Analysis stream failed');
+            }
+            if (event === 'result') {
+                result = parsed;
+            }
+            onEvent({ event, data: parsed });
+        }
+    }
+    if (!result) {
+        throw new Error('Analysis stream ended without a result');
+    }
+    return result;
 }
 
 export async function syncOTThreatIntel(provider?: string) {
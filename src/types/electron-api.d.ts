@@ -75,6 +75,7 @@ interface GitRepository {
   untracked_files: string[];
   modified_files: string[];
   staged_files: string[];
+  conflicted_files?: string[];
   remotes: string[];
   last_commit?: {
     hash: string;
@@ -125,6 +126,82 @@ interface GitAnalysisResult {
   [key: string]: any; // Analysis result properties
 }
 
+interface GitCloneOptions {
+  partial?: boolean; // Fetch file contents on demand (blob:none filter)
+  depth?: number;    // Shallow clone depth
+  sparse?: boolean;  // Check out only PLC files
+}
+
+interface GitBranchAnalysisProgress {
+  path: string;
+  status: 'analyzed' | 'failed';
+  done: number;
+  total: number;
+}
+
+interface GitBranchAnalysisResult extends GitResult {
+  branch?: string;
+  commit?: string;
+  total?: number;
+  skipped?: number;
+  analyzed?: number;
+  saved?: number;
+  failed?: { path: string; error: string }[];
+  files?: { path: string; analysis_id: number | null; max_risk: string | null }[];
+  since?: string | null;
+  changes?: { path: string; change_type: string; old_path: string | null }[];
+}
+
+interface GitHistoryScanResult extends GitResult {
+  branch?: string;
+  commit?: string;
+  since?: string | null;
+  commits?: number;
+  added?: number;
+  removed?: number;
+}
+
+interface GitHistoryQuery {
+  op?: string;          // Opcode, e.g. 'MOV'
+  operand?: string;     // Whole operand token, e.g. 'DB12'
+  instruction?: string; // Full instruction text
+  file?: string;
+  removed?: boolean;    // Search removed instead of added instructions
+  first?: boolean;      // Only the earliest match
+  limit?: number;
+}
+
+interface GitHistoryMatch {
+  commit_sha: string;
+  author: string;
+  author_email: string;
+  authored_at: string;
+  committed_at: string;
+  file_path: string;
+  change: 'added' | 'removed';
+  line: number;
+  op: string;
+  operand: string;
+  instruction: string;
+}
+
+interface LLMLogPageOptions {
+  limit?: number;
+  cursor?: string;   // next_cursor of the previous page
+  provider?: string;
+  model?: string;
+  success?: boolean;
+  since?: string;    // ISO timestamps
+  until?: string;
+}
+
+interface LLMLogPage {
+  ok: boolean;
+  entries: any[];
+  next_cursor: string | null;
+  error?: string;
+}
+
 // Dialog result types
 interface DialogResult {
   success: boolean;
@@ -151,7 +228,7 @@ declare global {
       resetUserPassword: (userId: number, newPassword: string) => Promise<UserManagementResult>;
       
       // === Git Integration Methods ===
-      gitCloneRepository: (url: string, localPath: string, branch?: string, username?: string, password?: string) => Promise<GitResult>;
+      gitCloneRepository: (url: string, localPath: string, branch?: string, username?: string, password?: string, options?: GitCloneOptions) => Promise<GitResult>;
       gitConnectRepository: (repoPath: string) => Promise<GitResult>;
       gitGetBranches: () => Promise<GitBranchResult>;
       gitGetRemoteBranches: (url: string) => Promise<GitBranchResult>;
@@ -159,6 +236,12 @@ declare global {
       gitGetFiles: (branch?: string) => Promise<GitFileResult>;
       gitGetStatus: () => Promise<GitStatusResult>;
       gitAnalyzeFile: (filePath: string, branch?: string, provider?: string, model?: string) => Promise<GitAnalysisResult>;
+      gitAnalyzeBranch: (branch?: string, provider?: string, workers?: number) => Promise<GitBranchAnalysisResult>;
+      gitScanChanges: (branch?: string, since?: string, provider?: string, workers?: number) => Promise<GitBranchAnalysisResult>;
+      onGitAnalyzeBranchProgress: (callback: (progress: GitBranchAnalysisProgress) => void) => () => void;
+      gitScanHistory: (branch?: string, since?: string) => Promise<GitHistoryScanResult>;
+      onGitScanHistoryProgress: (callback: (progress: { commit: string; done: number; total: number }) => void) => () => void;
+      gitHistorySearch: (query: GitHistoryQuery) => Promise<GitResult & { matches?: GitHistoryMatch[]; count?: number }>;
       gitCommitFile: (filePath: string, commitMessage: string, branch?: string) => Promise<GitCommitResult>;
       gitPushToRemote: (branch?: string, remote?: string) => Promise<GitPushResult>;
       gitCopyFileFromBranch: (filePath: string, sourceBranch: string, targetPath?: string) => Promise<GitResult>;
@@ -182,6 +265,9 @@ declare global {
       listAnalyses: () => Promise<any>;
       getAnalyses: () => Promise<any>;
       listBaselines: () => Promise<any>;
+      listAnalysesPage: (limit?: number, cursor?: string | null, mode?: 'summary' | 'full') => Promise<any>;
+      listBaselinesPage: (limit?: number, cursor?: string | null, mode?: 'summary' | 'full') => Promise<any>;
+      getAnalysisStats: () => Promise<any>;
       debugLogHook: (log: any) => void;
       getSavedComparisons: () => Promise<any>;
       saveAnalysis: (fileName: string, status: string, analysisJson: any, filePath?: string, provider?: string, model?: string) => Promise<any>;
@@ -191,7 +277,8 @@ declare global {
       llmCompareAnalysisBaseline: (analysisPathOrContent: string, baselinePathOrContent: string, provider?: string) => Promise<any>;
       saveComparisonResult: (payload: any) => Promise<any>;
       deleteComparisonResult: (comparisonId: number) => Promise<any>;
-      getLLMLogs: () => Promise<any>;
+      getLLMLogs: (limit?: number) => Promise<any>;
+      getLLMLogPage: (options?: LLMLogPageOptions) => Promise<LLMLogPage>;
       clearLLMLog: () => Promise<any>;
       deleteBaseline: (baselineId: number) => Promise<any>;
       deleteAnalysis: (analysisId: number) => Promise<any>;
@@ -5,15 +5,15 @@ import subprocess, json
 
 def get_total_analyses():
     try:
-        out = subprocess.check_output(['python3', '../../src/python/db.py', '--list-analyses'])
-        return len(json.loads(out))
+        out = subprocess.check_output(['python3', '../../src/python/db.py', '--count-analyses'])
+        return json.loads(out).get('count', 0)
     except Exception:
         return 0
 
 def get_total_baselines():
     try:
-        out = subprocess.check_output(['python3', '../../src/python/db.py', '--list-baselines'])
-        return len(json.loads(out))
+        out = subprocess.check_output(['python3', '../../src/python/db.py', '--count-baselines'])
+        return json.loads(out).get('count', 0)
     except Exception:
         return 0
 
@@ -1,12 +1,19 @@
 # LLMLogViewer.py - Detailed LLM/system log viewer for PySide6 dashboard
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QLabel, QTableWidget, QTableWidgetItem, QPushButton, QHeaderView, QTextEdit
-import json
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'python'))
+from llm_log_store import LLMLogStore, LOG_PATH
+
+PAGE_SIZE = 100
 
 class LLMLogViewer(QWidget):
     def __init__(self, log_path=None):
         super().__init__()
-        self.log_path = log_path or os.path.expanduser('~/Development Projects/PLC Code Check/first-watch-plc-code-checker-v2/llm-interactions.log.json')
+        self.store = LLMLogStore(log_path or LOG_PATH)
+        self.logs = []
+        self.next_cursor = None
         self.setMinimumWidth(800)
         self.setWindowTitle("LLM/System Log Viewer")
         layout = QVBoxLayout(self)
@@ -16,6 +23,9 @@ class LLMLogViewer(QWidget):
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         layout.addWidget(QLabel("LLM & System Actions Log"))
         layout.addWidget(self.table)
+        self.more_button = QPushButton("Load older entries")
+        self.more_button.clicked.connect(self.load_more)
+        layout.addWidget(self.more_button)
         self.detail_view = QTextEdit()
         self.detail_view.setReadOnly(True)
         layout.addWidget(self.detail_view)
@@ -23,17 +33,26 @@ class LLMLogViewer(QWidget):
         self.table.cellClicked.connect(self.show_details)
 
     def load_logs(self):
-        if not os.path.exists(self.log_path):
-            self.table.setRowCount(0)
-            return
-        with open(self.log_path, 'r') as f:
-            try:
-                logs = json.load(f)
-            except Exception:
-                logs = []
-        self.table.setRowCount(len(logs))
-        for idx, log in enumerate(logs):
-            self.table.setItem(idx, 0, QTableWidgetItem(str(log.get('id', idx+1))))
+        """Show the most recent page of entries"""
+        self.logs = []
+        self.next_cursor = None
+        self.table.setRowCount(0)
+        self._append_page(self.store.page(limit=PAGE_SIZE))
+
+    def load_more(self):
+        """Append the next (older) page"""
+        if self.next_cursor:
+            self._append_page(self.store.page(limit=PAGE_SIZE, cursor=self.next_cursor))
+
+    def _append_page(self, page):
+        start = len(self.logs)
+        logs = page.get('entries', [])
+        self.logs.extend(logs)
+        self.next_cursor = page.get('next_cursor')
+        self.more_button.setEnabled(bool(self.next_cursor))
+        self.table.setRowCount(len(self.logs))
+        for idx, log in enumerate(logs, start):
+            self.table.setItem(idx, 0, QTableWidgetItem(str(idx + 1)))
             self.table.setItem(idx, 1, QTableWidgetItem(log.get('timestamp', '')))
             self.table.setItem(idx, 2, QTableWidgetItem('Success' if log.get('success') else 'Fail'))
             summary = log.get('result', '')
@@ -45,10 +64,9 @@ class LLMLogViewer(QWidget):
                 summary = ''
             self.table.setItem(idx, 3, QTableWidgetItem(summary))
             self.table.setItem(idx, 4, QTableWidgetItem("View"))
-        self.logs = logs
 
     def show_details(self, row, col):
-        if not hasattr(self, 'logs') or row >= len(self.logs):
+        if row >= len(self.logs):
             self.detail_view.setText("")
             return
         log = self.logs[row]